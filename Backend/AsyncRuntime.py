@@ -0,0 +1,155 @@
+"""
+Async Runtime
+One long-lived asyncio event loop for the whole assistant. With the GUI it
+is the Qt event loop itself (qasync), otherwise it runs on a background
+thread. Listening, decisions, automation, search, LLM and speech tasks are
+all scheduled on it, instead of a new loop per utterance (asyncio.run) or
+a new thread per spoken sentence.
+"""
+import concurrent.futures
+import threading
+import asyncio
+import time
+
+try:
+    import qasync
+except ImportError:
+    qasync = None
+
+
+class AsyncRuntime:
+    """Owns the event loop; coroutines can be submitted from any thread"""
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        # The loop only keeps weak references to tasks; fire-and-forget ones are held here until done
+        self._tasks = set()
+
+    @property
+    def running(self) -> bool:
+        return self.loop is not None and self._ready.is_set()
+
+    def _attach(self, loop):
+        self.loop = loop
+        self._thread = threading.current_thread()
+        self._ready.set()
+
+    def start(self):
+        """Run the loop on a daemon thread (no GUI, or qasync is not installed); idempotent"""
+        with self._lock:
+            if self.loop is not None:
+                return
+
+            def run():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._attach(loop)
+                loop.run_forever()
+
+            threading.Thread(target=run, name="AsyncRuntime", daemon=True).start()
+        self._ready.wait()
+
+    def run_qt(self, app, main=None) -> int:
+        """
+        Run the Qt application and the asyncio loop together on the calling (main) thread.
+        main is an optional coroutine started once the loop runs. Without qasync, the
+        loop runs on a background thread and Qt keeps its own loop.
+        """
+        if qasync is None or self.loop is not None:
+            self.start()
+            if main is not None:
+                self.submit(main)
+            return app.exec_()
+
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
+        with self._lock:
+            self._attach(loop)
+        if main is not None:
+            task = loop.create_task(main)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        app.aboutToQuit.connect(loop.stop)
+        with loop:
+            loop.run_forever()
+        return 0
+
+    def in_loop(self) -> bool:
+        """True when called from the loop's own thread, where blocking would stall every task"""
+        return self.loop is not None and self._thread is threading.current_thread()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop from any thread"""
+        if self.loop is None:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """Run a coroutine on the loop and block the calling (non-loop) thread for its result"""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("AsyncRuntime.run() would block its own event loop; await the coroutine instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def queue(self, bus, *event_types) -> asyncio.Queue:
+        """An asyncio.Queue on the runtime loop that receives the given event bus events"""
+        if self.loop is None:
+            self.start()
+        events = asyncio.Queue()
+        for event_type in event_types:
+            bus.subscribe(event_type, lambda event: self.loop.call_soon_threadsafe(events.put_nowait, event))
+        return events
+
+
+# The single loop used by main.py, the speech pipeline and the GUI
+runtime = AsyncRuntime()
+
+
+def _benchmark(utterances: int = 200, sentences: int = 4):
+    """Event loop and thread setup per utterance: asyncio.run and a thread per sentence vs the shared runtime"""
+    async def utterance():
+        await asyncio.sleep(0)
+
+    async def synthesize():
+        await asyncio.sleep(0)
+
+    def legacy():
+        asyncio.run(utterance())
+        for _ in range(sentences):
+            # TextToSpeech: new thread + asyncio.run for every sentence
+            worker = threading.Thread(target=lambda: asyncio.run(synthesize()))
+            worker.start()
+            worker.join()
+
+    shared = AsyncRuntime()
+    start = time.perf_counter()
+    shared.start()
+    startup = time.perf_counter() - start
+
+    def current():
+        shared.run(utterance())
+        for _ in range(sentences):
+            shared.run(synthesize())
+
+    # (label, run, event loops and threads created per utterance)
+    for label, run, created in [("asyncio.run + threads", legacy, (1 + sentences, sentences)),
+                                ("shared runtime", current, (0, 0))]:
+        start = time.perf_counter()
+        for _ in range(utterances):
+            run()
+        per_utterance = (time.perf_counter() - start) / utterances
+        print(f"{label:22}: {per_utterance * 1e6:8.1f} us per utterance with {sentences} spoken sentences "
+              f"({created[0]} loops, {created[1]} threads created)")
+    print(f"shared runtime startup: {startup * 1e3:.2f} ms once, qasync {'available' if qasync else 'not installed (thread loop)'}")
+
+
+if __name__ == "__main__":
+    _benchmark()
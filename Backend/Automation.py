@@ -6,6 +6,8 @@ from dotenv import dotenv_values
 from bs4 import BeautifulSoup
 from rich import print 
 from .LLMProvider import llm_client
+from .AsyncRuntime import runtime
+from .SessionStore import sessions
 import webbrowser
 import subprocess
 import requests
@@ -28,55 +30,53 @@ professional_responses = [
     "I'm at your service for any additional questions or support you may need-don't hesitate to ask.",
 ]
 
-messages = []
-
 SystemChatBot = [{"role":"system","content": f"Hello, I am {os.environ['Username']},You're a content writer. You have to write content like letters, codes, application, essays, notes, songs, poem etc."}]
 
 def GoogleSearch(Topic):
     search(Topic)
     return True
 
-def Content(Topic):
-
-    def OpenNotepad(File):
-        default_text_editor = 'notepad.exe'
-        subprocess.Popen([default_text_editor, File])
+def OpenNotepad(File):
+    default_text_editor = 'notepad.exe'
+    subprocess.Popen([default_text_editor, File])
 
-    def ContentWriterAI(prompt):
-        messages.append({"role":"user","content":f"{prompt}"})
+async def ContentWriterAI(prompt, session=None):
+    # Each session remembers its own content requests (bounded, see SESSION_HISTORY_SIZE)
+    messages = (session or sessions.default).content_messages
+    messages.append({"role":"user","content":f"{prompt}"})
 
-        if llm_client.client is None:
-            provider = llm_client.provider.upper()
-            return (f"[{provider} API key missing] Unable to generate content automatically. "
-                    f"Please set the appropriate API key in the .env file. "
-                    f"Current provider: {provider}")
+    if llm_client.client is None:
+        provider = llm_client.provider.upper()
+        return (f"[{provider} API key missing] Unable to generate content automatically. "
+                f"Please set the appropriate API key in the .env file. "
+                f"Current provider: {provider}")
 
-        try:
-            completion = llm_client.create_completion(
-                model="llama-3.1-8b-instant",
-                messages=SystemChatBot + messages,
-                max_tokens=2048,
-                temperature=0.7,
-                top_p=1,
-                stream=True,
-                stop=None
-            )
+    try:
+        # Streams on the caller's event loop, so several content tasks share one thread
+        Answers = ""
 
-            Answers = ""
+        async for chunk in llm_client.acreate_completion(
+            model="llama-3.1-8b-instant",
+            messages=SystemChatBot + list(messages),
+            max_tokens=2048,
+            temperature=0.7,
+            top_p=1,
+            stop=None
+        ):
+            if chunk.choices[0].delta.content:
+                Answers += chunk.choices[0].delta.content
 
-            for chunk in completion:
-                if chunk.choices[0].delta.content:
-                    Answers += chunk.choices[0].delta.content
+        Answers = Answers.replace("</s>","")
+        messages.append({"role":"assistant","content":Answers})
 
-            Answers = Answers.replace("</s>","")
-            messages.append({"role":"assistant","content":Answers})
+        return Answers
+    except Exception as e:
+        return f"[Error] Failed to generate content: {str(e)}" 
 
-            return Answers
-        except Exception as e:
-            return f"[Error] Failed to generate content: {str(e)}" 
+async def ContentAsync(Topic, session=None):
 
     Topic: str = Topic.replace("Content ","")
-    ContentByAI = ContentWriterAI(Topic)
+    ContentByAI = await ContentWriterAI(Topic, session)
 
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     filename = f"{Topic.lower().replace(' ','')}.txt"
@@ -90,6 +90,9 @@ def Content(Topic):
     OpenNotepad(str(file_path))
     return True
 
+def Content(Topic, session=None):
+    return runtime.run(ContentAsync(Topic, session))
+
 def YouTubeSearch(Topic):
     Url4Search = f"https://www.youtube.com/results?search_query={Topic}"
     webbrowser.open(Url4Search)
@@ -173,7 +176,7 @@ def System(command):
 
     return True
 
-async def TranslateAndExecute(commands: list[str]):
+async def TranslateAndExecute(commands: list[str], session=None):
 
     funcs = []
 
@@ -204,7 +207,7 @@ async def TranslateAndExecute(commands: list[str]):
             funcs.append(fun)
 
         elif command.startswith("content "):
-            fun = asyncio.to_thread(Content, command.removeprefix("content "))
+            fun = ContentAsync(command.removeprefix("content "), session)
             funcs.append(fun)
 
         elif command.startswith("google search "):
@@ -226,9 +229,9 @@ async def TranslateAndExecute(commands: list[str]):
         else:
             yield result
 
-async def Automation(commands: list[str]):
+async def Automation(commands: list[str], session=None):
 
-    async for result in TranslateAndExecute(commands):
+    async for result in TranslateAndExecute(commands, session):
         pass
 
     return True
@@ -0,0 +1,289 @@
+"""
+Append-only Chat Log Store
+Keeps the conversation as JSONL segments so a turn costs O(1) disk I/O
+instead of re-reading and re-writing the whole Chatlog.json.
+"""
+from pathlib import Path
+from collections import deque
+from dotenv import dotenv_values
+import threading
+import bisect
+import json
+import os
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# How many recent messages are kept in memory for the fast "last N" path
+TAIL_SIZE = int(env_vars.get("CHATLOG_TAIL_SIZE", 200))
+# How many messages go into one segment file before a new one is started
+SEGMENT_SIZE = int(env_vars.get("CHATLOG_SEGMENT_SIZE", 5000))
+
+
+class ChatLogStore:
+    """Append-only message log made of JSONL segments of up to segment_size messages plus an in-memory tail"""
+
+    def __init__(self, directory, tail_size: int = TAIL_SIZE, segment_size: int = SEGMENT_SIZE,
+                 legacy_path=None):
+        self.directory = Path(directory)
+        self.tail_size = tail_size
+        self.segment_size = segment_size
+        self._lock = threading.RLock()
+        self._tail = deque(maxlen=tail_size)
+        self._count = 0
+        self._handle = None
+        # [segment index, position of its first message, messages in it], oldest first
+        self._segments = []
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+        if legacy_path is not None and self._count == 0:
+            self.migrate_legacy(legacy_path)
+
+    # ---------------------------------------------------------------- layout
+
+    def _segment_path(self, index: int) -> Path:
+        return self.directory / f"segment-{index:06d}.jsonl"
+
+    def _segment_indexes(self):
+        indexes = []
+        for path in self.directory.glob("segment-*.jsonl"):
+            try:
+                indexes.append(int(path.stem.split("-")[1]))
+            except (IndexError, ValueError):
+                continue
+        return sorted(indexes)
+
+    @staticmethod
+    def _read_segment(path: Path):
+        messages = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write; everything before it is intact
+                    print(f"[WARN] Skipping corrupt chat log line in {path.name}")
+        return messages
+
+    @staticmethod
+    def _count_lines(path: Path) -> int:
+        """Messages in a segment without parsing them (one non-empty line each)"""
+        count = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    count += 1
+        return count
+
+    def _load(self):
+        """Count the messages in each segment and fill the tail by parsing only the newest segments"""
+        indexes = self._segment_indexes()
+        if not indexes:
+            return
+
+        # Segments are counted rather than assumed full: the log may have been written with another
+        # CHATLOG_SEGMENT_SIZE, or its last segment may have been left short by a crash
+        for index in indexes[:-1]:
+            count = self._count_lines(self._segment_path(index))
+            self._segments.append([index, self._count, count])
+            self._count += count
+        last_messages = self._read_segment(self._segment_path(indexes[-1]))
+        self._segments.append([indexes[-1], self._count, len(last_messages)])
+        self._count += len(last_messages)
+
+        tail = list(last_messages)
+        for index in reversed(indexes[:-1]):
+            if len(tail) >= self.tail_size:
+                break
+            tail = self._read_segment(self._segment_path(index)) + tail
+        self._tail.extend(tail[-self.tail_size:] if self.tail_size else [])
+
+    def _writer(self):
+        """Return the append handle for the segment the next message belongs to"""
+        if not self._segments or self._segments[-1][2] >= self.segment_size:
+            index = self._segments[-1][0] + 1 if self._segments else 0
+            self._segments.append([index, self._count, 0])
+        path = self._segment_path(self._segments[-1][0])
+        if self._handle is None or self._handle.name != str(path):
+            if self._handle is not None:
+                self._handle.close()
+            self._handle = open(path, "a", encoding="utf-8")
+        return self._handle
+
+    # ---------------------------------------------------------------- writes
+
+    def append(self, message: dict):
+        """Append a single {"role", "content"} message"""
+        self.extend([message])
+
+    def extend(self, messages: list):
+        """Append several messages, rolling over to a new segment when one fills up"""
+        with self._lock:
+            for message in messages:
+                handle = self._writer()
+                handle.write(json.dumps(message, ensure_ascii=False) + "\n")
+                self._segments[-1][2] += 1
+                self._count += 1
+                self._tail.append(message)
+            if self._handle is not None:
+                self._handle.flush()
+
+    def clear(self):
+        """Delete the whole log"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            for index in self._segment_indexes():
+                try:
+                    os.remove(self._segment_path(index))
+                except OSError:
+                    pass
+            self._tail.clear()
+            self._segments = []
+            self._count = 0
+
+    def sync(self):
+        """Flush and fsync the active segment"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    # ----------------------------------------------------------------- reads
+
+    def __len__(self):
+        return self._count
+
+    def tail(self, n: int = None) -> list:
+        """Return the last n messages (default: the whole in-memory tail) without touching disk"""
+        with self._lock:
+            if n is None:
+                return list(self._tail)
+            if n <= 0:
+                return []
+            if n > len(self._tail) and self._count > len(self._tail):
+                return self.read(self._count - n, self._count)
+            return list(self._tail)[-n:]
+
+    def read(self, start: int = 0, stop: int = None) -> list:
+        """Return messages[start:stop], serving from memory when the range is inside the tail"""
+        with self._lock:
+            stop = self._count if stop is None else min(stop, self._count)
+            start = max(0, start)
+            if start >= stop:
+                return []
+
+            tail_start = self._count - len(self._tail)
+            if start >= tail_start:
+                tail = list(self._tail)
+                return tail[start - tail_start:stop - tail_start]
+
+            if self._handle is not None:
+                self._handle.flush()
+            messages = []
+            first = bisect.bisect_right([offset for _, offset, _ in self._segments], start) - 1
+            for index, offset, count in self._segments[max(0, first):]:
+                if offset >= stop:
+                    break
+                path = self._segment_path(index)
+                if not count or not path.exists():
+                    continue
+                segment = self._read_segment(path)
+                messages.extend(segment[max(0, start - offset):stop - offset])
+            return messages
+
+    # ------------------------------------------------------------- migration
+
+    def migrate_legacy(self, legacy_path):
+        """Import an old Chatlog.json list once and keep the original as a .bak file"""
+        legacy_path = Path(legacy_path)
+        if not legacy_path.exists():
+            return 0
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                messages = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"[WARN] Could not migrate {legacy_path.name}: {e}")
+            return 0
+        if not isinstance(messages, list) or not messages:
+            return 0
+
+        self.extend(messages)
+        backup = legacy_path.with_suffix(legacy_path.suffix + ".bak")
+        try:
+            os.replace(legacy_path, backup)
+        except OSError:
+            pass
+        print(f"[INFO] Migrated {len(messages)} messages from {legacy_path.name} to {self.directory.name}/")
+        return len(messages)
+
+
+# Shared store used by Chatbot and RealtimeSearchEngine
+chatlog_store = ChatLogStore(DATA_DIR / "Chatlog", legacy_path=DATA_DIR / "Chatlog.json")
+
+
+def _benchmark(total: int = 20000, checkpoints=(100, 1000, 5000, 10000, 20000), context: int = 20):
+    """Compare per-turn cost of the append-only store against the legacy full rewrite"""
+    import tempfile
+    import time
+
+    def legacy_turn(path, turn):
+        with open(path, "r") as f:
+            messages = json.load(f)
+        messages.extend(turn)
+        with open(path, "w") as f:
+            json.dump(messages, f, indent=4)
+        return messages[-context:]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ChatLogStore(Path(tmp) / "store")
+        legacy = Path(tmp) / "Chatlog.json"
+        legacy.write_text("[]")
+
+        print(f"{'messages':>10} | {'store us/turn':>14} | {'legacy us/turn':>15}")
+        print("-" * 46)
+        done = 0
+        for checkpoint in checkpoints:
+            if checkpoint > total:
+                break
+            # Grow both logs to the checkpoint, then time a handful of turns
+            filler = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " * 8}
+                      for i in range(done, checkpoint)]
+            store.extend(filler)
+            with open(legacy, "w") as f:
+                json.dump(store.read(), f)
+            done = checkpoint
+
+            turn = [{"role": "user", "content": "how are you?"},
+                    {"role": "assistant", "content": "I am fine, thank you."}]
+            rounds = 20
+            start = time.perf_counter()
+            for _ in range(rounds):
+                store.tail(context)
+                store.extend(turn)
+            store_cost = (time.perf_counter() - start) / rounds * 1e6
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                legacy_turn(legacy, turn)
+            legacy_cost = (time.perf_counter() - start) / rounds * 1e6
+            done += rounds * 2
+            print(f"{checkpoint:>10} | {store_cost:>14.1f} | {legacy_cost:>15.1f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    _benchmark()
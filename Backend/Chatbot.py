@@ -1,9 +1,13 @@
 from .LLMProvider import llm_client
-from json import load, dump
+from .ContextWindow import EstimateTokens, MessageTokens
+from .SessionStore import sessions
+import threading
 import datetime
+import time
 from dotenv import load_dotenv
 from pathlib import Path
-from .TextToSpeech import TextToSpeech  # Adjust path if needed
+from .SpeechStream import speech_pipeline, CompletionText
+from .ResponseCache import response_cache, ENABLED as RESPONSE_CACHE_ENABLED
 import os 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -14,6 +18,8 @@ load_dotenv(dotenv_path=dotenv_path)
 print(f"ENV VARS - Using LLM Provider: {llm_client.provider.upper()}")
 Username = os.getenv("Username", "User")
 Assistantname = os.getenv("Assistantname", "Jarvis")
+# Start the general answer while the decision model is still classifying (on/off)
+SPECULATIVE = os.getenv("JARVIS_SPECULATIVE", "off").lower() in ("on", "true", "1", "yes")
 
 if llm_client.client is None:
     print(f"ERROR: {llm_client.provider.upper()} API Key not loaded! Check spelling or .env location")
@@ -21,9 +27,6 @@ else:
     print(f"OK: Loaded {llm_client.provider.upper()} API client")
 
 
-messages = []
-
-
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which also has real-time up-to-date information from the internet.
 *** Do not tell time until I ask, do not talk too much, just answer the question.***
 *** Reply in only English, even if the question is in Hindi, reply in English.***
@@ -33,15 +36,6 @@ SystemChatBot = [
     {"role":"system","content": System}
 ]
 
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-chatlog_path = DATA_DIR / "Chatlog.json"
-try:
-    with open(chatlog_path, "r") as f:
-        messages = load(f)
-except FileNotFoundError:
-    with open(chatlog_path, "w") as f:
-        dump([],f)
-
 def RealtimeInformation():
     current_date_time = datetime.datetime.now()
     day = current_date_time.strftime("%A")
@@ -63,50 +57,196 @@ def AnswerModifire(Answer):
     modified_answer = '\n'.join(non_empty_lines)
     return modified_answer
 
-def ChatBot(Query):
-    """This function sends the user's query to the chatbot and returns the AI's response. """
+def ChatMessages(Query, budget: int = None, session=None, fold: bool = True):
+    session = session or sessions.default
+    return session.context_window.build(
+        SystemChatBot,
+        Query,
+        extra_system=[{"role":"system","content": RealtimeInformation()}],
+        budget=budget,
+        fold=fold
+    )
+
+def ChatCompletion(messages):
+    return llm_client.create_completion(
+        model="llama-3.3-70b-versatile",
+        messages=messages,
+        max_tokens=1024,
+        temperature=0.7,
+        top_p=1,
+        stream=True,
+        stop=None
+    )
+
+def FinishAnswer(Query, Answer, interrupted: bool = False, session=None):
+    """Record a spoken answer in the session's chat log and the response cache"""
+    session = session or sessions.default
+    Answer = Answer.replace("</s>","")
+    if interrupted:
+        # Keep what was said before the user cut in, but never cache a partial answer
+        if Answer.strip():
+            session.conversation.append_turn(Query, Answer.strip() + " [interrupted]")
+        return AnswerModifire(Answer=Answer)
+    session.conversation.append_turn(Query, Answer)
+    if RESPONSE_CACHE_ENABLED and session is sessions.default:
+        response_cache.put(Query, Answer)
+    return AnswerModifire(Answer=Answer)
 
+def TrackedPieces(pieces, produced: list):
+    """Pass the pieces through, keeping a copy, so a failed answer knows what was already said"""
     try:
-        chatlog_path = DATA_DIR / "Chatlog.json"
-        with open(chatlog_path, "r") as f:
-            messages = load(f)
-
-        messages.append({"role":"user","content": f"{Query}"})
-
-        completion = llm_client.create_completion(
-            model="llama-3.3-70b-versatile",
-            messages=SystemChatBot + [{"role":"system","content": RealtimeInformation()}] + messages,
-            max_tokens=1024,
-            temperature=0.7,
-            top_p=1,
-            stream=True,
-            stop=None
-        )
-
-        Answer = ""
-
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                content_piece = chunk.choices[0].delta.content
-                print(content_piece, end="", flush=True)  # 👈 Streaming effect
-                Answer += content_piece 
+        for piece in pieces:
+            produced.append(piece)
+            yield piece
+    finally:
+        # Closing this wrapper early (barge-in) closes the provider stream too
+        close = getattr(pieces, "close", None)
+        if close is not None:
+            close()
 
-        Answer = Answer.replace("</s>","")
+def ChatBot(Query, budget: int = None, cancel: threading.Event = None, session=None):
+    """This function sends the user's query to the chatbot and returns the AI's response. """
+    session = session or sessions.default
 
-        messages.append({"role":"assistant","content":Answer})
+    # The cache is the single local user's; answers never cross between sessions
+    if RESPONSE_CACHE_ENABLED and budget is None and session is sessions.default:
+        cached = response_cache.get(Query)
+        if cached is not None:
+            print(f"[CACHE] Answering from response cache: {Query}")
+            speech_pipeline.speak(cached)
+            session.conversation.append_turn(Query, cached)
+            return AnswerModifire(Answer=cached)
 
-        chatlog_path = DATA_DIR / "Chatlog.json"
-        with open(chatlog_path, "w") as f:
-            dump(messages, f, indent=4)
-        TextToSpeech(Answer)
-        return AnswerModifire(Answer=Answer)
+    produced = []
+    try:
+        started_at = time.perf_counter()
+        messages = ChatMessages(Query, budget, session)
+        requested_at = time.perf_counter()
+        completion = ChatCompletion(messages)
+
+        # Sentences are spoken while the rest of the answer is still streaming in
+        pieces = TrackedPieces(CompletionText(completion, echo=True, started_at=requested_at), produced)
+        Answer = speech_pipeline.speak_stream(pieces, started_at=started_at, cancel=cancel)
+        return FinishAnswer(Query, Answer, interrupted=cancel is not None and cancel.is_set(), session=session)
     
     except Exception as e:
         print(f"Error: {e}")
-        chatlog_path = DATA_DIR / "Chatlog.json"
-        with open(chatlog_path, "w") as f:
-            dump([], f, indent=4)
-        return ChatBot(Query)
+        if produced or (cancel is not None and cancel.is_set()):
+            # Part of the answer was already spoken (or the user cut in): asking again would repeat it
+            return FinishAnswer(Query, "".join(produced), interrupted=True, session=session)
+        if budget is not None:
+            raise
+        # Retry once with a smaller context in case the prompt was too large; the log is kept
+        return ChatBot(Query, budget=session.context_window.budget // 2, cancel=cancel, session=session)
+
+
+speculation_stats = {"started": 0, "committed": 0, "cancelled": 0, "wasted_completion_tokens": 0,
+                     "wasted_prompt_tokens": 0, "head_start_seconds": 0.0}
+# Speculations start, commit and cancel on different worker threads
+speculation_lock = threading.Lock()
+
+def SpeculationReport():
+    with speculation_lock:
+        report = dict(speculation_stats)
+    decided = report["committed"] + report["cancelled"]
+    report["hit_rate"] = report["committed"] / decided if decided else 0.0
+    return report
+
+
+class SpeculativeChat:
+    """
+    A ChatBot answer started before the decision model has classified the query.
+    The stream is buffered without side effects (no speech, no chat log, no cache)
+    until commit() speaks and records it, or cancel() throws it away.
+    """
+
+    def __init__(self, Query, session=None):
+        self.query = Query
+        self.session = session
+        self.started_at = time.perf_counter()
+        self.messages = []
+        self._pieces = []
+        self._ready = threading.Condition()
+        self._done = False
+        self._cancelled = False
+        self._error = None
+        with speculation_lock:
+            speculation_stats["started"] += 1
+        self._thread = threading.Thread(target=self._generate, daemon=True)
+        self._thread.start()
+
+    def _generate(self):
+        completion = None
+        try:
+            # Folding would write the rolling summary for a turn the DMM may still cancel
+            self.messages = ChatMessages(self.query, session=self.session, fold=False)
+            completion = ChatCompletion(self.messages)
+            for chunk in completion:
+                if self._cancelled:
+                    break
+                content_piece = chunk.choices[0].delta.content
+                if content_piece:
+                    with self._ready:
+                        self._pieces.append(content_piece)
+                        self._ready.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            close = getattr(completion, "close", None)
+            if self._cancelled and close:
+                close()
+            with self._ready:
+                self._done = True
+                self._ready.notify_all()
+
+    def _stream(self):
+        """Buffered pieces first, then the rest as it arrives"""
+        index = 0
+        while True:
+            with self._ready:
+                self._ready.wait_for(lambda: len(self._pieces) > index or self._done)
+                pieces = self._pieces[index:]
+                done = self._done
+            for piece in pieces:
+                index += 1
+                print(piece, end="", flush=True)
+                yield piece
+            if done and index >= len(self._pieces):
+                break
+        if self._error is not None:
+            raise self._error
+
+    def commit(self, cancel: threading.Event = None):
+        """Speak and record the speculative answer; falls back to a normal ChatBot call if it failed early"""
+        with speculation_lock:
+            speculation_stats["committed"] += 1
+            speculation_stats["head_start_seconds"] += time.perf_counter() - self.started_at
+        print(f"[SPECULATION] Committed (hit rate {SpeculationReport()['hit_rate']:.0%})")
+        try:
+            Answer = speech_pipeline.speak_stream(self._stream(), started_at=self.started_at, cancel=cancel)
+        except Exception as e:
+            if self._pieces:
+                raise
+            print(f"[SPECULATION] Speculative answer failed, asking again: {e}")
+            return ChatBot(self.query, cancel=cancel, session=self.session)
+        if cancel is not None and cancel.is_set():
+            self._cancelled = True
+            return FinishAnswer(self.query, Answer, interrupted=True, session=self.session)
+        return FinishAnswer(self.query, Answer, session=self.session)
+
+    def cancel(self):
+        self._cancelled = True
+        with self._ready:
+            text = "".join(self._pieces)
+        wasted_prompt = sum(MessageTokens(m) for m in self.messages)
+        with speculation_lock:
+            speculation_stats["cancelled"] += 1
+            speculation_stats["wasted_completion_tokens"] += EstimateTokens(text) if text else 0
+            speculation_stats["wasted_prompt_tokens"] += wasted_prompt
+        report = SpeculationReport()
+        print(f"[SPECULATION] Cancelled (hit rate {report['hit_rate']:.0%}, "
+              f"{report['wasted_completion_tokens']} completion tokens wasted so far)")
+
     
 if __name__ == "__main__":
     while True:
@@ -0,0 +1,405 @@
+"""
+Command Fast Path
+Deterministic pre-classifier for unambiguous commands ("open chrome and
+firefox", "volume up", "close notepad"). It answers in the same command
+list format as FirstLayerDMM, and returns None whenever it is not sure so
+the query goes to the remote model as before.
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+import re
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# on/off
+ENABLED = env_vars.get("COMMAND_FAST_PATH", "on").lower() not in ("off", "false", "0", "no")
+# Minimum confidence for answering locally instead of asking the remote model
+THRESHOLD = float(env_vars.get("COMMAND_FAST_PATH_THRESHOLD", 0.8))
+# Extra app or site names for open/close, comma separated (e.g. "obs,figma")
+EXTRA_APPS = [name.strip().lower() for name in env_vars.get("COMMAND_FAST_PATH_APPS", "").split(",") if name.strip()]
+
+# Names open/close may act on without asking the remote model. Anything else ("open fire",
+# "open sesame", "close call") could be an app as easily as an idiom, so the model decides
+APPS = {
+    "chrome", "google chrome", "firefox", "edge", "microsoft edge", "brave", "opera", "safari",
+    "notepad", "notepad++", "calculator", "paint", "file explorer", "explorer", "settings", "control panel",
+    "task manager", "command prompt", "cmd", "terminal", "powershell", "camera", "photos", "clock",
+    "word", "ms word", "microsoft word", "excel", "powerpoint", "outlook", "onenote", "teams",
+    "microsoft teams", "vs code", "vscode", "visual studio code", "visual studio", "pycharm", "android studio",
+    "spotify", "vlc", "itunes", "netflix", "prime video", "hotstar", "discord", "telegram", "whatsapp",
+    "skype", "zoom", "slack", "signal", "steam", "obs", "canva", "figma", "photoshop", "blender", "notion",
+    "youtube", "google", "gmail", "google drive", "google maps", "facebook", "instagram", "twitter", "x",
+    "linkedin", "reddit", "github", "stack overflow", "stackoverflow", "wikipedia", "amazon", "flipkart",
+    "chatgpt", "quora", "pinterest", "snapchat", "tiktok",
+} | set(EXTRA_APPS)
+# "github.com", "news.ycombinator.com"
+_SITE = re.compile(r"^[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:com|org|net|io|in|co|dev|app|ai|edu|gov)$")
+# Confidence for an open/close object that is not a known app, or a play argument that may
+# not be a song ("play dead", "play chess"): below the threshold, so the remote model decides
+_UNKNOWN_OBJECT = 0.6
+
+# Leading words that carry no intent
+_POLITE = re.compile(
+    r"^(?:(?:hey|ok|okay|hi)\s+)?(?:jarvis[\s,]+)?"
+    r"(?:(?:please|kindly|can you|could you|would you|will you|i want you to|i want to|go ahead and|just)\s+)*"
+)
+_TRAILING = re.compile(r"(?:\s+(?:please|for me|now|right now|jarvis))+$")
+
+# (command, verb phrases, confidence); longer phrases are tried first. Verbs that are just as often
+# idioms ("quit smoking", "kill time", "shut down the computer") score below the threshold, so the
+# remote model decides, but still mark where a new command starts in a multi-command request
+_VERBS = [
+    ("google search", ["google search", "search google for", "search on google for"], 1.0),
+    ("youtube search", ["youtube search", "search youtube for", "search on youtube for"], 1.0),
+    ("open", ["open up", "open"], 1.0),
+    ("open", ["launch"], 0.9),
+    ("close", ["close"], 1.0),
+    ("close", ["shut down", "quit", "kill", "exit"], 0.5),
+    ("play", ["play"], 1.0),
+    ("content", ["write me", "write", "draft", "compose"], 0.9),
+]
+
+# "search cats on google" / "search lofi music on youtube"
+_SEARCH_ON = re.compile(r"^(?:search|look up)\s+(?:for\s+)?(?P<arg>.+?)\s+on\s+(?P<site>google|youtube)$")
+
+# Whole-clause system commands and what FirstLayerDMM answers for them
+_SYSTEM = {
+    "mute": "mute", "mute the volume": "mute", "mute volume": "mute", "mute the sound": "mute",
+    "unmute": "unmute", "unmute the volume": "unmute", "unmute volume": "unmute", "unmute the sound": "unmute",
+    "volume up": "volume up", "increase volume": "volume up", "increase the volume": "volume up",
+    "turn up the volume": "volume up", "turn the volume up": "volume up", "raise the volume": "volume up",
+    "volume down": "volume down", "decrease volume": "volume down", "decrease the volume": "volume down",
+    "turn down the volume": "volume down", "turn the volume down": "volume down", "lower the volume": "volume down",
+}
+
+# Bare "quit" is left out: "I want to quit" is not a goodbye
+_EXIT = re.compile(r"^(?:bye|goodbye|good bye|bye bye|exit|see you(?: later)?|good night)(?:\s+jarvis)?$")
+
+# Things that make a clause a question or a conversation rather than a command
+_QUESTION = re.compile(r"\?|^(?:what|who|whom|whose|why|how|when|where|which|is|are|do|does|did|should|would)\b")
+# Objects that need up-to-date information or judgement; leave them to the remote model
+_VAGUE_OBJECTS = re.compile(r"^(?:it|that|this|them|those|these|something|anything|some|a|an|my)$")
+# App names have no indefinite article, possessive, pronoun or preposition ("launch a rocket",
+# "close your eyes", "open up to me")
+_NOT_AN_APP = re.compile(
+    r"^(?:a|an|some|my|your|his|her|our|their|it|this|that|up|to|with|about)\b|"
+    r"\b(?:with|between|to|for|about|from|into|of|me|us|you|him|them|enough|deal)\b"
+)
+# "play with me", "play a game": not a song
+_NOT_A_TITLE = re.compile(r"^(?:with|along|around|games?|a game|me|us|you|it|that|this|again)\b")
+# What makes a play argument certainly music: "the song believer", "let her go by one direction",
+# "shape of you on youtube"
+_SONG = re.compile(r"^(?:the\s+)?(?:song|track|music)\s+(?P<title>.+)$")
+_BY_ARTIST = re.compile(r"^\S.*\sby\s\S+")
+_ON_YOUTUBE = re.compile(r"\s+on\s+(?:youtube|spotify)$")
+
+_CONTENT_KINDS = re.compile(
+    r"^(?:an?\s+|the\s+|some\s+)?(?:application|letter|email|e-mail|essay|code|program|script|poem|song|note|"
+    r"notes|story|article|report|speech|leave application|cover letter|resume|blog post|summary)\b"
+)
+
+_CLAUSE_SPLIT = re.compile(r"(\s*(?:,|;|\band then\b|\bthen\b|\band also\b|\balso\b|\band\b|&)\s*)")
+_LIST_OBJECTS = ("open", "close")
+
+
+def _compile_verbs():
+    phrases = []
+    for command, verbs, confidence in _VERBS:
+        phrases += [(verb, command, confidence) for verb in verbs]
+    phrases.sort(key=lambda item: -len(item[0]))
+    lookup = {verb: (command, confidence) for verb, command, confidence in phrases}
+    pattern = re.compile(r"^(?P<verb>" + "|".join(re.escape(v) for v, _, _ in phrases) + r")(?:\s+(?P<arg>.*))?$")
+    return pattern, lookup
+
+
+_VERB_PATTERN, _VERB_LOOKUP = _compile_verbs()
+
+
+def Normalize(query: str) -> str:
+    text = query.lower().strip()
+    text = re.sub(r"[.!]+$", "", text).strip()
+    text = re.sub(r"\s+", " ", text)
+    text = _POLITE.sub("", text)
+    return _TRAILING.sub("", text).strip()
+
+
+def _clean_object(arg: str) -> str:
+    arg = re.sub(r"^(?:the|my)\s+", "", arg.strip())
+    arg = re.sub(r"\s+(?:app|application|website|browser)$", "", arg)
+    return arg.strip()
+
+
+def _is_app(name: str) -> bool:
+    return name in APPS or bool(_SITE.match(name))
+
+
+def _play(arg: str):
+    """(title, confidence) for a play argument"""
+    title = _ON_YOUTUBE.sub("", arg)
+    song = _SONG.match(title)
+    if song:
+        return song.group("title"), 1.0
+    if title != arg or _BY_ARTIST.match(title):
+        return title, 1.0
+    return title, _UNKNOWN_OBJECT
+
+
+class CommandFastPath:
+    """Compiled-pattern matcher for the DMM command vocabulary"""
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self.stats = {"hits": 0, "fallthrough": 0}
+
+    def _match_clause(self, clause: str, previous: str = None):
+        """Return (commands, confidence) for one clause; previous is the verb a bare object inherits"""
+        if not clause:
+            return [], 1.0
+        if _QUESTION.search(clause):
+            return None, 0.0
+        if _EXIT.match(clause):
+            return ["exit"], 1.0
+        if clause in _SYSTEM:
+            return [f"system {_SYSTEM[clause]}"], 1.0
+
+        searched = _SEARCH_ON.match(clause)
+        if searched:
+            return [f"{searched.group('site')} search {searched.group('arg')}"], 0.9
+
+        verb = _VERB_PATTERN.match(clause)
+        if verb is None:
+            if previous in _LIST_OBJECTS and len(clause.split()) <= 3 and not _NOT_AN_APP.search(clause):
+                # "open chrome and firefox": the second object inherits the verb
+                obj = _clean_object(clause)
+                if obj and not _VAGUE_OBJECTS.match(obj):
+                    return [f"{previous} {obj}"], 0.9 if _is_app(obj) else _UNKNOWN_OBJECT
+            return None, 0.0
+
+        command, confidence = _VERB_LOOKUP[verb.group("verb")]
+        arg = (verb.group("arg") or "").strip()
+        if not arg or _VAGUE_OBJECTS.match(arg):
+            return None, 0.0
+
+        if command in _LIST_OBJECTS:
+            if _NOT_AN_APP.search(arg):
+                return None, 0.0
+            obj = _clean_object(arg)
+            if not _is_app(obj):
+                confidence = min(confidence, _UNKNOWN_OBJECT)
+            return [f"{command} {obj}"], confidence
+        if command == "play":
+            if _NOT_A_TITLE.match(arg):
+                return None, 0.0
+            title, score = _play(arg)
+            return [f"play {title}"], min(confidence, score)
+        if command == "content":
+            if not _CONTENT_KINDS.match(arg):
+                # "write down my thoughts" is not a document request
+                return None, 0.0
+            arg = re.sub(r"^(?:an?|the|some)\s+", "", arg)
+        return [f"{command} {arg}"], confidence
+
+    def match(self, query: str):
+        """Return (commands, confidence); commands is None when some part is not understood"""
+        text = Normalize(query)
+        if not text:
+            return None, 0.0
+
+        # Free-text arguments (songs, topics) may contain "and"; only split where a new command starts
+        pieces = _CLAUSE_SPLIT.split(text)
+        clauses = []
+        for index in range(0, len(pieces), 2):
+            part = pieces[index]
+            if not part:
+                continue
+            starts_command = (_VERB_PATTERN.match(part) or part in _SYSTEM or _EXIT.match(part)
+                              or _SEARCH_ON.match(part))
+            if clauses and not starts_command and clauses[-1][1] not in _LIST_OBJECTS:
+                # Not a new command: glue it back on with its original separator
+                clauses[-1] = (clauses[-1][0] + pieces[index - 1] + part, clauses[-1][1])
+                continue
+            verb = _VERB_PATTERN.match(part)
+            if verb:
+                clauses.append((part, _VERB_LOOKUP[verb.group("verb")][0]))
+            else:
+                # A bare object keeps the verb of the list it belongs to
+                clauses.append((part, clauses[-1][1] if clauses and not starts_command else None))
+
+        commands = []
+        confidence = 1.0
+        previous = None
+        for clause, verb in clauses:
+            result, score = self._match_clause(clause, previous)
+            if result is None:
+                return None, 0.0
+            commands += result
+            confidence = min(confidence, score)
+            previous = verb
+        if not commands:
+            return None, 0.0
+        return commands, confidence
+
+    def classify(self, query: str):
+        """Command list in FirstLayerDMM format, or None when the remote model should decide"""
+        commands, confidence = self.match(query)
+        if commands is None or confidence < self.threshold:
+            self.stats["fallthrough"] += 1
+            return None
+        self.stats["hits"] += 1
+        return commands
+
+
+# Shared instance used by main.py before FirstLayerDMM
+fast_path = CommandFastPath()
+
+
+# Expected decisions; None means the query must go to the remote model
+CORPUS = [
+    ("open chrome", ["open chrome"]),
+    ("Open Chrome.", ["open chrome"]),
+    ("open chrome and firefox", ["open chrome", "open firefox"]),
+    ("open chrome, firefox and telegram", ["open chrome", "open firefox", "open telegram"]),
+    ("please open notepad", ["open notepad"]),
+    ("jarvis open the calculator app", ["open calculator"]),
+    ("can you open youtube for me", ["open youtube"]),
+    ("launch spotify", ["open spotify"]),
+    ("open facebook and close whatsapp", ["open facebook", "close whatsapp"]),
+    ("close notepad", ["close notepad"]),
+    ("close chrome and telegram", ["close chrome", "close telegram"]),
+    ("quit spotify", None),
+    ("play let her go", None),
+    ("play the song let her go", ["play let her go"]),
+    ("play afsanay by ys", ["play afsanay by ys"]),
+    ("play the song rock and roll all night", ["play rock and roll all night"]),
+    ("play believer by imagine dragons and open chrome", ["play believer by imagine dragons", "open chrome"]),
+    ("open github.com", ["open github.com"]),
+    ("volume up", ["system volume up"]),
+    ("turn down the volume", ["system volume down"]),
+    ("mute", ["system mute"]),
+    ("unmute the volume", ["system unmute"]),
+    ("mute and open chrome", ["system mute", "open chrome"]),
+    ("google search python tutorials", ["google search python tutorials"]),
+    ("search cats on google", ["google search cats"]),
+    ("youtube search lofi beats", ["youtube search lofi beats"]),
+    ("search lofi music on youtube", ["youtube search lofi music"]),
+    ("write an application for sick leave", ["content application for sick leave"]),
+    ("write a poem about the rain", ["content poem about the rain"]),
+    ("write code for a calculator in python", ["content code for a calculator in python"]),
+    ("bye", ["exit"]),
+    ("bye jarvis", ["exit"]),
+    ("goodbye", ["exit"]),
+    ("how are you?", None),
+    ("who was akbar?", None),
+    ("what is python programming language?", None),
+    ("what's the time?", None),
+    ("who is indian prime minister", None),
+    ("tell me about facebook's recent update.", None),
+    ("open it", None),
+    ("play something", None),
+    ("close this", None),
+    ("write down that i was here", None),
+    ("what is today's date and remind me to call mom at 5pm", None),
+    ("set a reminder at 9:00pm on 25th june for my business meeting", None),
+    ("do you like pizza?", None),
+    ("how close is the moon", None),
+    ("is chrome open", None),
+    ("thanks, i really liked it.", None),
+    ("open chrome and tell me about mahatma gandhi", None),
+    ("chat with me.", None),
+    ("generate image of a lion", None),
+]
+
+# Held out: never used to tune the patterns above, only to check them. Mostly everyday phrases that
+# start like a command but are not one; a wrong answer here runs an action at full confidence
+HELD_OUT = [
+    ("shut down the computer", None),
+    ("quit smoking", None),
+    ("kill time", None),
+    ("exit the conversation", None),
+    ("google is a great company", None),
+    ("launch a rocket", None),
+    ("close your eyes", None),
+    ("play with me", None),
+    ("play a game with me", None),
+    ("play it again", None),
+    ("open your heart", None),
+    ("open up to me", None),
+    ("open a new chapter in my life", None),
+    ("close the deal", None),
+    ("close enough", None),
+    ("kill the lights", None),
+    ("quit my job", None),
+    ("launch my career", None),
+    ("exit strategy for startups", None),
+    ("google it", None),
+    ("write something nice", None),
+    ("play along", None),
+    ("open the door for me", None),
+    ("close the gap between us", None),
+    ("I want to quit", None),
+    ("can you close it", None),
+    ("open vlc", ["open vlc"]),
+    ("close discord and spotify", ["close discord", "close spotify"]),
+    ("please launch the zoom app", ["open zoom"]),
+    ("play shape of you by ed sheeran", ["play shape of you by ed sheeran"]),
+    ("play shape of you", None),
+    ("play shape of you on youtube", ["play shape of you"]),
+    ("volume down", ["system volume down"]),
+    ("youtube search cooking pasta", ["youtube search cooking pasta"]),
+    ("quit chrome", None),
+    ("open source software is great", None),
+    ("open fire", None),
+    ("open sesame", None),
+    ("open wide", None),
+    ("play dead", None),
+    ("play the fool", None),
+    ("play hard to get", None),
+    ("play football", None),
+    ("play cricket", None),
+    ("play chess", None),
+    ("close call", None),
+    ("close all windows", None),
+]
+
+
+def _score(matcher, corpus, label: str):
+    correct = answered = wrong = missed = 0
+    for query, expected in corpus:
+        got = matcher.classify(query)
+        if got is not None:
+            answered += 1
+        if got == expected:
+            correct += 1
+        elif got is None:
+            missed += 1
+            print(f"  fell through  : {query!r} (expected {expected})")
+        else:
+            wrong += 1
+            print(f"  WRONG         : {query!r} -> {got} (expected {expected})")
+    commands = sum(1 for _, expected in corpus if expected is not None)
+    print(f"{label:<16}: {len(corpus)} utterances ({commands} commands, {len(corpus) - commands} for the remote model)")
+    print(f"{'accuracy':<16}: {correct}/{len(corpus)} = {correct / len(corpus):.1%}")
+    print(f"{'answered locally':<16}: {answered} ({answered / len(corpus):.0%}), wrong: {wrong}, missed commands: {missed}")
+    return wrong
+
+
+def _evaluate(corpus=CORPUS, held_out=HELD_OUT, rounds: int = 200):
+    """Accuracy and latency of the fast path on the labelled corpus and on the held-out set"""
+    import time
+
+    matcher = CommandFastPath()
+    _score(matcher, corpus, "corpus")
+    _score(matcher, held_out, "held out")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query, _ in corpus:
+            matcher.classify(query)
+    per_query = (time.perf_counter() - start) / (rounds * len(corpus)) * 1e6
+
+    print(f"latency         : {per_query:.1f} us per utterance")
+
+
+if __name__ == "__main__":
+    _evaluate()
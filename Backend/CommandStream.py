@@ -0,0 +1,117 @@
+"""
+Streaming Command Parser
+Turns the FirstLayerDMM event stream into commands while it is still
+streaming, so "open chrome, open spotify, general tell me about X" can
+start opening apps before the model has finished the last command.
+"""
+import time
+
+# Same vocabulary as JarvisBrain; multi-word names first so "generate image" wins over "general"
+FUNCS = ["generate image", "google search", "youtube search", "exit", "general", "realtime", "open", "close",
+         "play", "system", "content", "reminder"]
+# Short commands that never contain a comma are complete as soon as their comma arrives
+IMMEDIATE = ("open", "close", "play", "system", "google search", "youtube search", "exit")
+# Parsed so a comma inside an image prompt is not taken for the next command, but nothing in
+# JarvisBrain generates images: dropped, as the old command filter did
+UNROUTED = ("generate image",)
+
+
+def _func(segment: str):
+    return next((f for f in FUNCS if segment.startswith(f)), None)
+
+
+def _could_start_command(text: str) -> bool:
+    """True while the beginning of a segment may still turn out to be a command name"""
+    return any(f.startswith(text) or text.startswith(f) for f in FUNCS)
+
+
+def StreamCommands(events):
+    """
+    Yield each complete command from a DMM event stream as soon as it is known.
+    Free-text commands (general, realtime, content, ...) may contain commas, so they
+    are held until the next segment is seen to start a new command, or the stream ends.
+    """
+    for command in _parse(events):
+        if _func(command) not in UNROUTED:
+            yield command
+
+
+def _parse(events):
+    """Every command in the stream, in order, including the ones nothing handles"""
+    pending = None      # free-text command that may still continue after a comma
+    continuing = False  # the text after the last comma belongs to pending
+    buffer = ""         # text after the last comma
+
+    for event in events:
+        if getattr(event, "event_type", None) != "text-generation":
+            continue
+        buffer += event.text.replace("\n", " ")
+
+        while True:
+            head = buffer.lstrip()
+            if pending is not None and not continuing and head:
+                # Does the text after the comma start a new command or continue the last one?
+                if _func(head):
+                    yield pending
+                    pending = None
+                elif not _could_start_command(head):
+                    continuing = True
+                else:
+                    # Not enough characters yet to tell
+                    break
+            if "," not in buffer:
+                break
+            segment, buffer = buffer.split(",", 1)
+            if pending is not None:
+                pending = pending + "," + segment
+                continuing = False
+                continue
+            segment = segment.strip()
+            if not _func(segment):
+                continue
+            if _func(segment) in IMMEDIATE:
+                yield segment
+            else:
+                pending = segment
+
+    tail = buffer.strip()
+    if pending is not None:
+        if continuing or (tail and not _func(tail)):
+            pending = pending + "," + buffer
+            tail = ""
+        yield pending.strip()
+    if tail and _func(tail):
+        yield tail
+
+
+def _demo(token_delay: float = 0.05):
+    """Time to first action: drain-then-split vs the streaming parser, on a fake DMM stream"""
+    from types import SimpleNamespace
+
+    answer = "open chrome, open spotify, general thanks, i really liked it. tell me about the taj mahal"
+    pieces = [answer[i:i + 4] for i in range(0, len(answer), 4)]
+
+    def fake_stream():
+        for piece in pieces:
+            time.sleep(token_delay)
+            yield SimpleNamespace(event_type="text-generation", text=piece)
+        yield SimpleNamespace(event_type="stream-end")
+
+    start = time.perf_counter()
+    response = "".join(e.text for e in fake_stream() if e.event_type == "text-generation")
+    drained = [c.strip() for c in response.replace("\n,", "").split(",") if _func(c.strip())]
+    drained_at = time.perf_counter() - start
+
+    start = time.perf_counter()
+    streamed = []
+    for command in StreamCommands(fake_stream()):
+        streamed.append((command, time.perf_counter() - start))
+
+    print(f"stream of {len(pieces)} events, {token_delay * 1000:.0f} ms apart")
+    print(f"drain then split: first action at {drained_at * 1000:.0f} ms -> {drained}")
+    for command, at in streamed:
+        print(f"streaming       : {command!r} at {at * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    _demo()
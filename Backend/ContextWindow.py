@@ -0,0 +1,222 @@
+"""
+Token-budgeted Context Window
+Builds each prompt within a token budget: recent turns go in verbatim and
+older turns are folded into a rolling summary that is cached in Data/.
+The summary call runs on a background thread; prompts built while it runs
+use the previous summary and the newest turns that fit.
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+from .ConversationState import conversation
+from .LLMProvider import llm_client
+import threading
+import json
+import os
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# Total prompt budget (system prompts + summary + history + query)
+TOKEN_BUDGET = int(env_vars.get("CONTEXT_TOKEN_BUDGET", 3000))
+# Upper bound for the rolling summary of older turns
+SUMMARY_TOKENS = int(env_vars.get("CONTEXT_SUMMARY_TOKENS", 300))
+# When folding, trim the verbatim history down to this share of the space left for it,
+# so the summary is only recomputed every few turns instead of on every turn
+FOLD_TARGET = float(env_vars.get("CONTEXT_FOLD_TARGET", 0.6))
+
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+SUMMARY_PROMPT = """You maintain a short running summary of a conversation between a user and an AI assistant.
+Update the existing summary with the new messages. Keep names, facts, preferences and open questions.
+Answer with the updated summary only, in at most {limit} words."""
+
+
+def EstimateTokens(text: str) -> int:
+    """Cheap provider-agnostic token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def MessageTokens(message: dict) -> int:
+    # Role markers and separators cost a few tokens per message on every provider
+    return EstimateTokens(str(message.get("content", ""))) + 4
+
+
+class ContextWindow:
+    """Builds prompts from a conversation history within a token budget, with a cached rolling summary"""
+
+    # History is read newest first, this many messages at a time, only as far back as the budget reaches
+    READ_CHUNK = 32
+
+    def __init__(self, store, budget: int = TOKEN_BUDGET, summary_tokens: int = SUMMARY_TOKENS,
+                 summary_path=DATA_DIR / "ChatSummary.json", summarizer=None):
+        self.store = store
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.summary_path = Path(summary_path)
+        self.summarizer = summarizer or self._llm_summarize
+        self.last_report = {}
+        self._lock = threading.Lock()
+        self._summary = self._load_summary()
+        self._folder = None
+        # Bumped by reset() so a fold started before it is thrown away
+        self._generation = 0
+
+    # --------------------------------------------------------------- summary
+
+    def _load_summary(self):
+        try:
+            with open(self.summary_path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+            if isinstance(summary, dict) and "upto" in summary and "text" in summary:
+                return summary
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return {"upto": 0, "text": ""}
+
+    def _save_summary(self):
+        self.summary_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.summary_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._summary, f, indent=4)
+        os.replace(temp_path, self.summary_path)
+
+    def _llm_summarize(self, previous: str, messages: list) -> str:
+        limit = max(20, int(self.summary_tokens * 0.75))
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        completion = llm_client.create_completion(
+            model=SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT.format(limit=limit)},
+                {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"}
+            ],
+            max_tokens=self.summary_tokens,
+            temperature=0.2,
+            top_p=1,
+            stream=True
+        )
+        return "".join(chunk.choices[0].delta.content or "" for chunk in completion).strip()
+
+    def _extractive_summary(self, previous: str, messages: list) -> str:
+        """Fallback when the summarizer call fails: keep the start of each message"""
+        lines = [previous] if previous else []
+        lines += [f"{m['role']}: {str(m['content'])[:120]}" for m in messages]
+        text = "\n".join(lines)
+        max_chars = self.summary_tokens * 4
+        return text[-max_chars:]
+
+    def _fold(self, previous: dict, upto: int, generation: int):
+        """Fold messages [previous.upto, upto) into the rolling summary (background thread, without the lock)"""
+        older = self.store.read(previous["upto"], upto)
+        if not older:
+            return
+        # A migrated or very long unsummarized backlog is capped so the summary call stays small
+        kept, start = 0, len(older)
+        while start > 0 and kept + MessageTokens(older[start - 1]) <= self.budget * 2:
+            start -= 1
+            kept += MessageTokens(older[start])
+        older = older[start:]
+        try:
+            text = self.summarizer(previous["text"], older)
+        except Exception as e:
+            print(f"[WARN] Context summary failed, using extractive fallback: {e}")
+            text = self._extractive_summary(previous["text"], older)
+        with self._lock:
+            if self._generation != generation or self._summary != previous:
+                # Reset (or the log was replaced) while the summary was being written
+                return
+            self._summary = {"upto": upto, "text": text}
+            self._save_summary()
+
+    def _start_fold(self, upto: int):
+        """Fold in the background unless a fold is already running (call with the lock held)"""
+        if self._folder is not None and self._folder.is_alive():
+            return
+        self._folder = threading.Thread(target=self._fold, args=(dict(self._summary), upto, self._generation),
+                                        name="ContextFold", daemon=True)
+        self._folder.start()
+
+    def wait(self, timeout: float = None):
+        """Wait for a running fold to finish (tests, shutdown)"""
+        folder = self._folder
+        if folder is not None:
+            folder.join(timeout)
+
+    def reset(self):
+        with self._lock:
+            self._generation += 1
+            self._summary = {"upto": 0, "text": ""}
+            self._save_summary()
+
+    # ---------------------------------------------------------------- build
+
+    def build(self, system_messages: list, query: str, extra_system: list = None, budget: int = None,
+              fold: bool = True) -> list:
+        """
+        Return system prompts + summary + as many recent turns as fit + extra_system + the user query.
+        system_messages must be static; per-request data (time, search results) goes in extra_system,
+        after the history, so the prompt prefix stays identical between turns for provider prefix caching.
+        When the history no longer fits, older turns are folded into the summary in the background
+        (unless fold is False); until that finishes only the newest turns that fit are sent.
+        """
+        budget = budget or self.budget
+        extra_system = extra_system or []
+        query_message = {"role": "user", "content": f"{query}"}
+
+        with self._lock:
+            total = len(self.store)
+            if self._summary["upto"] > total:
+                # The log was cleared or replaced underneath us
+                self._generation += 1
+                self._summary = {"upto": 0, "text": ""}
+
+            fixed_tokens = sum(MessageTokens(m) for m in system_messages + extra_system + [query_message])
+            available = max(0, budget - fixed_tokens - self.summary_tokens)
+
+            # Only the tail is read: once the newest messages overflow the budget the rest is never used
+            history, history_tokens = [], []
+            first, kept = total, 0
+            while first > self._summary["upto"] and kept <= available:
+                begin = max(self._summary["upto"], first - self.READ_CHUNK)
+                chunk = self.store.read(begin, first)
+                tokens = [MessageTokens(m) for m in chunk]
+                history, history_tokens = chunk + history, tokens + history_tokens
+                kept += sum(tokens)
+                first = begin
+
+            if kept > available:
+                # Fold enough old turns that the next few turns fit without another summary call
+                if fold:
+                    target = available * FOLD_TARGET
+                    kept, start = 0, len(history)
+                    while start > 0 and kept + history_tokens[start - 1] <= target:
+                        start -= 1
+                        kept += history_tokens[start]
+                    self._start_fold(first + start)
+                # This prompt keeps the current summary and the newest turns that fit
+                kept, start = 0, len(history)
+                while start > 0 and kept + history_tokens[start - 1] <= available:
+                    start -= 1
+                    kept += history_tokens[start]
+                history = history[start:]
+
+            summary_messages = []
+            if self._summary["text"]:
+                summary_messages = [{"role": "system",
+                                     "content": f"Summary of the earlier conversation:\n{self._summary['text']}"}]
+
+            prompt = system_messages + summary_messages + history + extra_system + [query_message]
+            self.last_report = {
+                "prompt_tokens": sum(MessageTokens(m) for m in prompt),
+                "budget": budget,
+                "verbatim_messages": len(history),
+                "summarized_messages": self._summary["upto"],
+                "summary_tokens": sum(MessageTokens(m) for m in summary_messages),
+                "folding": self._folder is not None and self._folder.is_alive()
+            }
+            print(f"[CONTEXT] ~{self.last_report['prompt_tokens']} prompt tokens "
+                  f"({len(history)} recent messages, {self._summary['upto']} summarized)")
+            return prompt
+
+
+# Shared context window over the shared conversation
+context_window = ContextWindow(conversation)
@@ -0,0 +1,181 @@
+"""
+Shared Conversation State
+Single in-memory owner of the chat history for every module. Turns are
+appended atomically behind a lock and written to the ChatLogStore by a
+background write-behind thread in batches.
+"""
+from pathlib import Path
+from collections import deque
+from dotenv import dotenv_values
+from .ChatLogStore import chatlog_store, TAIL_SIZE
+import threading
+import atexit
+import time
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# Seconds between background flushes
+FLUSH_INTERVAL = float(env_vars.get("CHATLOG_FLUSH_INTERVAL", 0.5))
+# Maximum number of messages written in one batch
+FLUSH_BATCH = int(env_vars.get("CHATLOG_FLUSH_BATCH", 64))
+# always: fsync after every batch, interval: at most once per CHATLOG_FSYNC_INTERVAL, never: leave it to the OS
+FSYNC_POLICY = env_vars.get("CHATLOG_FSYNC", "interval").lower()
+FSYNC_INTERVAL = float(env_vars.get("CHATLOG_FSYNC_INTERVAL", 5))
+
+
+class ConversationState:
+    """Lock-protected conversation history with write-behind persistence"""
+
+    def __init__(self, store, flush_interval: float = FLUSH_INTERVAL, batch_size: int = FLUSH_BATCH,
+                 fsync: str = FSYNC_POLICY, fsync_interval: float = FSYNC_INTERVAL, tail_size: int = TAIL_SIZE,
+                 background: bool = True):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flushed = threading.Condition(self._lock)
+        self._pending = []
+        self._writing = 0
+        self._tail = deque(store.tail(), maxlen=tail_size)
+        self._count = len(store)
+        self._version = 0
+        self._last_fsync = time.monotonic()
+        self._closed = False
+        # Without a write-behind thread (one per session would not scale) turns are written as they are appended
+        self._writer = None
+        if background:
+            self._writer = threading.Thread(target=self._write_behind, daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    # ---------------------------------------------------------------- writes
+
+    def append(self, message: dict):
+        self.extend([message])
+
+    def extend(self, messages: list):
+        """Append messages as one unit; no other writer can interleave with them"""
+        with self._lock:
+            for message in messages:
+                self._pending.append(message)
+                self._tail.append(message)
+            self._count += len(messages)
+            self._version += 1
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify()
+        if self._writer is None:
+            self._write_pending()
+
+    def append_turn(self, query: str, answer: str):
+        self.extend([
+            {"role": "user", "content": f"{query}"},
+            {"role": "assistant", "content": answer}
+        ])
+
+    # ----------------------------------------------------------------- reads
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def snapshot(self, n: int = None):
+        """Return (version, last n messages) as one consistent copy"""
+        with self._lock:
+            messages = list(self._tail)
+            if n is not None:
+                messages = messages[-n:] if n > 0 else []
+            return self._version, messages
+
+    def tail(self, n: int = None) -> list:
+        return self.snapshot(n)[1]
+
+    def read(self, start: int = 0, stop: int = None) -> list:
+        """Return messages[start:stop]; older ranges are read from disk after a flush"""
+        with self._lock:
+            stop = self._count if stop is None else min(stop, self._count)
+            tail_start = self._count - len(self._tail)
+            if start >= tail_start:
+                tail = list(self._tail)
+                return tail[max(0, start) - tail_start:stop - tail_start]
+        self.flush()
+        return self.store.read(start, stop)
+
+    # ----------------------------------------------------------- persistence
+
+    def _write_batch(self, batch):
+        self.store.extend(batch)
+        now = time.monotonic()
+        if self.fsync == "always" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+            self.store.sync()
+            self._last_fsync = now
+
+    def _write_behind(self):
+        while True:
+            with self._lock:
+                if not self._pending and not self._closed:
+                    self._wakeup.wait(timeout=self.flush_interval)
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch = self._pending[:self.batch_size]
+                del self._pending[:len(batch)]
+                self._writing += 1
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"[ERROR] Chat log write failed, will retry: {e}")
+                with self._lock:
+                    self._pending[:0] = batch
+                time.sleep(self.flush_interval)
+            finally:
+                with self._lock:
+                    self._writing -= 1
+                    self._flushed.notify_all()
+
+    def _write_pending(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            print(f"[ERROR] Chat log write failed, will retry: {e}")
+            with self._lock:
+                self._pending[:0] = batch
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything appended so far is on disk"""
+        if self._writer is None:
+            self._write_pending()
+            self.store.sync()
+            return not self._pending
+        with self._lock:
+            self._wakeup.notify()
+            done = self._flushed.wait_for(lambda: not self._pending and not self._writing, timeout=timeout)
+        if done:
+            self.store.sync()
+        return done
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        self.store.close()
+
+
+# Shared conversation used by Chatbot, RealtimeSearchEngine and the context window
+conversation = ConversationState(chatlog_store)
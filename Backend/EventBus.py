@@ -0,0 +1,301 @@
+"""
+Event Bus
+In-process publish/subscribe between the brain and the GUI. Status text,
+microphone state, responses and partial answer tokens are typed events and
+the latest one of each type is kept in memory, so reading the current state
+never touches the disk. The GUI gets events as Qt signals, backend threads
+through thread-safe queues, and FileMirror can still write the old
+Frontend/Files/*.data files for external tools.
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+import threading
+import queue
+import time
+import os
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+FILES_DIR = BASE_DIR / "Frontend" / "Files"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# Keep writing Status.data / Mic.data / Responses.data for external tools (on/off)
+FILE_MIRROR = env_vars.get("EVENT_BUS_FILE_MIRROR", "off").lower() in ("on", "true", "1", "yes")
+
+
+class Event:
+    __slots__ = ("timestamp",)
+
+    def __init__(self):
+        self.timestamp = time.time()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class StatusEvent(Event):
+    """Assistant status line ("Listening...", "Thinking...", ...)"""
+    __slots__ = ("status",)
+
+    def __init__(self, status: str):
+        super().__init__()
+        self.status = status
+
+
+class MicEvent(Event):
+    """Microphone button turned on or off"""
+    __slots__ = ("active",)
+
+    def __init__(self, active: bool):
+        super().__init__()
+        self.active = active
+
+
+class ResponseEvent(Event):
+    """A complete line for the chat screen ("You: ...", "JARVIS: ...")"""
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        super().__init__()
+        self.text = text
+
+
+class TokenEvent(Event):
+    """A piece of an answer while it is still streaming; answer identifies the stream it belongs to"""
+    __slots__ = ("text", "answer")
+
+    def __init__(self, text: str, answer: int = 0):
+        super().__init__()
+        self.text = text
+        self.answer = answer
+
+
+class EventBus:
+    """Typed publish/subscribe; handlers run on the publishing thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}
+        self._last = {}
+
+    def subscribe(self, event_type, handler):
+        """Call handler(event) for every event of that type; returns a function that unsubscribes"""
+        with self._lock:
+            self._handlers[event_type] = self._handlers.get(event_type, ()) + (handler,)
+
+        def unsubscribe():
+            with self._lock:
+                self._handlers[event_type] = tuple(h for h in self._handlers.get(event_type, ()) if h is not handler)
+        return unsubscribe
+
+    def queue(self, *event_types, maxsize: int = 0) -> queue.Queue:
+        """A thread-safe queue that receives every event of the given types"""
+        events = queue.Queue(maxsize=maxsize)
+        for event_type in event_types:
+            self.subscribe(event_type, events.put)
+        return events
+
+    def publish(self, event: Event):
+        with self._lock:
+            self._last[type(event)] = event
+            handlers = self._handlers.get(type(event), ())
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"[WARN] Event handler failed for {type(event).__name__}: {e}")
+
+    def last(self, event_type, default=None):
+        """Most recent event of that type, without waiting"""
+        return self._last.get(event_type, default)
+
+
+class FileMirror:
+    """Writes the latest status, mic state and response to the legacy .data files"""
+
+    FILES = {
+        StatusEvent: ("Status.data", lambda event: event.status),
+        MicEvent: ("Mic.data", lambda event: "True" if event.active else "False"),
+        ResponseEvent: ("Responses.data", lambda event: event.text),
+    }
+
+    def __init__(self, bus: EventBus, directory=FILES_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._unsubscribe = [bus.subscribe(event_type, self._write) for event_type in self.FILES]
+
+    def _write(self, event: Event):
+        filename, text = self.FILES[type(event)]
+        with open(self.directory / filename, "w", encoding="utf-8") as file:
+            file.write(text(event))
+
+    def close(self):
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+
+
+# Shared bus for the brain, the backend modules and the GUI
+event_bus = EventBus()
+file_mirror = FileMirror(event_bus) if FILE_MIRROR else None
+
+
+def _syscalls():
+    """Read and write syscalls made by this process so far (Linux only)"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["syscr"]) + int(counters["syscw"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _benchmark(utterance_seconds: float = 4.0, tokens: int = 150):
+    """
+    File operations and read/write syscalls for one utterance: the file-based IPC
+    (GUI polling every 5 ms, mic polled every 100 ms) vs the bus with and without FileMirror
+    """
+    import tempfile
+    import sys
+
+    opens = [0]
+    sys.addaudithook(lambda name, args: name == "open" and opens.__setitem__(0, opens[0] + 1))
+
+    statuses = ["Listening...", "Processing...", "Thinking...", "Analyzing command...", "Thinking...", "Ready"]
+    responses = ["You: tell me about the taj mahal", "JARVIS: Let me think about that...",
+                 "JARVIS: The Taj Mahal is a mausoleum in Agra."]
+    gui_ticks = int(utterance_seconds / 0.005)
+    mic_polls = int(utterance_seconds / 0.1)
+
+    def legacy(directory):
+        def write(name, text):
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+                f.write(text)
+
+        def read(name):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                return f.read()
+
+        write("Mic.data", "True")
+        for status in statuses:
+            write("Status.data", status)
+        for response in responses:
+            write("Responses.data", response)
+        write("Mic.data", "False")
+        for _ in range(mic_polls):
+            read("Mic.data")
+        for _ in range(gui_ticks):
+            # ChatSection.loadMessages + ChatSection.SpeechRecogText + InitialScreen.SpeechRecogText
+            read("Responses.data")
+            os.path.exists(os.path.join(directory, "Status.data"))
+            read("Status.data")
+            os.path.exists(os.path.join(directory, "Status.data"))
+            read("Status.data")
+
+    def bus_run(directory, mirror):
+        bus = EventBus()
+        if mirror:
+            FileMirror(bus, directory)
+        gui = bus.queue(StatusEvent, ResponseEvent, TokenEvent)
+        bus.publish(MicEvent(True))
+        for status in statuses:
+            bus.publish(StatusEvent(status))
+        for i in range(tokens):
+            bus.publish(TokenEvent("word ", 1))
+        for response in responses:
+            bus.publish(ResponseEvent(response))
+        bus.publish(MicEvent(False))
+        for _ in range(mic_polls):
+            bus.last(MicEvent)
+        while not gui.empty():
+            gui.get_nowait()
+
+    print(f"one utterance of {utterance_seconds:.0f}s ({len(statuses)} status updates, "
+          f"{len(responses)} responses, {tokens} tokens)")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("Mic.data", "Status.data", "Responses.data"):
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+                f.write("")
+        for label, run in [("file IPC", lambda: legacy(directory)),
+                           ("event bus", lambda: bus_run(directory, False)),
+                           ("bus + FileMirror", lambda: bus_run(directory, True))]:
+            before_opens, before_syscalls = opens[0], _syscalls()
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+            after_syscalls = _syscalls()
+            syscalls = after_syscalls - before_syscalls - 2 if before_syscalls is not None else None
+            print(f"{label:17}: {opens[0] - before_opens - 2:6d} file opens, "
+                  f"{syscalls if syscalls is not None else 'n/a':>6} read/write syscalls, {seconds * 1000:7.1f} ms of work")
+
+
+def _mic_benchmark(clicks: int = 10, idle_seconds: float = 3.0):
+    """Click-to-listening latency and idle wakeups: 100 ms Mic.data polling vs blocking on a bus queue"""
+    import tempfile
+    import random
+
+    def polling(directory, latencies, stats, stop):
+        path = os.path.join(directory, "Mic.data")
+        last = "False"
+        while not stop.is_set():
+            stats["wakeups"] += 1
+            with open(path, "r", encoding="utf-8") as f:
+                status = f.read().strip()
+            if status == "True" and last == "False":
+                latencies.append(time.time() - clicked_at[0])
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write("False")
+                status = "False"
+            last = status
+            time.sleep(0.1)
+
+    def blocking(bus, latencies, stats, stop):
+        events = bus.queue(MicEvent)
+        while not stop.is_set():
+            event = events.get()
+            stats["wakeups"] += 1
+            if event.active:
+                latencies.append(time.time() - event.timestamp)
+
+    def run(label, target, click, wake):
+        latencies, stats, stop = [], {"wakeups": 0}, threading.Event()
+        worker = threading.Thread(target=target, args=(latencies, stats, stop), daemon=True)
+        worker.start()
+        time.sleep(idle_seconds)
+        idle_wakeups = stats["wakeups"]
+        for _ in range(clicks):
+            time.sleep(random.uniform(0.05, 0.25))
+            click()
+        time.sleep(0.3)
+        stop.set()
+        wake()
+        worker.join()
+        latencies.sort()
+        print(f"{label:12}: click-to-listening median {latencies[len(latencies) // 2] * 1000:6.1f} ms, "
+              f"max {latencies[-1] * 1000:6.1f} ms | idle: {idle_wakeups / idle_seconds:5.1f} wakeups/s")
+
+    random.seed(1)
+    clicked_at = [0.0]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "Mic.data")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("False")
+
+        def click_file():
+            clicked_at[0] = time.time()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("True")
+
+        run("Mic.data poll", lambda *a: polling(directory, *a), click_file, lambda: None)
+
+    bus = EventBus()
+    run("event bus", lambda *a: blocking(bus, *a), lambda: bus.publish(MicEvent(True)),
+        lambda: bus.publish(MicEvent(False)))
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["mic"]:
+        _mic_benchmark()
+    else:
+        _benchmark()
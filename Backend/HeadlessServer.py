@@ -0,0 +1,552 @@
+"""
+Headless Server
+Text-in, streamed-text-out API for JarvisBrain without the GUI, microphone
+or local speech: POST /command streams newline-delimited JSON, /ws speaks
+the same messages over a WebSocket, GET /health reports load and
+GET/POST /profile shows or starts a sampling profile (Profiler.py), for
+clients that send SERVER_PROFILE_TOKEN. Requests
+name their session (X-Session-Id header, "session" in the JSON body or
+/ws?session=...) so each user keeps a separate history; requests without
+one get a throwaway session, never the local user's. Built on
+asyncio streams only, so every client shares the one runtime loop and the
+server runs on a box without a display.
+
+Backpressure: at most SERVER_MAX_CONCURRENT commands run at once, up to
+SERVER_MAX_WAITING more wait for a slot and the rest get 503 "busy". Each
+answer streams through a bounded buffer, so a slow client pauses the LLM
+stream behind it instead of piling text up in memory.
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+import concurrent.futures
+import threading
+import asyncio
+import hashlib
+import hmac
+import base64
+import struct
+import json
+import time
+
+from .SpeechStream import speech_output
+from .SessionStore import CheckSessionId
+from .Profiler import profiler
+from urllib.parse import parse_qs
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+HOST = env_vars.get("SERVER_HOST", "127.0.0.1")
+PORT = int(env_vars.get("SERVER_PORT", 8765))
+# Commands answered at the same time; more wait for a slot
+MAX_CONCURRENT = int(env_vars.get("SERVER_MAX_CONCURRENT", 8))
+# Commands allowed to wait for a slot before new ones are refused with "busy"
+MAX_WAITING = int(env_vars.get("SERVER_MAX_WAITING", 64))
+# Answer pieces buffered per request before the answer stream is paused
+STREAM_BUFFER = int(env_vars.get("SERVER_STREAM_BUFFER", 64))
+# Whether network clients may run desktop automation (open, close, play, system, content) on this machine
+ALLOW_AUTOMATION = env_vars.get("SERVER_AUTOMATION", "off").lower() in ("on", "true", "1", "yes")
+# Bearer token for /profile; empty turns the route off
+PROFILE_TOKEN = env_vars.get("SERVER_PROFILE_TOKEN", "")
+
+MAX_HEADER = 16 * 1024
+MAX_BODY = 64 * 1024
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class Busy(Exception):
+    """Every slot is taken and the waiting line is full"""
+
+
+class TextStream:
+    """Bounded queue of answer text for one request; writers on worker threads block while it is full"""
+
+    def __init__(self, loop, maxsize: int = STREAM_BUFFER):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = threading.Event()
+
+    def write(self, text: str, answer: int = 0):
+        if self.closed.is_set():
+            return
+        if self._on_loop():
+            # Blocking here would stall the loop that empties the queue
+            self.queue.put_nowait((text, answer))
+            return
+        future = asyncio.run_coroutine_threadsafe(self.queue.put((text, answer)), self.loop)
+        while not self.closed.is_set():
+            try:
+                return future.result(0.1)
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def close(self):
+        """The client is gone: writers stop waiting for room"""
+        self.closed.set()
+
+
+class HeadlessServer:
+    """
+    Serves handler(text, session=id) -> awaitable result over HTTP and WebSocket;
+    answer text is streamed as it is produced
+    """
+
+    def __init__(self, handler, host: str = HOST, port: int = PORT, max_concurrent: int = MAX_CONCURRENT,
+                 max_waiting: int = MAX_WAITING, buffer: int = STREAM_BUFFER, profile_token: str = PROFILE_TOKEN):
+        self.handler = handler
+        self.profile_token = profile_token
+        self.host = host
+        self.port = port
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.buffer = buffer
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._server = None
+        self.started_at = time.time()
+        self.stats = {"clients": 0, "websockets": 0, "in_flight": 0, "waiting": 0,
+                      "served": 0, "failed": 0, "rejected": 0, "cancelled": 0}
+
+    async def start(self):
+        # Every command blocks worker threads (the decision stream, one per answer); the default
+        # pool of cpu count + 4 threads would cap concurrency far below max_concurrent on small boxes
+        asyncio.get_running_loop().set_default_executor(concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrent * 4 + 4, thread_name_prefix="HeadlessServer"))
+        self._server = await asyncio.start_server(self._client, self.host, self.port, limit=MAX_HEADER)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"[SERVER] Listening on http://{self.host}:{self.port} (POST /command, GET /ws, GET /health, /profile)")
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def health(self) -> dict:
+        return dict(self.stats, status="ok", uptime=round(time.time() - self.started_at, 1))
+
+    # ------------------------------------------------------------- commands
+
+    async def run(self, text: str, send, session: str = None):
+        """Run one command, awaiting send(message) for every answer piece and once with the result"""
+        if self._slots.locked() and self.stats["waiting"] >= self.max_waiting:
+            self.stats["rejected"] += 1
+            raise Busy()
+        self.stats["waiting"] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats["waiting"] -= 1
+
+        self.stats["in_flight"] += 1
+        stream = TextStream(asyncio.get_running_loop(), self.buffer)
+        # Answers spoken anywhere below this task are written to this request's stream instead
+        token = speech_output.set(stream.write)
+        task = asyncio.create_task(self.handler(text, session=session))
+        speech_output.reset(token)
+        getter = None
+        try:
+            while not (task.done() and stream.queue.empty()):
+                getter = asyncio.ensure_future(stream.queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    # answer tells apart the parts of a multi-command utterance streaming at once
+                    text, answer = getter.result()
+                    await send({"type": "token", "answer": answer, "text": text})
+                else:
+                    getter.cancel()
+            result = task.result()
+            self.stats["served"] += 1
+            await send({"type": "done", "results": _results(result)})
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            await send({"type": "error", "error": str(e)})
+        finally:
+            stream.close()
+            if getter is not None:
+                getter.cancel()
+            if not task.done():
+                task.cancel()
+            self.stats["in_flight"] -= 1
+            self._slots.release()
+
+    # ------------------------------------------------------------------ HTTP
+
+    async def _client(self, reader, writer):
+        self.stats["clients"] += 1
+        try:
+            request = await _read_request(reader)
+            if request is None:
+                return
+            method, path, query, headers, body = request
+            if path == "/health":
+                await _respond(writer, 200, self.health())
+            elif path == "/ws":
+                if headers.get("upgrade", "").lower() != "websocket" or "sec-websocket-key" not in headers:
+                    await _respond(writer, 400, {"error": "expected a WebSocket upgrade"})
+                    return
+                session = _session(query.get("session", [None])[0])
+                await self._websocket(reader, writer, headers["sec-websocket-key"], session)
+            elif path == "/command":
+                if method != "POST":
+                    await _respond(writer, 405, {"error": "use POST"})
+                    return
+                await self._http_command(writer, headers, body)
+            elif path == "/profile":
+                if not self.profile_token:
+                    await _respond(writer, 403, {"error": "/profile is off (set SERVER_PROFILE_TOKEN)"})
+                    return
+                if not hmac.compare_digest(headers.get("authorization", ""), f"Bearer {self.profile_token}"):
+                    await _respond(writer, 401, {"error": "missing or wrong profile token"},
+                                   extra="WWW-Authenticate: Bearer\r\n")
+                    return
+                await self._profile(writer, method, body)
+            else:
+                await _respond(writer, 404, {"error": f"no route {path}"})
+        except ValueError as e:
+            await _respond(writer, 400 if "too large" not in str(e) else 413, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.stats["clients"] -= 1
+            writer.close()
+
+    async def _http_command(self, writer, headers, body: bytes):
+        text, session = _command(body.decode("utf-8", errors="replace"), headers.get("content-type", ""))
+        session = session or _session(headers.get("x-session-id"))
+        if not text:
+            await _respond(writer, 400, {"error": "empty command"})
+            return
+        started = False
+
+        async def send(message):
+            nonlocal started
+            if not started:
+                started = True
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                             b"Transfer-Encoding: chunked\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n")
+            line = (json.dumps(message) + "\n").encode("utf-8")
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            # Waits while the client is slow to read, which in turn pauses the answer
+            await writer.drain()
+
+        try:
+            await self.run(text, send, session)
+        except Busy:
+            await _respond(writer, 503, {"error": "busy"}, extra="Retry-After: 1\r\n")
+            return
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _profile(self, writer, method: str, body: bytes):
+        """GET: profiler status. POST {"seconds": 30} or {"utterances": 5} starts a capture, {"stop": true} ends it"""
+        if method == "GET":
+            await _respond(writer, 200, profiler.status())
+            return
+        if method != "POST":
+            await _respond(writer, 405, {"error": "use GET or POST"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            raise ValueError("invalid JSON")
+        request = request if isinstance(request, dict) else {}
+        if request.get("stop"):
+            # Joins the sampler thread, which writes the file
+            path = await asyncio.to_thread(profiler.stop)
+            await _respond(writer, 200, dict(profiler.status(), file=str(path) if path else None))
+            return
+        try:
+            seconds = float(request["seconds"]) if request.get("seconds") else None
+            utterances = int(request["utterances"]) if request.get("utterances") else None
+        except (TypeError, ValueError):
+            raise ValueError("seconds and utterances must be numbers")
+        status = await asyncio.to_thread(profiler.start, seconds, utterances, bool(request.get("always")))
+        await _respond(writer, 200, status)
+
+    # ------------------------------------------------------------- WebSocket
+
+    async def _websocket(self, reader, writer, key: str, session: str = None):
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        await writer.drain()
+        self.stats["websockets"] += 1
+        # Commands on one connection are answered in order; the reader stops reading when this is full
+        commands = asyncio.Queue(maxsize=4)
+        current = None
+        cancelled = False  # the client asked to cancel the current command
+
+        async def send(message):
+            writer.write(_ws_frame(json.dumps(message).encode("utf-8")))
+            await writer.drain()
+
+        async def answer():
+            nonlocal current, cancelled
+            while True:
+                text, text_session = await commands.get()
+                cancelled = False
+                current = asyncio.create_task(self.run(text, send, text_session or session))
+                try:
+                    await current
+                except Busy:
+                    await send({"type": "error", "error": "busy"})
+                except asyncio.CancelledError:
+                    if not cancelled:
+                        raise
+                    await send({"type": "cancelled"})
+                except ConnectionError:
+                    return
+                finally:
+                    current = None
+
+        answering = asyncio.create_task(answer())
+        try:
+            while True:
+                opcode, payload = await _ws_read(reader)
+                if opcode == 0x8:
+                    writer.write(_ws_frame(payload[:2], opcode=0x8))
+                    await writer.drain()
+                    return
+                if opcode == 0x9:
+                    writer.write(_ws_frame(payload, opcode=0xA))
+                    await writer.drain()
+                    continue
+                if opcode != 0x1:
+                    continue
+                text = payload.decode("utf-8", errors="replace")
+                if _is_cancel(text):
+                    if current is not None:
+                        cancelled = True
+                        current.cancel()
+                    continue
+                try:
+                    text, text_session = _command(text, "application/json" if text.lstrip().startswith("{") else "")
+                except ValueError as e:
+                    await send({"type": "error", "error": str(e)})
+                    continue
+                if text:
+                    await commands.put((text, text_session))
+        except ValueError as e:
+            # Oversized message: say why and drop the connection
+            await send({"type": "error", "error": str(e)})
+        finally:
+            answering.cancel()
+            if current is not None:
+                current.cancel()
+            self.stats["websockets"] -= 1
+
+
+def _results(result) -> list:
+    """Sub-task summaries from JarvisBrain (TaskScheduler.SubTask), or the plain result"""
+    if isinstance(result, list) and all(hasattr(sub, "status") for sub in result):
+        return [{"command": sub.command, "kind": sub.kind, "status": sub.status,
+                 "seconds": round(sub.seconds, 3) if sub.seconds is not None else None,
+                 "result": sub.result if isinstance(sub.result, (str, bool, type(None))) else str(sub.result)}
+                for sub in result]
+    return [] if result is None else [{"result": result}]
+
+
+def _command(body: str, content_type: str) -> tuple:
+    """(command text, session id or None) from a plain text or {"text", "session"} JSON body"""
+    session = None
+    if "json" in content_type:
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError:
+            raise ValueError("invalid JSON")
+        data = data if isinstance(data, dict) else {}
+        body, session = data.get("text", ""), data.get("session")
+    return str(body).strip(), _session(str(session) if session else None)
+
+
+def _session(session_id: str):
+    """A client-chosen session id, checked before it names a directory; None if there is none"""
+    return CheckSessionId(session_id) if session_id else None
+
+
+def _is_cancel(text: str) -> bool:
+    if not text.lstrip().startswith("{"):
+        return False
+    try:
+        return json.loads(text).get("type") == "cancel"
+    except (json.JSONDecodeError, AttributeError):
+        return False
+
+
+async def _read_request(reader):
+    """(method, path, query, headers, body) of an HTTP/1.1 request, or None if the client closed"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise ValueError("malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY:
+        raise ValueError("body too large")
+    body = await reader.readexactly(length) if length else b""
+    path, _, query = target.partition("?")
+    return method.upper(), path, parse_qs(query), headers, body
+
+
+async def _respond(writer, status: int, data: dict, extra: str = ""):
+    body = json.dumps(data).encode("utf-8")
+    writer.write((f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n{extra}Connection: close\r\n\r\n").encode() + body)
+    await writer.drain()
+
+
+def _ws_frame(payload: bytes, opcode: int = 0x1, mask: bytes = None) -> bytes:
+    """One final frame; servers send unmasked, clients (the demo) pass a mask"""
+    head = bytes([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        head += bytes([bit | length])
+    elif length < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack("!H", length)
+    else:
+        head += bytes([bit | 127]) + struct.pack("!Q", length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        head += mask
+    return head + payload
+
+
+async def _ws_read(reader, max_size: int = MAX_BODY):
+    """(opcode, payload) of the next message, joining fragments"""
+    opcode, data = None, b""
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if len(data) + length > max_size:
+            raise ValueError("message too large")
+        mask = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        if first & 0x0F >= 0x8:
+            # Control frames may arrive between fragments
+            return first & 0x0F, payload
+        if opcode is None:
+            opcode = first & 0x0F
+        data += payload
+        if first & 0x80:
+            return opcode, data
+
+
+def _demo(clients: int = 40, words: int = 30, word_delay: float = 0.02, max_concurrent: int = 16):
+    """Concurrent HTTP and WebSocket clients against a fake brain that streams a slow answer"""
+    import statistics
+    import os
+
+    async def fake_brain(text, session=None):
+        write = speech_output.get()
+
+        def answer():
+            for i in range(words):
+                time.sleep(word_delay)
+                write(f"word{i} ", 1)
+            return f"answered {text}"
+        return await asyncio.to_thread(answer)
+
+    async def http_client(port, text):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps({"text": text}).encode()
+        start = time.perf_counter()
+        writer.write(b"POST /command HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+        first = None
+        data = b""
+        while True:
+            chunk = await reader.read(4096)
+            if not chunk:
+                break
+            if first is None and b'"token"' in chunk:
+                first = time.perf_counter() - start
+            data += chunk
+        writer.close()
+        return first, time.perf_counter() - start, data.count(b'"token"'), b'"done"' in data
+
+    async def ws_client(port, text):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write(f"GET /ws HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+        await reader.readuntil(b"\r\n\r\n")
+        start = time.perf_counter()
+        writer.write(_ws_frame(json.dumps({"text": text}).encode(), mask=os.urandom(4)))
+        first, tokens, done = None, 0, False
+        while not done:
+            _, payload = await _ws_read(reader)
+            message = json.loads(payload)
+            if message["type"] == "token":
+                tokens += 1
+                if first is None:
+                    first = time.perf_counter() - start
+            done = message["type"] in ("done", "error")
+        writer.write(_ws_frame(b"\x03\xe8", opcode=0x8, mask=os.urandom(4)))
+        writer.close()
+        return first, time.perf_counter() - start, tokens, message["type"] == "done"
+
+    async def main():
+        server = await HeadlessServer(fake_brain, port=0, max_concurrent=max_concurrent).start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"GET /health HTTP/1.1\r\nHost: x\r\n\r\n")
+        health = (await reader.read()).split(b"\r\n\r\n", 1)[1]
+        writer.close()
+        print(f"health: {health.decode()}")
+
+        start = time.perf_counter()
+        runs = await asyncio.gather(*(
+            (http_client if i % 2 else ws_client)(server.port, f"question {i}") for i in range(clients)))
+        wall = time.perf_counter() - start
+        await server.close()
+
+        firsts = sorted(r[0] for r in runs)
+        totals = sorted(r[1] for r in runs)
+        one = words * word_delay
+        print(f"{clients} clients ({clients // 2} HTTP, {clients - clients // 2} WebSocket), "
+              f"{max_concurrent} answered at once, {one:.2f}s per answer")
+        print(f"first token: median {statistics.median(firsts) * 1000:.0f} ms, max {firsts[-1] * 1000:.0f} ms")
+        print(f"full answer: median {statistics.median(totals) * 1000:.0f} ms, max {totals[-1] * 1000:.0f} ms")
+        print(f"wall {wall:.2f}s on one loop vs {clients * one:.2f}s one at a time; "
+              f"all complete: {all(r[3] and r[2] == words for r in runs)}; {server.health()}")
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    _demo()
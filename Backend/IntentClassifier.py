@@ -0,0 +1,344 @@
+"""
+Local Intent Classifier
+Multinomial naive Bayes over hashed character n-grams, trained on the
+Model.py few-shot examples plus every decision the remote FirstLayerDMM
+has made (logged to Data/DMMDecisions.jsonl). Confident general/realtime
+decisions are answered in-process; everything else (exit included) still
+goes to Cohere. The shared model is loaded or trained on first use, never
+on import.
+
+    python -m Backend.IntentClassifier train     retrain from the decision log
+    python -m Backend.IntentClassifier bench     accuracy vs the remote model and latency saved
+    python -m Backend.IntentClassifier "query"   show the prediction for one query
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+import numpy as np
+import threading
+import ast
+import zlib
+import json
+import time
+import re
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# on/off
+ENABLED = env_vars.get("INTENT_CLASSIFIER", "on").lower() not in ("off", "false", "0", "no")
+# Posterior probability needed to skip the remote model
+THRESHOLD = float(env_vars.get("INTENT_CLASSIFIER_THRESHOLD", 0.9))
+# Training examples needed before local answers are trusted; until then every query still goes to Cohere
+MIN_EXAMPLES = int(env_vars.get("INTENT_CLASSIFIER_MIN_EXAMPLES", 200))
+MODEL_PATH = DATA_DIR / "IntentModel.npz"
+DECISIONS_PATH = DATA_DIR / "DMMDecisions.jsonl"
+
+DIMENSIONS = 1 << 14
+NGRAMS = (2, 3, 4, 5)
+SMOOTHING = 0.1
+
+# Same vocabulary as FirstLayerDMM; multi-word names first so "generate image" wins over "general"
+FUNCS = ["generate image", "google search", "youtube search", "general", "realtime", "open", "close",
+         "play", "system", "content", "reminder", "exit"]
+# Intents whose command is just the query, so a label is enough to build it. Never "exit": a wrong
+# guess would end the session, so quitting is always confirmed by the remote model
+LOCAL_INTENTS = ("general", "realtime")
+# Several different intents in one utterance are always left to the remote model
+MULTI = "multi"
+
+_MULTI_HINT = re.compile(r"\b(?:and|then|also)\s+(?:open|close|play|remind|set|write|search|google|youtube|"
+                         r"mute|unmute|volume|generate|launch)\b")
+
+# Seed examples so a fresh install has every class before any decision has been logged
+SEED_EXAMPLES = [
+    ("hello jarvis", "general"), ("how are you doing today", "general"), ("tell me a joke", "general"),
+    ("what is machine learning", "general"), ("explain photosynthesis", "general"),
+    ("what is the capital of france", "general"), ("how do i make pasta", "general"),
+    ("can you help me with my homework", "general"), ("what's the date today", "general"),
+    ("what day is it", "general"), ("thank you so much", "general"), ("who invented the telephone", "general"),
+    ("what is the meaning of life", "general"), ("give me some motivation", "general"),
+    ("what's the weather like today", "realtime"), ("latest news about india", "realtime"),
+    ("what is the price of bitcoin right now", "realtime"), ("who won the match yesterday", "realtime"),
+    ("who is elon musk", "realtime"), ("what is the stock price of apple", "realtime"),
+    ("tell me about the latest iphone", "realtime"), ("current score of the cricket match", "realtime"),
+    ("who is the president of america", "realtime"), ("what are today's top headlines", "realtime"),
+    ("open chrome", "open"), ("open notepad", "open"), ("launch spotify", "open"),
+    ("close chrome", "close"), ("close notepad", "close"), ("play let her go", "play"), ("play some music", "play"),
+    ("generate image of a lion", "generate image"), ("create an image of a sunset", "generate image"),
+    ("set a reminder at 9pm for my meeting", "reminder"), ("remind me to call mom at 5", "reminder"),
+    ("mute", "system"), ("volume up", "system"), ("volume down", "system"),
+    ("write an application for sick leave", "content"), ("write a poem about rain", "content"),
+    ("google search python tutorials", "google search"), ("search cats on google", "google search"),
+    ("youtube search lofi beats", "youtube search"), ("search songs on youtube", "youtube search"),
+    ("bye jarvis", "exit"), ("goodbye", "exit"), ("see you later", "exit"),
+    ("open chrome and tell me about gandhi", MULTI), ("what is today's date and remind me to study", MULTI),
+]
+
+
+def Features(text: str) -> np.ndarray:
+    """Hashed character n-gram ids of a query (CRC32, so ids are stable across processes)"""
+    text = " " + re.sub(r"\s+", " ", text.lower().strip()) + " "
+    ids = [zlib.crc32(text[i:i + n].encode()) & (DIMENSIONS - 1)
+           for n in NGRAMS for i in range(len(text) - n + 1)]
+    return np.array(ids, dtype=np.int64)
+
+
+def Label(commands: list) -> str:
+    """Collapse a DMM command list into one intent label"""
+    intents = []
+    for command in commands:
+        for func in FUNCS:
+            if command.startswith(func):
+                if func not in intents:
+                    intents.append(func)
+                break
+    if not intents:
+        return None
+    return intents[0] if len(intents) == 1 else MULTI
+
+
+_log_lock = threading.Lock()
+
+
+def LogDecision(query: str, commands: list, seconds: float = None, source: str = "cohere",
+                path=DECISIONS_PATH):
+    """Append one remote DMM decision to the training log"""
+    record = {"time": time.time(), "query": query, "commands": commands, "source": source}
+    if seconds is not None:
+        record["seconds"] = round(seconds, 4)
+    path = Path(path)
+    with _log_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def LoadDecisions(path=DECISIONS_PATH) -> list:
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def BuiltinExamples() -> list:
+    """(query, label) pairs from the seeds and the Model.py preamble and few-shot history"""
+    examples = list(SEED_EXAMPLES)
+    try:
+        # Read the literals from the source; importing Model.py would open a Cohere client
+        values = {}
+        tree = ast.parse((Path(__file__).parent / "Model.py").read_text(encoding="utf-8"))
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) \
+                    and node.targets[0].id in ("preamble", "ChatHistory"):
+                values[node.targets[0].id] = ast.literal_eval(node.value)
+        preamble, ChatHistory = values["preamble"], values["ChatHistory"]
+    except (OSError, SyntaxError, ValueError, KeyError) as e:
+        print(f"[WARN] Could not read DMM examples from Model.py: {e}")
+        return examples
+    for query, answer in re.findall(r"query is '(.+?)' respond with '(.+?)'(?=[ ,.;]|$)", preamble):
+        label = Label([c.strip() for c in answer.split(",")])
+        if label:
+            examples.append((query, label))
+    for user, bot in zip(ChatHistory[::2], ChatHistory[1::2]):
+        label = Label([c.strip() for c in bot["message"].split(",")])
+        if label:
+            examples.append((user["message"], label))
+    return examples
+
+
+def TrainingExamples(path=DECISIONS_PATH) -> list:
+    examples = BuiltinExamples()
+    for record in LoadDecisions(path):
+        label = Label(record.get("commands") or [])
+        if label and record.get("query"):
+            examples.append((record["query"], label))
+    return examples
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes over hashed character n-grams"""
+
+    def __init__(self, threshold: float = THRESHOLD, min_examples: int = MIN_EXAMPLES, loader=None):
+        self.threshold = threshold
+        self.min_examples = min_examples
+        self.classes = []
+        self.class_log_prior = None
+        self.feature_log_prob = None
+        self.trained_on = 0
+        self.stats = {"local": 0, "remote": 0, "seconds": 0.0}
+        # loader(classifier) loads or trains the model; run once by prepare(), not by the constructor
+        self._loader = loader
+        self._load_lock = threading.Lock()
+        self._preparer = None
+
+    @property
+    def ready(self) -> bool:
+        return self.feature_log_prob is not None and self.trained_on >= self.min_examples
+
+    def fit(self, examples: list):
+        """examples: (query, label) pairs"""
+        self.classes = sorted({label for _, label in examples})
+        index = {label: i for i, label in enumerate(self.classes)}
+        counts = np.zeros((len(self.classes), DIMENSIONS), dtype=np.float64)
+        priors = np.zeros(len(self.classes), dtype=np.float64)
+        for query, label in examples:
+            row = index[label]
+            np.add.at(counts[row], Features(query), 1.0)
+            priors[row] += 1
+        smoothed = counts + SMOOTHING
+        self.feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        self.class_log_prior = np.log(priors / priors.sum())
+        self.trained_on = len(examples)
+        return self
+
+    def predict(self, query: str):
+        """Return (label, probability)"""
+        ids = Features(query)
+        # Overlapping n-grams are far from independent; scaling by 1/sqrt(n) keeps the posterior honest
+        scores = self.class_log_prior + self.feature_log_prob[:, ids].sum(axis=1) / np.sqrt(max(1, len(ids)))
+        scores = np.exp(scores - scores.max())
+        probabilities = scores / scores.sum()
+        best = int(probabilities.argmax())
+        return self.classes[best], float(probabilities[best])
+
+    def prepare(self):
+        """Load or train the model now; the shared classifier is otherwise prepared on first use"""
+        with self._load_lock:
+            if self._loader is not None:
+                self._loader(self)
+                self._loader = None
+
+    def classify(self, query: str):
+        """Command list in FirstLayerDMM format, or None when Cohere should decide"""
+        if self._loader is not None:
+            # Train in the background; queries go to Cohere until the model is ready
+            if self._preparer is None:
+                self._preparer = threading.Thread(target=self.prepare, name="IntentClassifierPrepare", daemon=True)
+                self._preparer.start()
+            return None
+        if not self.ready:
+            return None
+        start = time.perf_counter()
+        label, probability = self.predict(query)
+        self.stats["seconds"] += time.perf_counter() - start
+        if label not in LOCAL_INTENTS or probability < self.threshold or _MULTI_HINT.search(query.lower()):
+            self.stats["remote"] += 1
+            return None
+        self.stats["local"] += 1
+        return [f"{label} {query.strip()}"]
+
+    # ----------------------------------------------------------- persistence
+
+    def save(self, path=MODEL_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(temp_path, classes=np.array(self.classes), class_log_prior=self.class_log_prior,
+                            feature_log_prob=self.feature_log_prob.astype(np.float32),
+                            trained_on=np.array(self.trained_on))
+        temp_path.replace(path)
+
+    def load(self, path=MODEL_PATH) -> bool:
+        try:
+            with np.load(path) as data:
+                if data["feature_log_prob"].shape[1] != DIMENSIONS:
+                    return False
+                self.classes = [str(c) for c in data["classes"]]
+                self.class_log_prior = data["class_log_prior"]
+                self.feature_log_prob = data["feature_log_prob"].astype(np.float64)
+                self.trained_on = int(data["trained_on"])
+            return True
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            return False
+
+
+def Train(path=MODEL_PATH, decisions=DECISIONS_PATH) -> IntentClassifier:
+    classifier = IntentClassifier().fit(TrainingExamples(decisions))
+    classifier.save(path)
+    return classifier
+
+
+def LoadOrTrain(classifier: IntentClassifier, path=MODEL_PATH, decisions=DECISIONS_PATH):
+    """Load the saved model, retraining it when remote decisions were logged after it was saved"""
+    path, decisions = Path(path), Path(decisions)
+    stale = decisions.exists() and (not path.exists() or decisions.stat().st_mtime > path.stat().st_mtime)
+    if not stale and classifier.load(path):
+        return
+    try:
+        classifier.fit(TrainingExamples(decisions))
+        classifier.save(path)
+        print(f"[INFO] Trained intent classifier on {classifier.trained_on} examples")
+    except Exception as e:
+        print(f"[WARN] Intent classifier unavailable: {e}")
+
+
+# Shared classifier used by main.py between the fast path and FirstLayerDMM (prepared on first use)
+intent_classifier = IntentClassifier(loader=LoadOrTrain if ENABLED else None)
+
+
+def _bench(decisions=DECISIONS_PATH, folds: int = 5, threshold: float = THRESHOLD):
+    """Cross-validated agreement with the remote model and the latency the local answers save"""
+    records = [r for r in LoadDecisions(decisions) if r.get("query") and Label(r.get("commands") or [])]
+    logged = [(r["query"], Label(r["commands"])) for r in records]
+    builtin = BuiltinExamples()
+    if not logged:
+        print("[INFO] No logged remote decisions yet; cross-validating on the built-in examples only")
+        evaluation, background = builtin, []
+    else:
+        evaluation, background = logged, builtin
+
+    order = np.random.default_rng(0).permutation(len(evaluation))
+    answered = agreed = correct = 0
+    inference = []
+    for fold in range(folds):
+        test = [evaluation[i] for i in order[fold::folds]]
+        train = background + [evaluation[i] for k, i in enumerate(order) if k % folds != fold]
+        classifier = IntentClassifier(threshold, min_examples=0).fit(train)
+        for query, label in test:
+            start = time.perf_counter()
+            predicted, probability = classifier.predict(query)
+            local = classifier.classify(query)
+            inference.append(time.perf_counter() - start)
+            correct += predicted == label
+            if local is not None:
+                answered += 1
+                agreed += predicted == label
+
+    total = len(evaluation)
+    remote_seconds = [r["seconds"] for r in records if "seconds" in r]
+    remote_latency = sum(remote_seconds) / len(remote_seconds) if remote_seconds else None
+    local_latency = sum(inference) / len(inference)
+    print(f"examples          : {total} evaluated ({len(logged)} logged remote decisions), {folds}-fold")
+    print(f"top-1 accuracy    : {correct / total:.1%} agreement with the remote labels")
+    print(f"answered locally  : {answered / total:.1%} at threshold {threshold} "
+          f"({agreed}/{answered or 1} = {agreed / (answered or 1):.1%} agree with the remote model)")
+    print(f"local inference   : {local_latency * 1e6:.0f} us per utterance")
+    if len(builtin) + len(logged) < MIN_EXAMPLES:
+        print(f"note              : local answers stay off until {MIN_EXAMPLES} training examples "
+              f"(have {len(builtin) + len(logged)})")
+    if remote_latency is not None:
+        saved = answered / total * (remote_latency - local_latency)
+        print(f"remote DMM        : {remote_latency * 1000:.0f} ms mean over {len(remote_seconds)} logged calls")
+        print(f"latency saved     : {saved * 1000:.0f} ms per utterance on average")
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "train":
+        model = Train()
+        print(f"[OK] Trained on {model.trained_on} examples, classes: {', '.join(model.classes)} -> {MODEL_PATH}")
+    elif command == "bench":
+        _bench()
+    else:
+        intent_classifier.prepare()
+        label, probability = intent_classifier.predict(" ".join(sys.argv[1:]))
+        print(f"{label} ({probability:.2f}) -> {intent_classifier.classify(' '.join(sys.argv[1:]))}")
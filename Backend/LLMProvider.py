@@ -1,9 +1,13 @@
 """
 LLM Provider Abstraction Layer
-Supports multiple AI providers: Groq, OpenAI, Anthropic, Cohere
+Supports multiple AI providers: Groq, OpenAI, Anthropic, Cohere and a local CPU model
 """
 from pathlib import Path
 from dotenv import dotenv_values
+import asyncio
+import threading
+import weakref
+import time
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -12,30 +16,162 @@ env_vars = dotenv_values(BASE_DIR / ".env")
 # Get provider preference (defaults to "groq")
 PROVIDER = env_vars.get("LLM_PROVIDER", "groq").lower()
 
+# Optional multi-provider mode, e.g. LLM_PROVIDERS=groq,openai (preference order)
+PROVIDERS = [p.strip().lower() for p in env_vars.get("LLM_PROVIDERS", "").split(",") if p.strip()]
+# Seconds to wait for the primary's first token before also asking the next provider
+HEDGE_DELAY = float(env_vars.get("LLM_HEDGE_DELAY", 0.8))
+
+# Async API: overall deadline per completion and size of the shared HTTP connection pool
+REQUEST_DEADLINE = float(env_vars.get("LLM_REQUEST_DEADLINE", 60))
+MAX_CONNECTIONS = int(env_vars.get("LLM_MAX_CONNECTIONS", 20))
+
+API_KEY_NAMES = {
+    "groq": ("GROQ_API_KEY", "GroqAPIKey"),
+    "openai": ("OPENAI_API_KEY",),
+    "anthropic": ("ANTHROPIC_API_KEY",),
+    "cohere": ("COHERE_API_KEY", "CohereAPIKey"),
+    "local": ("LOCAL_API_KEY",)
+}
+
+# Local provider: a quantized GGUF model run in-process by llama.cpp, or any OpenAI-compatible
+# server on this machine (llama.cpp server, Ollama, LM Studio) when LOCAL_BASE_URL is set.
+# The tiers are GGUF file paths in-process and model names for a server.
+LOCAL_MODEL_DEFAULT = env_vars.get("LOCAL_MODEL_DEFAULT") or env_vars.get("LOCAL_MODEL_PATH")
+LOCAL_MODEL_LARGE = env_vars.get("LOCAL_MODEL_LARGE") or LOCAL_MODEL_DEFAULT
+LOCAL_THREADS = int(env_vars.get("LOCAL_THREADS", 0)) or max(1, (os.cpu_count() or 2) // 2)
+LOCAL_CONTEXT = int(env_vars.get("LOCAL_CONTEXT", 4096))
+
+# Model names the app is written against; other providers translate them to their own tiers
+GROQ_MODELS = {"llama-3.1-8b-instant": "default", "llama-3.3-70b-versatile": "large"}
+
+# Loaded llama.cpp models stay resident for the life of the process: path -> (model, generation lock)
+_local_models = {}
+_local_models_lock = threading.Lock()
+
+# One pooled httpx.AsyncClient per event loop, shared by every LLMClient
+_http_pools = weakref.WeakKeyDictionary()
+
+
+def _shared_http_client():
+    """Return the pooled async HTTP client for the running event loop"""
+    import httpx
+    loop = asyncio.get_running_loop()
+    client = _http_pools.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            timeout=httpx.Timeout(REQUEST_DEADLINE, connect=10.0)
+        )
+        _http_pools[loop] = client
+    return client
+
+
+def _local_model(path: str):
+    """Load a GGUF model once and keep it warm; later calls reuse the same instance"""
+    with _local_models_lock:
+        entry = _local_models.get(path)
+        if entry is None:
+            from llama_cpp import Llama
+            start = time.perf_counter()
+            model = Llama(model_path=path, n_threads=LOCAL_THREADS, n_ctx=LOCAL_CONTEXT, verbose=False)
+            # A llama.cpp context runs one generation at a time
+            entry = (model, threading.Lock())
+            _local_models[path] = entry
+            print(f"[INFO] Loaded local model {Path(path).name} in {time.perf_counter() - start:.1f}s "
+                  f"({LOCAL_THREADS} threads)")
+        return entry
+
+
+def PromptCacheUsage(usage) -> dict:
+    """
+    Normalize provider usage into cached vs uncached prompt tokens.
+    Understands OpenAI/Groq (prompt_tokens_details.cached_tokens) and
+    Anthropic (input_tokens + cache_read/cache_creation_input_tokens).
+    """
+    if usage is None:
+        return None
+
+    def field(obj, name):
+        value = obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+        return value or 0
+
+    if field(usage, "prompt_tokens"):
+        prompt_tokens = field(usage, "prompt_tokens")
+        details = usage.get("prompt_tokens_details") if isinstance(usage, dict) else \
+            getattr(usage, "prompt_tokens_details", None)
+        cached = field(details, "cached_tokens") if details is not None else 0
+    elif field(usage, "input_tokens") or field(usage, "cache_read_input_tokens"):
+        cached = field(usage, "cache_read_input_tokens")
+        prompt_tokens = field(usage, "input_tokens") + cached + field(usage, "cache_creation_input_tokens")
+    else:
+        return None
+    return {"prompt_tokens": prompt_tokens, "cached_tokens": cached, "uncached_tokens": prompt_tokens - cached}
+
+
+class Delta:
+    """
+    Text of one streamed chunk. It also plays the role of the choice object
+    (`choice.delta` returns itself), so `chunk.choices[0].delta.content` costs
+    no extra allocation.
+    """
+    __slots__ = ("content", "finish_reason")
+
+    def __init__(self, content=None, finish_reason=None):
+        self.content = content
+        self.finish_reason = finish_reason
+
+    @property
+    def delta(self):
+        return self
+
+
+class StreamChunk:
+    """Provider-independent chunk yielded by every adapter (chunk.choices[0].delta.content)"""
+    __slots__ = ("choices", "usage")
+
+    def __init__(self, content=None, finish_reason=None, usage=None):
+        self.choices = (Delta(content, finish_reason),)
+        self.usage = usage
+
+    @property
+    def content(self):
+        return self.choices[0].content
+
+    def __repr__(self):
+        return f"StreamChunk({self.choices[0].content!r})"
+
+
 class LLMClient:
     """Unified interface for different LLM providers"""
     
-    def __init__(self):
-        self.provider = PROVIDER
+    def __init__(self, provider: str = None, api_key: str = None, base_url: str = None):
+        self.provider = (provider or PROVIDER).lower()
+        self.api_key = api_key or next(
+            (env_vars.get(name) for name in API_KEY_NAMES.get(self.provider, ()) if env_vars.get(name)), None)
+        self.base_url = base_url or env_vars.get(f"{self.provider.upper()}_BASE_URL")
         self.client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Prompt-prefix cache accounting: the last call and running totals
+        self.last_prompt_usage = None
+        self.prompt_cache_totals = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self._usage_lock = threading.Lock()
         self._initialize_client()
     
     def _initialize_client(self):
         """Initialize the appropriate client based on provider"""
+        api_key = self.api_key
         if self.provider == "groq":
             from groq import Groq
-            api_key = env_vars.get("GROQ_API_KEY") or env_vars.get("GroqAPIKey")
             if api_key:
-                self.client = Groq(api_key=api_key)
+                self.client = Groq(api_key=api_key, base_url=self.base_url)
             else:
                 print("[Warning] Groq API key not found. Set GROQ_API_KEY or GroqAPIKey in .env")
         
         elif self.provider == "openai":
             try:
                 from openai import OpenAI
-                api_key = env_vars.get("OPENAI_API_KEY")
                 if api_key:
-                    self.client = OpenAI(api_key=api_key)
+                    self.client = OpenAI(api_key=api_key, base_url=self.base_url)
                 else:
                     print("[Warning] OpenAI API key not found. Set OPENAI_API_KEY in .env")
             except ImportError:
@@ -44,9 +180,8 @@ class LLMClient:
         elif self.provider == "anthropic":
             try:
                 from anthropic import Anthropic
-                api_key = env_vars.get("ANTHROPIC_API_KEY")
                 if api_key:
-                    self.client = Anthropic(api_key=api_key)
+                    self.client = Anthropic(api_key=api_key, base_url=self.base_url)
                 else:
                     print("[Warning] Anthropic API key not found. Set ANTHROPIC_API_KEY in .env")
             except ImportError:
@@ -55,16 +190,124 @@ class LLMClient:
         elif self.provider == "cohere":
             try:
                 import cohere
-                api_key = env_vars.get("COHERE_API_KEY") or env_vars.get("CohereAPIKey")
                 if api_key:
-                    self.client = cohere.Client(api_key=api_key)
+                    self.client = cohere.Client(api_key=api_key, base_url=self.base_url)
                 else:
                     print("[Warning] Cohere API key not found. Set COHERE_API_KEY in .env")
             except ImportError:
                 print("[Error] Cohere package not installed. Run: pip install cohere")
         
+        elif self.provider == "local":
+            if self.base_url:
+                try:
+                    from openai import OpenAI
+                    # Local servers ignore the key but the SDK requires one
+                    self.api_key = api_key or "local"
+                    self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+                except ImportError:
+                    print("[Error] OpenAI package not installed. Run: pip install openai")
+            elif LOCAL_MODEL_DEFAULT:
+                try:
+                    # Load the default tier now so the first question does not pay for it
+                    self.client = _local_model(LOCAL_MODEL_DEFAULT)[0]
+                except ImportError:
+                    print("[Error] llama-cpp-python package not installed. Run: pip install llama-cpp-python")
+                except Exception as e:
+                    print(f"[Error] Could not load local model {LOCAL_MODEL_DEFAULT}: {e}")
+            else:
+                print("[Warning] Local model not configured. Set LOCAL_MODEL_PATH or LOCAL_BASE_URL in .env")
+        
         else:
-            print(f"[Error] Unknown provider: {self.provider}. Supported: groq, openai, anthropic, cohere")
+            print(f"[Error] Unknown provider: {self.provider}. Supported: groq, openai, anthropic, cohere, local")
+
+    def _openai_compatible(self) -> bool:
+        return self.provider in ("groq", "openai") or (self.provider == "local" and bool(self.base_url))
+
+    def _stream_options(self) -> dict:
+        # OpenAI only reports usage (and cached tokens) on a stream when asked; Groq always sends x_groq.usage
+        return {"stream_options": {"include_usage": True}} if self.provider == "openai" else {}
+
+    def _record_usage(self, usage):
+        """Remember cached vs uncached prompt tokens of the call that just finished"""
+        report = PromptCacheUsage(usage)
+        if report is None:
+            return
+        with self._usage_lock:
+            self.last_prompt_usage = report
+            self.prompt_cache_totals["calls"] += 1
+            self.prompt_cache_totals["prompt_tokens"] += report["prompt_tokens"]
+            self.prompt_cache_totals["cached_tokens"] += report["cached_tokens"]
+        share = report["cached_tokens"] / report["prompt_tokens"] * 100 if report["prompt_tokens"] else 0
+        print(f"[LLM] {self.provider}: {report['prompt_tokens']} prompt tokens, "
+              f"{report['cached_tokens']} cached ({share:.0f}%), {report['uncached_tokens']} uncached")
+
+    def prompt_cache_report(self) -> dict:
+        with self._usage_lock:
+            totals = dict(self.prompt_cache_totals)
+        totals["hit_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        totals["last"] = self.last_prompt_usage
+        return totals
+
+    @staticmethod
+    def _anthropic_prompt(messages: list):
+        """
+        Split messages into Anthropic system blocks and turns with cache breakpoints.
+        The first system message is the static prompt and gets the first breakpoint;
+        the history up to the final user turn gets the second. System messages that
+        come after the history (per-request data such as the time or search results)
+        are moved into the next user turn, so they never invalidate the cached prefix.
+        """
+        system_blocks = []
+        conversation = []
+        pending = []
+        for msg in messages:
+            if msg["role"] == "system":
+                if conversation or pending:
+                    pending.append(msg["content"])
+                else:
+                    system_blocks.append({"type": "text", "text": msg["content"]})
+                continue
+            content = [{"type": "text", "text": msg["content"]}]
+            if pending and msg["role"] == "user":
+                content = [{"type": "text", "text": text} for text in pending] + content
+                pending = []
+            conversation.append({"role": msg["role"], "content": content})
+        if pending:
+            conversation.append({"role": "user", "content": [{"type": "text", "text": t} for t in pending]})
+
+        if system_blocks:
+            system_blocks[0]["cache_control"] = {"type": "ephemeral"}
+        if len(conversation) > 1:
+            # Last block of the turn before the final user turn closes the cacheable history
+            conversation[-2]["content"][-1]["cache_control"] = {"type": "ephemeral"}
+        return system_blocks, conversation
+
+    def _async_client(self):
+        """Async SDK client for the running loop, sharing the pooled HTTP client"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is not None:
+            return client
+        if not self.api_key:
+            raise ValueError(f"No client initialized for provider: {self.provider}")
+
+        http_client = _shared_http_client()
+        if self.provider == "groq":
+            from groq import AsyncGroq
+            client = AsyncGroq(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
+        elif self.provider in ("openai", "local"):
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
+        elif self.provider == "anthropic":
+            from anthropic import AsyncAnthropic
+            client = AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
+        elif self.provider == "cohere":
+            import cohere
+            client = cohere.AsyncClient(api_key=self.api_key, base_url=self.base_url, httpx_client=http_client)
+        else:
+            raise ValueError(f"Provider {self.provider} not implemented")
+        self._async_clients[loop] = client
+        return client
     
     def get_model_name(self, default_model: str = None):
         """Get appropriate model name based on provider"""
@@ -84,42 +327,38 @@ class LLMClient:
             "cohere": {
                 "default": "command",
                 "large": "command"
+            },
+            "local": {
+                "default": LOCAL_MODEL_DEFAULT or "local",
+                "large": LOCAL_MODEL_LARGE or "local"
             }
         }
+        tiers = model_map.get(self.provider)
+        if not tiers:
+            return default_model
+        
+        if default_model in ("default", "large"):
+            return tiers[default_model]
         
-        if default_model:
-            # If specific model provided, use it
+        if default_model and (self.provider == "groq" or default_model not in GROQ_MODELS):
+            # A model specific to this provider
             return default_model
         
-        # Map Groq model names to provider equivalents
-        if "70b" in str(default_model):
-            return model_map.get(self.provider, {}).get("large", default_model)
-        else:
-            return model_map.get(self.provider, {}).get("default", default_model)
+        # Map Groq model names (or no model) to provider equivalents
+        return tiers[GROQ_MODELS.get(default_model, "default")]
     
     def create_completion(self, model: str, messages: list, max_tokens: int = 2048, 
                          temperature: float = 0.7, top_p: float = 1, stream: bool = True, stop=None):
         """
         Create a chat completion using the configured provider
-        Returns a streaming generator compatible with Groq's interface
+        Returns an iterable of StreamChunk (a single chunk when stream=False)
         """
         if not self.client:
             raise ValueError(f"No client initialized for provider: {self.provider}")
         
         model_name = self.get_model_name(model)
         
-        if self.provider == "groq":
-            return self.client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                stream=stream,
-                stop=stop
-            )
-        
-        elif self.provider == "openai":
+        if self._openai_compatible():
             completion = self.client.chat.completions.create(
                 model=model_name,
                 messages=messages,
@@ -127,19 +366,18 @@ class LLMClient:
                 temperature=temperature,
                 top_p=top_p,
                 stream=stream,
-                stop=stop
+                stop=stop,
+                **(self._stream_options() if stream else {})
             )
-            return completion
+            if stream:
+                return self._convert_openai_stream(completion)
+            choice = completion.choices[0]
+            self._record_usage(getattr(completion, "usage", None))
+            return [StreamChunk(choice.message.content, choice.finish_reason, getattr(completion, "usage", None))]
         
         elif self.provider == "anthropic":
-            # Anthropic uses different message format
-            system_msg = None
-            conversation = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_msg = msg["content"]
-                else:
-                    conversation.append(msg)
+            # Anthropic uses different message format, with cache breakpoints on the static prefix
+            system_blocks, conversation = self._anthropic_prompt(messages)
             
             if stream:
                 stream_obj = self.client.messages.create(
@@ -147,7 +385,7 @@ class LLMClient:
                     max_tokens=max_tokens,
                     temperature=temperature,
                     top_p=top_p,
-                    system=system_msg if system_msg else "",
+                    system=system_blocks,
                     messages=conversation,
                     stream=True
                 )
@@ -159,14 +397,11 @@ class LLMClient:
                     max_tokens=max_tokens,
                     temperature=temperature,
                     top_p=top_p,
-                    system=system_msg if system_msg else "",
+                    system=system_blocks,
                     messages=conversation
                 )
-                # Convert to Groq-like format
-                class FakeChunk:
-                    def __init__(self, content):
-                        self.choices = [type('obj', (object,), {'delta': type('obj', (object,), {'content': content})()})()]
-                return [FakeChunk(response.content[0].text)]
+                self._record_usage(response.usage)
+                return [StreamChunk(response.content[0].text, response.stop_reason, response.usage)]
         
         elif self.provider == "cohere":
             # Cohere uses different API structure
@@ -188,64 +423,225 @@ class LLMClient:
                     temperature=temperature,
                     p=top_p
                 )
-                class FakeChunk:
-                    def __init__(self, content):
-                        self.choices = [type('obj', (object,), {'delta': type('obj', (object,), {'content': content})()})()]
-                return [FakeChunk(response.text)]
+                return [StreamChunk(response.text)]
+        
+        elif self.provider == "local":
+            return self._local_completion(model_name, messages, max_tokens, temperature, top_p, stream, stop)
         
         else:
             raise ValueError(f"Provider {self.provider} not implemented")
     
+    async def acreate_completion(self, model: str, messages: list, max_tokens: int = 2048,
+                                 temperature: float = 0.7, top_p: float = 1, stop=None,
+                                 deadline: float = REQUEST_DEADLINE):
+        """
+        Async streaming completion using the shared connection pool.
+        Yields StreamChunk objects; raises TimeoutError when the whole request exceeds `deadline` seconds.
+        Cancelling the consuming task closes the underlying HTTP stream.
+        """
+        model_name = self.get_model_name(model)
+        expires = time.monotonic() + deadline
+
+        def remaining():
+            left = expires - time.monotonic()
+            if left <= 0:
+                raise TimeoutError(f"{self.provider} completion exceeded its {deadline}s deadline")
+            return left
+
+        if self.provider == "local" and not self.base_url:
+            async for chunk in self._alocal_completion(model_name, messages, max_tokens, temperature,
+                                                       top_p, stop, remaining):
+                yield chunk
+            return
+
+        client = self._async_client()
+        if self._openai_compatible():
+            stream = await asyncio.wait_for(client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                stream=True,
+                stop=stop,
+                **self._stream_options()
+            ), remaining())
+            close = stream.close
+        elif self.provider == "anthropic":
+            system_blocks, conversation = self._anthropic_prompt(messages)
+            stream = await asyncio.wait_for(client.messages.create(
+                model=model_name,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                system=system_blocks,
+                messages=conversation,
+                stream=True
+            ), remaining())
+            close = stream.close
+        elif self.provider == "cohere":
+            stream = client.chat_stream(
+                model=model_name,
+                message=self._messages_to_cohere_prompt(messages),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                p=top_p
+            )
+            close = stream.aclose
+        else:
+            raise ValueError(f"Provider {self.provider} not implemented")
+
+        iterator = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(iterator.__anext__(), remaining())
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{self.provider} completion exceeded its {deadline}s deadline")
+
+                if self._openai_compatible():
+                    usage = self._openai_usage(event)
+                    if usage is not None:
+                        self._record_usage(usage)
+                    if event.choices:
+                        choice = event.choices[0]
+                        yield StreamChunk(choice.delta.content, choice.finish_reason, usage)
+                    elif usage is not None:
+                        yield StreamChunk(usage=usage)
+                elif self.provider == "anthropic":
+                    if getattr(event, "type", None) == "message_start":
+                        self._record_usage(event.message.usage)
+                        yield StreamChunk(usage=event.message.usage)
+                    elif getattr(event, "type", None) == "content_block_delta" and hasattr(event.delta, "text"):
+                        yield StreamChunk(event.delta.text)
+                elif getattr(event, "event_type", None) == "text-generation":
+                    yield StreamChunk(event.text)
+        finally:
+            # Runs on normal exit, errors, deadline and task cancellation alike
+            try:
+                await close()
+            except Exception:
+                pass
+
+    def _local_completion(self, model_path, messages, max_tokens, temperature, top_p, stream, stop):
+        """Run the resident llama.cpp model (loading a tier on its first use)"""
+        model, lock = _local_model(model_path)
+        request = dict(messages=messages, max_tokens=max_tokens, temperature=temperature, top_p=top_p, stop=stop)
+        if stream:
+            return self._convert_local_stream(model, lock, request)
+        with lock:
+            response = model.create_chat_completion(**request)
+        self._record_usage(response.get("usage"))
+        choice = response["choices"][0]
+        return [StreamChunk(choice["message"]["content"], choice["finish_reason"], response.get("usage"))]
+
+    def _convert_local_stream(self, model, lock, request):
+        """Convert llama.cpp chunk dicts to StreamChunk; holds the model until the stream ends or is closed"""
+        with lock:
+            for chunk in model.create_chat_completion(stream=True, **request):
+                choice = chunk["choices"][0]
+                yield StreamChunk(choice["delta"].get("content"), choice.get("finish_reason"))
+
+    async def _alocal_completion(self, model_path, messages, max_tokens, temperature, top_p, stop, remaining):
+        """Generate on a worker thread so the event loop keeps running while the CPU works"""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def send(item):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                # The loop is gone; nobody is listening any more
+                cancelled.set()
+
+        def produce():
+            try:
+                stream = self._local_completion(model_path, messages, max_tokens, temperature, top_p, True, stop)
+                try:
+                    for chunk in stream:
+                        if cancelled.is_set():
+                            break
+                        send(chunk)
+                finally:
+                    stream.close()
+                send(None)
+            except Exception as e:
+                send(e)
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(chunks.get(), remaining())
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"{self.provider} completion exceeded its deadline")
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stops generation at the next token when the consumer is cancelled or times out
+            cancelled.set()
+
+    @staticmethod
+    def _openai_usage(chunk):
+        # OpenAI sends usage on a final chunk without choices; Groq puts it in x_groq on the last chunk
+        usage = getattr(chunk, "usage", None)
+        if usage is None:
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+        return usage
+
+    @staticmethod
+    def _close_stream(stream_obj):
+        """Close the HTTP response behind an SDK stream (a reader stopped early, e.g. barge-in)"""
+        close = getattr(stream_obj, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def _convert_openai_stream(self, stream_obj):
+        """Convert Groq/OpenAI SDK chunks to StreamChunk"""
+        try:
+            for chunk in stream_obj:
+                usage = self._openai_usage(chunk)
+                if usage is not None:
+                    self._record_usage(usage)
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    yield StreamChunk(choice.delta.content, choice.finish_reason, usage)
+                elif usage is not None:
+                    yield StreamChunk(usage=usage)
+        finally:
+            self._close_stream(stream_obj)
+
     def _convert_anthropic_stream(self, stream_obj):
-        """Convert Anthropic stream to Groq-like format"""
-        class StreamWrapper:
-            def __init__(self, stream):
-                self.stream = stream
-            
-            def __iter__(self):
-                return self
-            
-            def __next__(self):
-                chunk = next(self.stream)
-                class FakeChunk:
-                    def __init__(self, content):
-                        self.choices = [type('obj', (object,), {'delta': type('obj', (object,), {'content': content})()})()]
-                
-                if hasattr(chunk, 'delta') and chunk.delta and hasattr(chunk.delta, 'text'):
-                    return FakeChunk(chunk.delta.text)
-                elif hasattr(chunk, 'type') and chunk.type == 'content_block_delta':
-                    return FakeChunk(chunk.delta.text)
-                else:
-                    return FakeChunk("")
-        
-        return StreamWrapper(stream_obj)
-    
+        """Convert Anthropic stream events to StreamChunk, skipping events without text"""
+        try:
+            for event in stream_obj:
+                event_type = getattr(event, "type", None)
+                if event_type == "message_start":
+                    # Prompt usage, including cache reads and writes, arrives with the first event
+                    self._record_usage(event.message.usage)
+                    yield StreamChunk(usage=event.message.usage)
+                elif event_type == "content_block_delta" and hasattr(event.delta, "text"):
+                    yield StreamChunk(event.delta.text)
+        finally:
+            self._close_stream(stream_obj)
+
     def _convert_cohere_stream(self, stream_obj):
-        """Convert Cohere stream to Groq-like format"""
-        class StreamWrapper:
-            def __init__(self, stream):
-                self.stream = stream
-            
-            def __iter__(self):
-                return self
-            
-            def __next__(self):
-                try:
-                    chunk = next(self.stream)
-                    class FakeChunk:
-                        def __init__(self, content):
-                            self.choices = [type('obj', (object,), {'delta': type('obj', (object,), {'content': content})()})()]
-                    
-                    if hasattr(chunk, 'text'):
-                        return FakeChunk(chunk.text)
-                    elif hasattr(chunk, 'delta') and hasattr(chunk.delta, 'text'):
-                        return FakeChunk(chunk.delta.text)
-                    else:
-                        return FakeChunk("")
-                except StopIteration:
-                    raise
-        
-        return StreamWrapper(stream_obj)
+        """Convert Cohere stream events to StreamChunk, skipping events without text"""
+        try:
+            for event in stream_obj:
+                if getattr(event, "event_type", None) == "text-generation":
+                    yield StreamChunk(event.text)
+        finally:
+            self._close_stream(stream_obj)
     
     def _messages_to_cohere_prompt(self, messages):
         """Convert messages format to Cohere prompt"""
@@ -261,6 +657,54 @@ class LLMClient:
                 prompt += f"Assistant: {content}\n\n"
         return prompt
 
+def CreateLLMClient():
+    """Single-provider client, or a hedged client when LLM_PROVIDERS lists several providers"""
+    if len(PROVIDERS) > 1:
+        from .LLMRouter import HedgedLLMClient
+        return HedgedLLMClient({name: LLMClient(provider=name) for name in PROVIDERS}, hedge_delay=HEDGE_DELAY)
+    return LLMClient(provider=PROVIDERS[0] if PROVIDERS else None)
+
 # Create a global client instance
-llm_client = LLMClient()
+llm_client = CreateLLMClient()
+
+
+
+def _benchmark_chunks(tokens: int = 10000):
+    """Per-chunk time and memory of the old per-token FakeChunk classes vs StreamChunk"""
+    from types import SimpleNamespace
+    import tracemalloc
+
+    events = [SimpleNamespace(event_type="text-generation", text=f"tok{i} ") for i in range(tokens)]
+
+    def legacy_stream(stream):
+        # The adapter as it was: a new class per chunk plus two anonymous classes per token
+        for chunk in stream:
+            class FakeChunk:
+                def __init__(self, content):
+                    self.choices = [type('obj', (object,), {'delta': type('obj', (object,), {'content': content})()})()]
+            yield FakeChunk(chunk.text)
+
+    client = LLMClient.__new__(LLMClient)
+    adapters = {
+        "legacy FakeChunk": legacy_stream,
+        "StreamChunk": client._convert_cohere_stream
+    }
+
+    print(f"{'adapter':>18} | {'ns/chunk':>9} | {'bytes/chunk (kept)':>18}")
+    print("-" * 52)
+    for name, adapter in adapters.items():
+        start = time.perf_counter()
+        for chunk in adapter(iter(events)):
+            chunk.choices[0].delta.content
+        per_chunk = (time.perf_counter() - start) / tokens * 1e9
+
+        tracemalloc.start()
+        kept = list(adapter(iter(events)))
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        print(f"{name:>18} | {per_chunk:>9.0f} | {current / tokens:>18.0f}")
+
 
+if __name__ == "__main__":
+    _benchmark_chunks()
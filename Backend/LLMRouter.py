@@ -0,0 +1,387 @@
+"""
+Hedged Multi-provider LLM Client
+Sends a request to the fastest healthy provider and, if it has not produced
+a first token within the hedge delay, races it against the next one. The
+first stream to produce text wins and the others are cancelled.
+"""
+import threading
+import asyncio
+import queue
+import time
+
+# Smoothing factor for the per-provider latency averages
+EWMA_ALPHA = 0.3
+# Base backoff after a failure; doubles with every consecutive failure
+FAILURE_BACKOFF = 5.0
+MAX_BACKOFF = 300.0
+
+
+class ProviderStats:
+    """EWMA latency and failure backoff for one provider"""
+
+    def __init__(self, name: str, rank: int):
+        self.name = name
+        self.rank = rank
+        self.first_token = None
+        self.total = None
+        self.requests = 0
+        self.wins = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def record_first_token(self, seconds: float):
+        self.first_token = seconds if self.first_token is None else \
+            EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.first_token
+
+    def record_lower_bound(self, seconds: float):
+        """A cancelled stream took at least this long: only ever raises a measured average"""
+        if self.first_token is not None and seconds > self.first_token:
+            self.record_first_token(seconds)
+
+    def record_total(self, seconds: float):
+        self.total = seconds if self.total is None else \
+            EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.total
+        self.consecutive_failures = 0
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.unhealthy_until = now + min(MAX_BACKOFF, FAILURE_BACKOFF * 2 ** (self.consecutive_failures - 1))
+
+    def as_dict(self) -> dict:
+        return {
+            "first_token_ewma": self.first_token, "total_ewma": self.total, "requests": self.requests,
+            "wins": self.wins, "failures": self.failures, "healthy": self.healthy(time.monotonic())
+        }
+
+
+def _has_text(chunk) -> bool:
+    try:
+        return bool(chunk.choices[0].delta.content)
+    except (AttributeError, IndexError):
+        return False
+
+
+class _Racer:
+    """Runs one provider stream in a thread, forwarding its chunks to the shared event queue"""
+
+    def __init__(self, name, client, kwargs, events):
+        self.name = name
+        self.client = client
+        self.kwargs = kwargs
+        self.events = events
+        self.cancelled = threading.Event()
+        self.stream = None
+        self.started = time.monotonic()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.stream = self.client.create_completion(**self.kwargs)
+            for chunk in self.stream:
+                if self.cancelled.is_set():
+                    return
+                self.events.put((self, "chunk", chunk))
+            self.events.put((self, "done", None))
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.events.put((self, "error", e))
+
+    def cancel(self):
+        self.cancelled.set()
+        close = getattr(self.stream, "close", None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass
+
+
+class HedgedLLMClient:
+    """Drop-in replacement for LLMClient that hedges requests across several providers"""
+
+    def __init__(self, clients: dict, hedge_delay: float = 0.8, clock=time.monotonic):
+        # clients: provider name -> object with create_completion/acreate_completion, in preference order
+        self.clients = dict(clients)
+        self.hedge_delay = hedge_delay
+        self.clock = clock
+        self.stats = {name: ProviderStats(name, rank) for rank, name in enumerate(self.clients)}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------ LLMClient facade
+
+    @property
+    def provider(self) -> str:
+        return self.ranked()[0]
+
+    @property
+    def client(self):
+        return next((c.client for c in self.clients.values() if getattr(c, "client", None) is not None), None)
+
+    def get_model_name(self, default_model: str = None):
+        return self.clients[self.provider].get_model_name(default_model)
+
+    def ranked(self) -> list:
+        """Healthy providers first: measured ones by first-token latency, then unmeasured ones in configured order"""
+        now = self.clock()
+        with self._lock:
+            stats = list(self.stats.values())
+
+        def key(s):
+            # An unmeasured provider is not known to be fast; it is tried when the hedge fires
+            measured = s.first_token is not None
+            return (not s.healthy(now), not measured, s.first_token if measured else 0.0, s.rank)
+
+        ranked = [s.name for s in sorted(stats, key=key)
+                  if getattr(self.clients[s.name], "client", True) is not None]
+        return ranked or list(self.clients)
+
+    def report(self) -> dict:
+        with self._lock:
+            return {name: s.as_dict() for name, s in self.stats.items()}
+
+    # ------------------------------------------------------------ recording
+
+    def _first_token(self, name, started):
+        with self._lock:
+            self.stats[name].record_first_token(self.clock() - started)
+            self.stats[name].wins += 1
+
+    def _finished(self, name, started):
+        with self._lock:
+            self.stats[name].record_total(self.clock() - started)
+
+    def _lost(self, name, started):
+        # A cancelled loser had no first token yet; its elapsed time is only a lower bound on its latency
+        with self._lock:
+            self.stats[name].record_lower_bound(self.clock() - started)
+
+    def _failed(self, name, error):
+        print(f"[WARN] LLM provider {name} failed: {error}")
+        with self._lock:
+            self.stats[name].record_failure(self.clock())
+
+    # ----------------------------------------------------------------- sync
+
+    def create_completion(self, model: str, messages: list, max_tokens: int = 2048,
+                          temperature: float = 0.7, top_p: float = 1, stream: bool = True, stop=None):
+        kwargs = dict(model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                      top_p=top_p, stream=stream, stop=stop)
+        order = self.ranked()
+        if not stream:
+            return self._failover(order, kwargs)
+        return self._hedged_stream(order, kwargs)
+
+    def _failover(self, order, kwargs):
+        last_error = None
+        for name in order:
+            started = self.clock()
+            with self._lock:
+                self.stats[name].requests += 1
+            try:
+                result = self.clients[name].create_completion(**kwargs)
+                self._first_token(name, started)
+                self._finished(name, started)
+                return result
+            except Exception as e:
+                last_error = e
+                self._failed(name, e)
+        raise last_error or ValueError("No LLM providers configured")
+
+    def _hedged_stream(self, order, kwargs):
+        events = queue.Queue()
+        pending = list(order)
+        racers = []
+        winner = None
+        buffered = []
+        last_error = None
+        next_hedge = None
+
+        def launch():
+            nonlocal next_hedge
+            name = pending.pop(0)
+            with self._lock:
+                self.stats[name].requests += 1
+            racers.append(_Racer(name, self.clients[name], kwargs, events))
+            next_hedge = time.monotonic() + self.hedge_delay if pending else None
+
+        launch()
+        try:
+            # Phase 1: wait for the first provider that produces text
+            while winner is None:
+                live = [r for r in racers if not r.cancelled.is_set()]
+                if not live and not pending:
+                    raise last_error or RuntimeError("All LLM providers failed")
+                if not live or (next_hedge is not None and time.monotonic() >= next_hedge):
+                    if pending:
+                        launch()
+                        continue
+                timeout = None if next_hedge is None else max(0.0, next_hedge - time.monotonic())
+                try:
+                    racer, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if racer.cancelled.is_set():
+                    continue
+                if kind == "error":
+                    last_error = payload
+                    racer.cancelled.set()
+                    self._failed(racer.name, payload)
+                elif kind == "done":
+                    # Finished without any text: accept it rather than hanging
+                    winner = racer
+                    buffered.append(None)
+                else:
+                    buffered.append(payload)
+                    if _has_text(payload):
+                        winner = racer
+
+            for racer in racers:
+                if racer is not winner:
+                    if not racer.cancelled.is_set():
+                        self._lost(racer.name, racer.started)
+                    racer.cancel()
+            self._first_token(winner.name, winner.started)
+        except BaseException:
+            for racer in racers:
+                racer.cancel()
+            raise
+
+        # Phase 2: stream the winner
+        try:
+            for chunk in buffered:
+                if chunk is None:
+                    self._finished(winner.name, winner.started)
+                    return
+                yield chunk
+            while True:
+                racer, kind, payload = events.get()
+                if racer is not winner:
+                    continue
+                if kind == "chunk":
+                    yield payload
+                elif kind == "done":
+                    self._finished(winner.name, winner.started)
+                    return
+                else:
+                    self._failed(winner.name, payload)
+                    raise payload
+        finally:
+            winner.cancel()
+
+    # ---------------------------------------------------------------- async
+
+    async def acreate_completion(self, model: str, messages: list, max_tokens: int = 2048,
+                                 temperature: float = 0.7, top_p: float = 1, stop=None, **kwargs):
+        """Async hedged stream: same racing rules as create_completion, using tasks instead of threads"""
+        request = dict(model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                       top_p=top_p, stop=stop, **kwargs)
+        pending = self.ranked()
+        streams = {}
+        tasks = {}
+        last_error = None
+
+        def launch():
+            name = pending.pop(0)
+            with self._lock:
+                self.stats[name].requests += 1
+            stream = self.clients[name].acreate_completion(**request).__aiter__()
+            streams[name] = (stream, self.clock(), [])
+            tasks[asyncio.ensure_future(self._afirst_text(stream, streams[name][2]))] = name
+
+        launch()
+        winner = None
+        try:
+            while winner is None:
+                if not tasks:
+                    if not pending:
+                        raise last_error or RuntimeError("All LLM providers failed")
+                    launch()
+                timeout = self.hedge_delay if pending else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    name = tasks.pop(task)
+                    try:
+                        task.result()
+                    except Exception as e:
+                        last_error = e
+                        self._failed(name, e)
+                        continue
+                    if winner is None:
+                        winner = name
+        finally:
+            for task, name in tasks.items():
+                if winner is not None:
+                    self._lost(name, streams[name][1])
+                task.cancel()
+            # Let cancelled pulls unwind before closing their streams
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for name, (stream, _, _) in streams.items():
+                if name != winner:
+                    await _aclose(stream)
+
+        stream, started, buffered = streams[winner]
+        self._first_token(winner, started)
+        try:
+            for chunk in buffered:
+                yield chunk
+            async for chunk in stream:
+                yield chunk
+            self._finished(winner, started)
+        except Exception as e:
+            self._failed(winner, e)
+            raise
+        finally:
+            await _aclose(stream)
+
+    @staticmethod
+    async def _afirst_text(stream, buffered):
+        """Pull chunks until the first one with text (or the end of the stream)"""
+        async for chunk in stream:
+            buffered.append(chunk)
+            if _has_text(chunk):
+                return
+        return
+
+
+async def _aclose(stream):
+    close = getattr(stream, "aclose", None)
+    if close:
+        try:
+            await close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    from .MockLLMServer import FakeLLMClient
+
+    router = HedgedLLMClient({
+        "slow": FakeLLMClient("slow answer", first_token_delay=2.0),
+        "fast": FakeLLMClient("fast answer", first_token_delay=0.2),
+        "broken": FakeLLMClient("never", fail=True)
+    }, hedge_delay=0.5)
+
+    for turn in range(3):
+        start = time.perf_counter()
+        text = "".join(c.choices[0].delta.content or "" for c in router.create_completion("mock", []))
+        print(f"turn {turn + 1}: {text!r} in {time.perf_counter() - start:.2f}s, primary now: {router.provider}")
+
+    async def async_turn():
+        start = time.perf_counter()
+        text = ""
+        async for chunk in router.acreate_completion("mock", []):
+            text += chunk.choices[0].delta.content or ""
+        print(f"async: {text!r} in {time.perf_counter() - start:.2f}s")
+
+    asyncio.run(async_turn())
+    for name, stats in router.report().items():
+        print(name, stats)
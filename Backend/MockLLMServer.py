@@ -0,0 +1,276 @@
+"""
+Local Mock LLM Server
+OpenAI-compatible /chat/completions endpoint with configurable latency
+and simulated prompt-prefix caching, plus an in-process fake client, used
+for benchmarks and offline testing of LLMProvider without API keys.
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from collections import deque
+import threading
+import json
+import time
+
+
+class MockLLMServer:
+    """
+    Streams a canned answer token by token after a configurable first-token delay.
+    Prompts are cached like OpenAI's automatic prefix cache: the longest prefix shared
+    with an earlier prompt is reused in cache_block steps once it reaches
+    min_cache_tokens, and only the uncached tokens pay prefill_delay each.
+    """
+
+    def __init__(self, answer: str = "This is a mock answer from the local test server.",
+                 first_token_delay: float = 0.2, token_delay: float = 0.01, host: str = "127.0.0.1", port: int = 0,
+                 min_cache_tokens: int = 1024, cache_block: int = 128, prefill_delay: float = 0.0):
+        self.answer = answer
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.min_cache_tokens = min_cache_tokens
+        self.cache_block = cache_block
+        self.prefill_delay = prefill_delay
+        self.requests = 0
+        self.usage = []
+        self._prompts = deque(maxlen=64)
+        self._cache_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def prompt_usage(self, messages: list) -> dict:
+        """Prompt tokens (one per word plus one per role marker) and how many hit the prefix cache"""
+        tokens = []
+        for message in messages:
+            tokens.append(f"<{message.get('role')}>")
+            tokens.extend(str(message.get("content", "")).split())
+        with self._cache_lock:
+            shared = 0
+            for previous in self._prompts:
+                length = 0
+                for a, b in zip(previous, tokens):
+                    if a != b:
+                        break
+                    length += 1
+                shared = max(shared, length)
+            self._prompts.append(tuple(tokens))
+        cached = 0
+        if shared >= self.min_cache_tokens:
+            # At least one token is always processed fresh
+            cached = min(shared // self.cache_block * self.cache_block, len(tokens) - 1)
+        usage = {"prompt_tokens": len(tokens), "prompt_tokens_details": {"cached_tokens": cached}}
+        self.usage.append(usage)
+        return usage
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _payload(self, body: dict, text: str = None, finish_reason=None):
+                delta = {} if text is None else {"content": text}
+                return {
+                    "id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                }
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                server.requests += 1
+                usage = server.prompt_usage(body.get("messages", []))
+                uncached = usage["prompt_tokens"] - usage["prompt_tokens_details"]["cached_tokens"]
+                time.sleep(server.first_token_delay + uncached * server.prefill_delay)
+                tokens = [word + " " for word in server.answer.split(" ")]
+                usage["completion_tokens"] = len(tokens)
+                usage["total_tokens"] = usage["prompt_tokens"] + len(tokens)
+
+                if not body.get("stream"):
+                    data = json.dumps({
+                        "id": "mock", "object": "chat.completion", "created": int(time.time()),
+                        "model": body.get("model", "mock"),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": "".join(tokens).strip()}}],
+                        "usage": usage
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for index, token in enumerate(tokens):
+                        if index:
+                            time.sleep(server.token_delay)
+                        self._send_event(json.dumps(self._payload(body, token)))
+                    self._send_event(json.dumps(self._payload(body, finish_reason="stop")))
+                    if (body.get("stream_options") or {}).get("include_usage"):
+                        final = self._payload(body)
+                        final["choices"] = []
+                        final["usage"] = usage
+                        self._send_event(json.dumps(final))
+                    self._send_event("[DONE]")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled the stream
+                    pass
+
+            def _send_event(self, data: str):
+                event = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+class FakeLLMClient:
+    """In-process stand-in for LLMClient with injected latencies (no HTTP at all)"""
+
+    def __init__(self, answer: str = "This is a fake answer.", first_token_delay: float = 0.1,
+                 token_delay: float = 0.0, fail: bool = False, provider: str = "fake"):
+        self.answer = answer
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.fail = fail
+        self.provider = provider
+        self.client = self
+        self.calls = 0
+
+    def get_model_name(self, default_model: str = None):
+        return default_model or "fake"
+
+    def _tokens(self):
+        return [word + " " for word in self.answer.split(" ")]
+
+    def create_completion(self, model: str = None, messages: list = None, **kwargs):
+        from .LLMProvider import StreamChunk
+        self.calls += 1
+
+        def stream():
+            time.sleep(self.first_token_delay)
+            if self.fail:
+                raise ConnectionError(f"{self.provider} is unavailable")
+            for index, token in enumerate(self._tokens()):
+                if index and self.token_delay:
+                    time.sleep(self.token_delay)
+                yield StreamChunk(token)
+        return stream()
+
+    async def acreate_completion(self, model: str = None, messages: list = None, **kwargs):
+        import asyncio
+        from .LLMProvider import StreamChunk
+        self.calls += 1
+        await asyncio.sleep(self.first_token_delay)
+        if self.fail:
+            raise ConnectionError(f"{self.provider} is unavailable")
+        for index, token in enumerate(self._tokens()):
+            if index and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield StreamChunk(token)
+
+
+def _benchmark(requests: int = 16):
+    """The same number of completions sent one after another (sync) and concurrently on one event loop (async)"""
+    import asyncio
+    from .LLMProvider import LLMClient
+
+    messages = [{"role": "user", "content": "hello"}]
+    with MockLLMServer(first_token_delay=0.2, token_delay=0.01) as server:
+        client = LLMClient(provider="openai", api_key="mock", base_url=server.base_url)
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            for _ in client.create_completion(model="mock", messages=messages):
+                pass
+        sync_elapsed = time.perf_counter() - start
+
+        async def one():
+            async for _ in client.acreate_completion(model="mock", messages=messages):
+                pass
+
+        async def concurrent():
+            await asyncio.gather(*(one() for _ in range(requests)))
+
+        start = time.perf_counter()
+        asyncio.run(concurrent())
+        async_elapsed = time.perf_counter() - start
+
+    print(f"sync sequential : {requests} requests in {sync_elapsed:.2f}s -> {requests / sync_elapsed:.1f} req/s")
+    print(f"async concurrent: {requests} requests in {async_elapsed:.2f}s -> {requests / async_elapsed:.1f} req/s")
+
+
+def _prefix_cache_demo(turns: int = 8):
+    """Cached prompt tokens and first-token latency with the time before vs after the history"""
+    import datetime
+    import io
+    import contextlib
+    from .LLMProvider import LLMClient
+
+    system = [{"role": "system", "content": " ".join(f"instruction{i}" for i in range(1200))}]
+    results = {}
+    for layout in ("time before history", "time after history"):
+        answer = " ".join(f"answer{i}" for i in range(300))
+        with MockLLMServer(answer, first_token_delay=0.05, token_delay=0.0, prefill_delay=0.0002) as server:
+            client = LLMClient(provider="openai", api_key="mock", base_url=server.base_url)
+            history = []
+            latencies = []
+            for turn in range(turns):
+                now = {"role": "system", "content": f"Time: {datetime.datetime.now().isoformat()} turn {turn}"}
+                query = {"role": "user", "content": f"question number {turn}"}
+                if layout == "time before history":
+                    messages = system + [now] + history + [query]
+                else:
+                    messages = system + history + [now, query]
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    stream = client.create_completion(model="mock", messages=messages)
+                    first = None
+                    for chunk in stream:
+                        if first is None and chunk.content:
+                            first = time.perf_counter() - start
+                latencies.append(first)
+                history += [query, {"role": "assistant", "content": server.answer}]
+            results[layout] = (client.prompt_cache_report(), sum(latencies[1:]) / (turns - 1))
+
+    print(f"{'layout':<20} | {'prompt tokens':>13} | {'cached':>7} | {'hit ratio':>9} | {'first token (turn 2+)':>21}")
+    print("-" * 84)
+    for layout, (report, latency) in results.items():
+        print(f"{layout:<20} | {report['prompt_tokens']:>13} | {report['cached_tokens']:>7} | "
+              f"{report['hit_ratio']:>9.0%} | {latency * 1000:>18.0f} ms")
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["cache"]:
+        _prefix_cache_demo()
+    else:
+        _benchmark()
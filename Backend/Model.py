@@ -2,6 +2,9 @@ import cohere
 from rich import print
 from dotenv import load_dotenv
 from pathlib import Path 
+from .ModelHealth import model_health
+from .SessionStore import sessions
+import time
 import os
 
 dotenv_path = Path(__file__).resolve().parents[1] / ".env"
@@ -22,8 +25,6 @@ funcs = [
     "youtube search","reminder"
 ]
 
-messages = []
-
 preamble = """
 You are a very accurate Decision-Making Model, which decides what kind of a query is given to you.
 You will decide whether a query is a 'general' query, a 'realtime' query, or is asking to perform any task or automation like 'open facebook, instagram', 'can you write a application and open it in notepad'
@@ -59,19 +60,29 @@ ChatHistory = [
     {"role": "Chatbot", "message": "general chat with me."}
 ]
 
-def FirstLayerDMM(prompt: str = "test"):
-    messages.append({"role":"user","content":f"{prompt}"})
+# Candidate models in preference order (fall back to supported ones if some are deprecated)
+candidate_models = [
+    'command-r-plus',
+    'command-xlarge',
+    'command-xlarge-nightly',
+    'command'
+]
+
+def ProbeModel(model_name):
+    """Smallest possible request; raises if the model is unavailable"""
+    co.chat(model=model_name, message="ping", max_tokens=1)
 
-    # Try a list of candidate models (fall back to supported ones if some are deprecated)
-    candidate_models = [
-        'command-r-plus',
-        'command-xlarge',
-        'command-xlarge-nightly',
-        'command'
-    ]
+def StartModelProbing():
+    """Re-probe models in backoff in the background instead of on user requests (started by main.py)"""
+    model_health.start_probing(candidate_models, ProbeModel)
+
+def FirstLayerDMM(prompt: str = "test", session=None):
+    (session or sessions.default).dmm_messages.append({"role":"user","content":f"{prompt}"})
 
     last_exception = None
-    for model_name in candidate_models:
+    # Known-good models first; models in backoff are skipped
+    for model_name in model_health.order(candidate_models):
+        started = time.perf_counter()
         try:
             stream = co.chat_stream(
                 model=model_name,
@@ -91,8 +102,12 @@ def FirstLayerDMM(prompt: str = "test"):
             except Exception as e:
                 # streaming failed on first event (e.g., model invalid), try next model
                 print(f"[WARN] Stream start failed for {model_name}: {e}")
+                last_exception = e
+                model_health.record_failure(model_name, e)
                 continue
 
+            model_health.record_success(model_name, time.perf_counter() - started)
+
             # Create a generator that yields the first event and the rest
             def _chain_events(first, rest_stream):
                 yield first
@@ -103,6 +118,7 @@ def FirstLayerDMM(prompt: str = "test"):
         except Exception as e:
             last_exception = e
             print(f"[WARN] Model {model_name} failed, trying next: {e}")
+            model_health.record_failure(model_name, e)
 
     # If we've exhausted options, re-raise the last exception to be handled by the caller
     if last_exception:
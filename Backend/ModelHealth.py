@@ -0,0 +1,221 @@
+"""
+Model Health Registry
+Remembers which FirstLayerDMM candidate models work and how fast they are,
+so the hot path goes straight to a known-good model. Failing models are
+put on exponential backoff and only come back after a background probe
+succeeds, so a user request is never the first to retry a dead model. The
+registry is kept in Data/ModelHealth.json across restarts.
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+import threading
+import atexit
+import json
+import time
+import os
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# First backoff after a failure in seconds; doubles with every consecutive failure
+BACKOFF = float(env_vars.get("MODEL_HEALTH_BACKOFF", 60))
+MAX_BACKOFF = float(env_vars.get("MODEL_HEALTH_MAX_BACKOFF", 24 * 3600))
+# How often the background thread looks for models whose backoff has expired
+PROBE_INTERVAL = float(env_vars.get("MODEL_HEALTH_PROBE_INTERVAL", 30))
+# Routine successes are written to disk at most this often; failures and recoveries at once
+SAVE_INTERVAL = float(env_vars.get("MODEL_HEALTH_SAVE_INTERVAL", 60))
+
+EWMA_ALPHA = 0.3
+
+
+class ModelHealth:
+    """Persistent per-model success/failure record with exponential backoff"""
+
+    def __init__(self, path=DATA_DIR / "ModelHealth.json", backoff: float = BACKOFF,
+                 max_backoff: float = MAX_BACKOFF, clock=time.time, save_interval: float = SAVE_INTERVAL):
+        self.path = Path(path)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._models = self._load()
+        self._prober = None
+        self._stop = threading.Event()
+        self._dirty = False
+        self._saved_at = self.clock()
+        atexit.register(self.flush)
+
+    # ----------------------------------------------------------- persistence
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return {}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._models, f, indent=4)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+        self._saved_at = self.clock()
+
+    def flush(self):
+        """Write successes that are still only in memory (at exit)"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _record(self, model: str) -> dict:
+        return self._models.setdefault(model, {
+            "successes": 0, "failures": 0, "consecutive_failures": 0, "latency": None,
+            "last_success": None, "last_failure": None, "retry_at": 0.0, "last_error": None
+        })
+
+    # ---------------------------------------------------------------- state
+
+    def healthy(self, model: str) -> bool:
+        """Not failing; a failed model stays unhealthy until a success (normally a background probe)"""
+        with self._lock:
+            record = self._models.get(model)
+            return record is None or record["consecutive_failures"] == 0
+
+    def order(self, candidates: list) -> list:
+        """
+        Candidates to try on the hot path: the healthy ones, in the configured preference order
+        (latency is recorded, not used to pick a model). Failed models are skipped even after
+        their backoff expires, until a background probe succeeds; if every model has failed,
+        all are returned, soonest retry first, so a request is never refused outright.
+        """
+        with self._lock:
+            records = {m: self._models.get(m) for m in candidates}
+        healthy = [m for m in candidates if records[m] is None or records[m]["consecutive_failures"] == 0]
+        if healthy:
+            return healthy
+        return sorted(candidates, key=lambda m: records[m]["retry_at"])
+
+    def due(self, candidates: list) -> list:
+        """Models whose backoff has expired without a request having tried them yet"""
+        now = self.clock()
+        with self._lock:
+            return [m for m in candidates if m in self._models
+                    and self._models[m]["consecutive_failures"] and now >= self._models[m]["retry_at"]]
+
+    def record_success(self, model: str, seconds: float = None):
+        with self._lock:
+            record = self._record(model)
+            # A recovery changes the order, so it is written at once (so is a first success); a
+            # routine success only updates the counters and latency
+            changed = record["consecutive_failures"] > 0 or record["last_success"] is None
+            record["successes"] += 1
+            record["consecutive_failures"] = 0
+            record["retry_at"] = 0.0
+            record["last_success"] = self.clock()
+            if seconds is not None:
+                record["latency"] = seconds if record["latency"] is None else \
+                    EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * record["latency"]
+            self._dirty = True
+            if changed or self.clock() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def record_failure(self, model: str, error=None):
+        with self._lock:
+            record = self._record(model)
+            record["failures"] += 1
+            record["consecutive_failures"] += 1
+            record["last_failure"] = self.clock()
+            delay = min(self.max_backoff, self.backoff * 2 ** (record["consecutive_failures"] - 1))
+            record["retry_at"] = record["last_failure"] + delay
+            record["last_error"] = str(error)[:200] if error is not None else None
+            self._save()
+        print(f"[WARN] Model {model} unhealthy for {delay:.0f}s: {error}")
+
+    def report(self) -> dict:
+        with self._lock:
+            return json.loads(json.dumps(self._models))
+
+    # -------------------------------------------------------------- probing
+
+    def probe(self, candidates: list, probe):
+        """Re-probe every model whose backoff expired; probe(model) raises when the model does not work"""
+        for model in self.due(candidates):
+            start = time.perf_counter()
+            try:
+                probe(model)
+            except Exception as e:
+                self.record_failure(model, e)
+            else:
+                self.record_success(model, time.perf_counter() - start)
+                print(f"[INFO] Model {model} is healthy again")
+
+    def start_probing(self, candidates: list, probe, interval: float = PROBE_INTERVAL):
+        """Re-probe failed models on a daemon thread so user requests never pay for it"""
+        if self._prober is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.probe(candidates, probe)
+                except Exception as e:
+                    print(f"[WARN] Model probe failed: {e}")
+
+        self._prober = threading.Thread(target=loop, daemon=True)
+        self._prober.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Shared registry for the FirstLayerDMM candidate models
+model_health = ModelHealth()
+
+
+def _demo(calls: int = 5, failure_cost: float = 0.3):
+    """Per-call cost of walking the candidate list vs going straight to the known-good model"""
+    import tempfile
+
+    candidates = ["deprecated-a", "deprecated-b", "working"]
+
+    def call(model):
+        if model.startswith("deprecated"):
+            time.sleep(failure_cost)
+            raise ValueError(f"model '{model}' was removed")
+        time.sleep(0.05)
+
+    def walk(order, health=None):
+        start = time.perf_counter()
+        for model in order:
+            try:
+                call(model)
+            except ValueError as e:
+                if health:
+                    health.record_failure(model, e)
+                continue
+            if health:
+                health.record_success(model, time.perf_counter() - start)
+            break
+        return time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        health = ModelHealth(Path(tmp) / "ModelHealth.json")
+        for i in range(calls):
+            legacy = walk(candidates)
+            tracked = walk(health.order(candidates), health)
+            print(f"call {i + 1}: candidate walk {legacy * 1000:.0f} ms | registry {tracked * 1000:.0f} ms")
+
+        # A restart reads the same file and keeps skipping the dead models
+        restarted = ModelHealth(Path(tmp) / "ModelHealth.json")
+        print(f"after restart the hot path tries: {restarted.order(candidates)}")
+
+
+if __name__ == "__main__":
+    _demo()
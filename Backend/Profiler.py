@@ -0,0 +1,374 @@
+"""
+Profiler
+Statistical sampling profiler for a live assistant: a background thread
+reads the stack of every thread (sys._current_frames) PROFILE_HZ times a
+second and counts identical stacks, so GUI timers, the voice thread, the
+asyncio loop, speech workers and Selenium/pygame calls all show up in one
+profile. Each capture is written to Data/profiles/ in the collapsed-stack
+format ("thread;outer;...;inner count") that flamegraph.pl, speedscope and
+inferno read.
+
+A capture runs for a number of seconds or for the next N utterances and is
+started by the PROFILE setting at startup, SIGUSR1 (toggle), or
+POST /profile on the headless server. PROFILE=always keeps sampling and
+writes one file per PROFILE_WINDOW seconds.
+
+Overhead and a sample capture: python -m Backend.Profiler
+Hottest functions of a capture: python -m Backend.Profiler Data/profiles/<file>.collapsed
+"""
+from pathlib import Path
+from collections import Counter
+from dotenv import dotenv_values
+import threading
+import argparse
+import atexit
+import signal
+import time
+import sys
+import re
+import os
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+PROFILE_DIR = DATA_DIR / "profiles"
+# Capture started with the assistant: "30s", "5u" (next 5 utterances), "always" or empty (off)
+STARTUP = env_vars.get("PROFILE", "").strip().lower()
+# Stack samples per second; odd so sampling does not fall in step with 10/50/100 ms timers
+HZ = float(env_vars.get("PROFILE_HZ", 97))
+# Seconds per file with PROFILE=always
+WINDOW = float(env_vars.get("PROFILE_WINDOW", 300))
+# Files kept in Data/profiles (the oldest are deleted)
+KEEP = int(env_vars.get("PROFILE_KEEP", 50))
+# Also count threads parked in a wait (lock, queue, select); off shows where CPU goes
+IDLE = env_vars.get("PROFILE_IDLE", "off").lower() in ("on", "true", "1", "yes")
+# Length of a capture started by SIGUSR1 or by POST /profile without a length
+DEFAULT_SECONDS = 30
+
+# Innermost frames of a thread that is waiting rather than running
+IDLE_FRAMES = {("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("threading.py", "join"),
+               ("selectors.py", "select"), ("queue.py", "get"), ("socket.py", "accept"),
+               ("socket.py", "readinto"), ("connection.py", "wait"), ("subprocess.py", "_wait"),
+               ("thread.py", "_worker")}
+
+
+class Capture:
+    """One profile being recorded: what ends it and the stack counts so far"""
+
+    def __init__(self, seconds: float = None, utterances: int = None, window: float = None):
+        self.seconds = seconds
+        self.utterances = utterances
+        self.window = window
+        self.started = time.monotonic()
+        self.stop = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+        self.utterances_done = 0
+        self.sampling_seconds = 0.0
+        # Last file written for this capture
+        self.file = None
+
+    @property
+    def reason(self) -> str:
+        if self.window:
+            return "always"
+        if self.utterances:
+            return f"{self.utterances}u"
+        return f"{self.seconds:g}s"
+
+    def due(self, now: float) -> bool:
+        return self.seconds is not None and now - self.started >= self.seconds
+
+
+class Profiler:
+    """Samples every thread's stack on a background thread while a capture is running"""
+
+    def __init__(self, directory=PROFILE_DIR, hz: float = HZ, keep: int = KEEP, idle: bool = IDLE):
+        self.directory = Path(directory)
+        self.hz = hz
+        self.keep = keep
+        self.idle = idle
+        self.last_file = None
+        self._capture = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._labels = {}
+        self._names = {}
+        # A capture still running at exit is written, not lost with the daemon thread
+        atexit.register(self.stop)
+
+    @property
+    def running(self) -> bool:
+        return self._capture is not None
+
+    # -------------------------------------------------------------- control
+
+    def start(self, seconds: float = None, utterances: int = None, always: bool = False) -> dict:
+        """Start a capture (DEFAULT_SECONDS when no length is given); a running one is replaced after it is written"""
+        if not always and seconds is None and not utterances:
+            seconds = DEFAULT_SECONDS
+        self.stop()
+        capture = Capture(seconds=None if always else seconds, utterances=None if always else utterances,
+                          window=WINDOW if always else None)
+        with self._lock:
+            self._capture = capture
+            self._thread = threading.Thread(target=self._sample, args=(capture,), name="Profiler", daemon=True)
+            self._thread.start()
+        print(f"[PROFILE] Sampling all threads at {self.hz:g} Hz ({capture.reason})")
+        return self.status()
+
+    def stop(self):
+        """End the running capture and write it; returns the file or None"""
+        with self._lock:
+            capture, thread = self._capture, self._thread
+        if capture is None:
+            return None
+        capture.stop.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        return capture.file
+
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def utterance_done(self):
+        """Called after every utterance; ends a capture of the next N utterances once N are done"""
+        capture = self._capture
+        if capture is not None:
+            capture.utterances_done += 1
+            if capture.utterances and capture.utterances_done >= capture.utterances:
+                # The sampler thread writes the file; the caller (the event loop) does not wait for it
+                capture.stop.set()
+
+    def status(self) -> dict:
+        capture = self._capture
+        status = {"running": capture is not None, "hz": self.hz,
+                  "last_file": str(self.last_file) if self.last_file else None}
+        if capture is not None:
+            status.update(reason=capture.reason, samples=capture.samples,
+                          seconds=round(time.monotonic() - capture.started, 1),
+                          utterances=capture.utterances_done,
+                          overhead=round(capture.sampling_seconds / max(1e-9, time.monotonic() - capture.started), 4))
+        return status
+
+    def start_from_env(self, spec: str = STARTUP):
+        """Start the capture named by the PROFILE setting ("30s", "5u", "always"); empty or "off" does nothing"""
+        spec = (spec or "").strip().lower()
+        if spec in ("", "off", "0", "false", "no"):
+            return
+        try:
+            if spec in ("on", "always"):
+                self.start(always=True)
+            elif spec.endswith("u"):
+                self.start(utterances=int(spec[:-1]))
+            else:
+                self.start(seconds=float(spec.rstrip("s")))
+        except ValueError:
+            print(f"[WARN] PROFILE={spec!r} not understood (use 30s, 5u or always)")
+
+    def install_signal(self):
+        """SIGUSR1 starts a DEFAULT_SECONDS capture, or ends the running one (not on Windows)"""
+        if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+            return False
+
+        def handler(signum, frame):
+            # Joining the sampler inside a signal handler could wait on a lock the interrupted code holds
+            threading.Thread(target=self.toggle, name="ProfilerToggle", daemon=True).start()
+
+        signal.signal(signal.SIGUSR1, handler)
+        return True
+
+    # ------------------------------------------------------------- sampling
+
+    def _sample(self, capture: Capture):
+        interval = 1.0 / self.hz
+        own = threading.get_ident()
+        next_at = time.perf_counter()
+        window_start = time.monotonic()
+        while not capture.stop.is_set():
+            cpu = time.thread_time()
+            names = self._names
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = self._names = {thread.ident: _thread_name(thread.name) for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if not self.idle and stack and (Path(stack[0].co_filename).name, stack[0].co_name) in IDLE_FRAMES:
+                    continue
+                capture.stacks[(names.get(ident, "thread"), tuple(stack))] += 1
+            capture.samples += 1
+            capture.sampling_seconds += time.thread_time() - cpu
+
+            now = time.monotonic()
+            if capture.due(now):
+                break
+            if capture.window and now - window_start >= capture.window:
+                self._write(capture)
+                capture.stacks = Counter()
+                window_start = now
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay < 0:
+                # Fell behind (a long GIL hold); skip the missed samples instead of bursting
+                next_at = time.perf_counter()
+                delay = 0
+            capture.stop.wait(delay)
+
+        with self._lock:
+            if self._capture is capture:
+                self._capture = None
+        self._write(capture)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = Path(code.co_filename)
+            try:
+                path = path.resolve().relative_to(BASE_DIR)
+            except (ValueError, OSError):
+                path = Path(path.name)
+            name = getattr(code, "co_qualname", code.co_name)
+            # ';' separates frames and ' ' the count in the collapsed format
+            label = self._labels[code] = f"{name} ({path.as_posix()}:{code.co_firstlineno})".replace(";", ":")
+        return label
+
+    def _write(self, capture: Capture):
+        if not capture.stacks:
+            print(f"[PROFILE] No busy stacks in {capture.samples} samples; nothing written")
+            return
+        lines = Counter()
+        for (thread, stack), count in capture.stacks.items():
+            lines[";".join([thread] + [self._label(code) for code in reversed(stack)])] += count
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{capture.reason}.collapsed"
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for line, count in sorted(lines.items()):
+                f.write(f"{line} {count}\n")
+        os.replace(temp_path, path)
+        self.last_file = capture.file = path
+        elapsed = time.monotonic() - capture.started
+        print(f"[PROFILE] {capture.samples} samples, {capture.utterances_done} utterances, "
+              f"{capture.sampling_seconds / max(1e-9, elapsed):.2%} of a core spent sampling -> {path}")
+        self._prune()
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.collapsed"), key=lambda p: p.stat().st_mtime)
+        for old in files[:-self.keep] if self.keep > 0 else []:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def _thread_name(name: str) -> str:
+    """Pool threads (HeadlessServer_3, Thread-12 (worker)) merge into one flame graph root"""
+    return re.sub(r"[_-]\d+(?= |$)", "", name).replace(";", ":").replace(" ", "_")
+
+
+# Shared profiler; main.py starts PROFILE captures and the headless server exposes /profile
+profiler = Profiler()
+
+
+def LoadCollapsed(path) -> Counter:
+    """Stack -> sample count from a collapsed-stack file"""
+    stacks = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def HotFunctions(stacks: Counter, top: int = 15) -> list:
+    """(function, self samples, total samples) of the functions sampled most often, by self samples"""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    return [(frame, count, total[frame]) for frame, count in own.most_common(top)]
+
+
+def _benchmark(seconds: float = 2.0, workers: int = 4, repeat: int = 3):
+    """Cost of sampling: the same CPU-bound work with the profiler off and on, and the capture it writes"""
+    import tempfile
+
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    def parse(text):
+        return sum(len(word) for word in text.split())
+
+    def work(stop, done):
+        count = 0
+        while not stop.is_set():
+            fib(16)
+            parse("open chrome and play some music " * 20)
+            count += 1
+        done.append(count)
+
+    def run():
+        stop, done = threading.Event(), []
+        # Idle threads the profiler also walks, as in the assistant (speech workers, the event loop)
+        parked = [threading.Thread(target=stop.wait, name=f"Idle_{i}", daemon=True) for i in range(8)]
+        threads = [threading.Thread(target=work, args=(stop, done), name=f"Worker_{i}") for i in range(workers)]
+        for thread in parked + threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return sum(done) / seconds
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sampler = Profiler(Path(tmp), hz=HZ)
+        # Alternate the runs and keep the best of each, so a noisy neighbour does not decide the result
+        baseline, profiled = 0.0, 0.0
+        for _ in range(repeat):
+            baseline = max(baseline, run())
+            sampler.start(seconds=60)
+            profiled = max(profiled, run())
+            capture = sampler._capture
+            path = sampler.stop()
+        samples, spent = capture.samples, capture.sampling_seconds
+        print(f"\n{workers} busy + 8 idle threads, best of {repeat} runs of {seconds:g}s")
+        print(f"profiler off: {baseline:10.0f} iterations/s")
+        print(f"profiler on : {profiled:10.0f} iterations/s ({(profiled - baseline) / baseline:+.1%}, "
+              f"{samples / seconds:.0f} samples/s of {HZ:g} asked for, {spent / max(1, samples) * 1e6:.0f} us per sample)")
+        print(f"\nhottest functions in {path.name}:")
+        for frame, own, total in HotFunctions(LoadCollapsed(path), top=5):
+            print(f"  {own:6d} self {total:6d} total  {frame}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Backend.Profiler",
+                                     description="Measure the sampling overhead, or list the hottest functions of a capture")
+    parser.add_argument("file", nargs="?", help="collapsed-stack file from Data/profiles")
+    parser.add_argument("--top", type=int, default=15, help="functions to list")
+    args = parser.parse_args(argv)
+    if args.file is None:
+        _benchmark()
+        return
+    stacks = LoadCollapsed(args.file)
+    samples = sum(stacks.values())
+    print(f"{samples} samples, {len(stacks)} distinct stacks")
+    print(f"{'self':>6} {'self %':>7} {'total':>6}  function")
+    for frame, own, total in HotFunctions(stacks, args.top):
+        print(f"{own:>6} {own / max(1, samples):>7.1%} {total:>6}  {frame}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 from googlesearch import search
 from .LLMProvider import llm_client
-from json import load, dump
+from .SessionStore import sessions
+from .SpeechStream import speech_pipeline, CompletionText
+from .Tracing import tracer
 import datetime
+import time
 from dotenv import dotenv_values
 from pathlib import Path
 
@@ -16,17 +19,10 @@ System = f"""Hello, I am {Username}, You are a very accurate and advanced AI cha
 *** Provide Answers In a Professional Way, make sure to add full stops, commas, question marks, and use proper grammar.***
 *** Just answer the question from the provided data in a professional way. ***"""
 
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-chatlog_path = DATA_DIR / "Chatlog.json"
-try:
-    with open(chatlog_path, "r") as f:
-        messages = load(f)
-except:
-    with open(chatlog_path, "w") as f:
-        dump([], f)
-
 def GoogleSearch(Query):
-    results = list(search(Query, advanced=True, num_results=5))
+    with tracer.span("google_search", query=Query[:120]) as span:
+        results = list(search(Query, advanced=True, num_results=5))
+        span["results"] = len(results)
     Answer = f"The search results for '{Query}' are:\n[start]\n"
 
     for i in results:
@@ -65,19 +61,26 @@ def Information():
     data += f"Time: {hour} hours, {minute} minutes, {second} seconds.\n"
     return data
 
-def RealtimeSearchEngine(prompt):
-    global SystemChatBot, messages
-
-    chatlog_path = DATA_DIR / "Chatlog.json"
-    with open(chatlog_path, "r") as f:
-        messages = load(f)
-    messages.append({"role":"user","content": f"{prompt}"})
-
-    SystemChatBot.append({"role":"system","content":GoogleSearch(prompt)})
+def RealtimeSearchEngine(prompt, cancel=None, session=None):
+    session = session or sessions.default
+    started_at = time.perf_counter()
+    search_results = GoogleSearch(prompt)
+    if cancel is not None and cancel.is_set():
+        # Cancelled while searching: do not start the LLM at all
+        return ""
+    # Search results only belong to this request, so they go after the history with the time,
+    # keeping the static prompt and history a stable cacheable prefix
+    messages = session.context_window.build(
+        SystemChatBot,
+        prompt,
+        extra_system=[{"role":"system","content":search_results},
+                      {"role":"system","content": Information()}]
+    )
 
+    requested_at = time.perf_counter()
     completion = llm_client.create_completion(
         model="llama-3.3-70b-versatile",
-        messages=SystemChatBot + [{"role":"system","content": Information()}] + messages,
+        messages=messages,
         temperature = 0.7,
         max_tokens=2048,
         top_p=1,
@@ -85,20 +88,18 @@ def RealtimeSearchEngine(prompt):
         stop=None
     )
 
-    Answer = ""
-
-    for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content
+    # Sentences are spoken while the rest of the answer is still streaming in
+    Answer = speech_pipeline.speak_stream(CompletionText(completion, started_at=requested_at), started_at=started_at,
+                                          cancel=cancel)
 
     Answer = Answer.strip().replace("</s>","")
-    messages.append({"role":"assistant","content":Answer})
-
-    chatlog_path = DATA_DIR / "Chatlog.json"
-    with open(chatlog_path, "w") as f:
-        dump(messages, f , indent=4)
+    if cancel is not None and cancel.is_set():
+        # Keep what was said before the user cut in
+        if Answer:
+            session.conversation.append_turn(prompt, Answer + " [interrupted]")
+        return AnswerModifier(Answer=Answer)
+    session.conversation.append_turn(prompt, Answer)
 
-    SystemChatBot.pop()
     return AnswerModifier(Answer=Answer)
 
 if __name__ == "__main__":
@@ -0,0 +1,614 @@
+"""
+Replay Load Test
+Replays a corpus of transcripts (a text file, a JSON list or a recorded chat
+log) through the real JarvisBrain routing: fast path, intent classifier,
+decision stream, task scheduler, ChatBot, RealtimeSearchEngine, Automation
+and SpeechStream. Every outside service is a local fake with a seeded
+latency distribution: speech recognition, Cohere, the LLM providers,
+googlesearch, edge-tts/pygame and AppOpener/pywhatkit/keyboard, so nothing
+opens a browser, an app or a network connection. Session chat logs, model
+health, traces and written content go to a temporary directory.
+
+Prints p50/p95/p99 per stage and utterances/sec as JSON and exits with
+status 1 when an utterance or one of its sub-tasks failed, or when a run
+is slower than a saved baseline:
+
+    python -m Backend.ReplayLoadTest --corpus Data/Chatlog --concurrency 8 --out replay.json
+    python -m Backend.ReplayLoadTest --corpus Data/Chatlog --concurrency 8 --baseline replay.json
+"""
+from pathlib import Path
+from types import SimpleNamespace
+from .LLMProvider import StreamChunk
+from .MockLLMServer import FakeLLMClient
+import concurrent.futures
+import contextvars
+import threading
+import tempfile
+import argparse
+import asyncio
+import random
+import types
+import json
+import math
+import time
+import sys
+import os
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Seconds; "fixed:<s>", "uniform:<low>,<high>", "normal:<mean>,<sd>" or "lognormal:<median>,<sigma>"
+LATENCIES = {
+    "stt": "lognormal:1.2,0.3",              # speech recognition, after the user stops talking
+    "dmm_first_token": "lognormal:0.35,0.3",  # Cohere decision stream
+    "dmm_token": "fixed:0.004",
+    "llm_first_token": "lognormal:0.45,0.4",  # LLM providers (answers, summaries, content writer)
+    "llm_token": "fixed:0.012",
+    "search": "lognormal:0.8,0.5",            # googlesearch
+    "tts": "lognormal:0.2,0.25",              # edge-tts, per sentence
+    "playback": "lognormal:1.8,0.3",          # pygame, per sentence
+    "automation": "lognormal:0.4,0.5",        # AppOpener, pywhatkit and keyboard calls
+}
+
+# Built-in corpus: (transcript, Cohere decision); None means the local fast path or classifier decides
+CORPUS = [
+    ("open chrome", None),
+    ("open chrome and tell me a joke", "open chrome, general tell me a joke"),
+    ("how can i study more effectively", "general how can i study more effectively"),
+    ("what is the weather in delhi today", "realtime weather in delhi today"),
+    ("volume up", None),
+    ("tell me about mahatma gandhi", "general tell me about mahatma gandhi"),
+    ("who won the cricket match yesterday", "realtime who won the cricket match yesterday"),
+    ("play let her go", "play let her go"),
+    ("write an application for sick leave", "content application for sick leave"),
+    ("what's the latest news about spacex and open youtube", "realtime latest news about spacex, open youtube"),
+    ("close notepad and mute", "close notepad, system mute"),
+    ("thanks, i really liked it", "general thanks, i really liked it"),
+    ("open firefox and telegram", None),
+    ("what is python programming language", "general what is python programming language"),
+    ("who is the indian prime minister", "realtime who is indian prime minister"),
+    ("search for cheap flights on google and tell me a fun fact",
+     "google search cheap flights, general tell me a fun fact"),
+]
+
+# Words that make the fake decision model pick "realtime" for transcripts without a recorded decision
+REALTIME_WORDS = ("news", "weather", "today", "latest", "price", "score", "who is", "who won", "current")
+
+# The utterance being replayed; the fakes read its decision and recorded answer through it
+current = contextvars.ContextVar("replay_utterance", default=None)
+
+
+class Latency:
+    """One latency distribution, sampled from a caller-supplied random.Random"""
+
+    PARAMETERS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+
+    def __init__(self, spec: str):
+        kind, _, arguments = str(spec).partition(":")
+        if not arguments:
+            kind, arguments = "fixed", kind
+        try:
+            params = [float(value) for value in arguments.split(",")]
+        except ValueError:
+            raise ValueError(f"invalid latency {spec!r}") from None
+        if self.PARAMETERS.get(kind) != len(params):
+            raise ValueError(f"invalid latency {spec!r} (use fixed:s, uniform:low,high, normal:mean,sd "
+                             f"or lognormal:median,sigma)")
+        self.spec = str(spec)
+        self.kind = kind
+        self.params = params
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        a, b = self.params
+        if self.kind == "uniform":
+            value = rng.uniform(a, b)
+        elif self.kind == "normal":
+            value = rng.gauss(a, b)
+        else:
+            value = a * math.exp(rng.gauss(0.0, b))
+        return max(0.0, value)
+
+
+class Utterance:
+    """One replayed transcript and what happened to it"""
+    __slots__ = ("index", "text", "decision", "answer", "calls", "first_output", "characters")
+
+    def __init__(self, index: int, text: str, decision: str = None, answer: str = None):
+        self.index = index
+        self.text = text
+        self.decision = decision
+        self.answer = answer
+        self.calls = {}
+        self.first_output = None
+        self.characters = 0
+
+    def write(self, text: str, answer: int = 0):
+        """speech_output sink: answers go here instead of the speakers, like the headless server"""
+        if self.first_output is None:
+            self.first_output = time.perf_counter()
+        self.characters += len(text)
+
+
+def LoadCorpus(paths) -> list:
+    """
+    (text, decision, answer) tuples from text files (one transcript per line, optionally
+    "transcript<TAB>decision"), JSON/JSONL lists of strings, {"text", "decision", "answer"}
+    objects or chat messages, and Data/Chatlog directories. The assistant turn recorded after
+    a user message becomes the fake LLM's answer to it.
+    """
+    from .ChatLogStore import ChatLogStore
+
+    transcripts = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            store = ChatLogStore(path)
+            items = store.read()
+            store.close()
+        elif path.suffix in (".json", ".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                if path.suffix == ".json":
+                    items = json.load(f)
+                else:
+                    items = [json.loads(line) for line in f if line.strip()]
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                items = []
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        text, _, decision = line.partition("\t")
+                        items.append({"text": text.strip(), "decision": decision.strip() or None})
+
+        for i, item in enumerate(items):
+            if isinstance(item, str):
+                transcripts.append((item, None, None))
+            elif "role" in item:
+                if item["role"] != "user":
+                    continue
+                following = items[i + 1] if i + 1 < len(items) else None
+                answer = following["content"] if following and following.get("role") == "assistant" else None
+                if answer is not None:
+                    answer = answer.replace(" [interrupted]", "")
+                transcripts.append((item["content"], None, answer))
+            else:
+                transcripts.append((item["text"], item.get("decision"), item.get("answer")))
+    return [t for t in transcripts if t[0] and t[0].strip()]
+
+
+def _percentile(values: list, q: float) -> float:
+    """Linear interpolation between the closest ranks of sorted values"""
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class _Inert:
+    """Accepts any call or attribute (selenium option builders and the like)"""
+
+    def __call__(self, *args, **kwargs):
+        return _Inert()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Inert()
+
+
+class _FakeModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Inert()
+
+
+class ReplayLLMClient(FakeLLMClient):
+    """llm_client stand-in: answers with the recorded answer, or a made-up one, at sampled latencies"""
+
+    def __init__(self, harness):
+        super().__init__(provider="replay")
+        self.harness = harness
+
+    def _answer(self, messages: list, rng: random.Random) -> str:
+        utterance = current.get()
+        if utterance is not None and utterance.answer:
+            return utterance.answer
+        query = next((m["content"] for m in reversed(messages or []) if m.get("role") == "user"), "that")
+        topic = str(query).strip(" ?.!").lower()[:80]
+        sentences = [f"Here is what I know about {topic}."]
+        sentences += [f"This is sentence {i + 2} of a replayed answer with a dozen words or so."
+                      for i in range(rng.randint(1, 5))]
+        return " ".join(sentences)
+
+    def _stream(self, messages: list):
+        rng = self.harness.rng("llm")
+        tokens = [word + " " for word in self._answer(messages, rng).split(" ")]
+        delays = [self.harness.draw("llm_first_token", rng)]
+        delays += [self.harness.draw("llm_token", rng) for _ in tokens[1:]]
+        return tokens, delays
+
+    def create_completion(self, model: str = None, messages: list = None, **kwargs):
+        self.calls += 1
+        tokens, delays = self._stream(messages)
+
+        def stream():
+            started = time.perf_counter()
+            for index, (token, delay) in enumerate(zip(tokens, delays)):
+                time.sleep(delay)
+                if index == 0:
+                    self.harness.record("llm_first_token", time.perf_counter() - started)
+                yield StreamChunk(token)
+            self.harness.record("llm_total", time.perf_counter() - started)
+        return stream()
+
+    async def acreate_completion(self, model: str = None, messages: list = None, **kwargs):
+        self.calls += 1
+        tokens, delays = self._stream(messages)
+        started = time.perf_counter()
+        for index, (token, delay) in enumerate(zip(tokens, delays)):
+            await asyncio.sleep(delay)
+            if index == 0:
+                self.harness.record("llm_first_token", time.perf_counter() - started)
+            yield StreamChunk(token)
+        self.harness.record("llm_total", time.perf_counter() - started)
+
+
+class ReplayHarness:
+    """Installs the fakes, imports the real brain and replays transcripts through it"""
+
+    # Outside services replaced in sys.modules before the backend is imported
+    FAKE_MODULES = ("cohere", "googlesearch", "AppOpener", "pywhatkit", "keyboard", "edge_tts", "pygame",
+                    "mtranslate", "selenium", "selenium.webdriver", "selenium.webdriver.common",
+                    "selenium.webdriver.common.by", "selenium.webdriver.chrome",
+                    "selenium.webdriver.chrome.service", "selenium.webdriver.chrome.options",
+                    "selenium.webdriver.support", "selenium.webdriver.support.ui",
+                    "selenium.webdriver.support.expected_conditions", "webdriver_manager",
+                    "webdriver_manager.chrome")
+    # Keys the backend reads with os.environ[...] when it is imported, for a checkout without a .env
+    ENVIRONMENT = {"Username": "Replay"}
+
+    def __init__(self, latencies: dict = None, seed: int = 1, time_scale: float = 1.0, speech: bool = False):
+        self.latencies = {name: Latency(spec) for name, spec in dict(LATENCIES, **(latencies or {})).items()}
+        self.seed = seed
+        self.time_scale = time_scale
+        self.speech = speech
+        self.stages = {}
+        self.subtasks = {}
+        self._lock = threading.Lock()
+        self._unowned = 0
+        self._tmp = None
+        self.brain = None
+        self.store = None
+
+    # ----------------------------------------------------------------- latencies
+
+    def rng(self, name: str, key: str = None) -> random.Random:
+        """
+        Random source for one fake call. Calls made for an utterance are numbered per utterance,
+        so every run samples the same latencies whatever order the threads run in
+        """
+        utterance = current.get()
+        if utterance is not None:
+            count = utterance.calls[name] = utterance.calls.get(name, 0) + 1
+            key = f"{utterance.index}/{count}"
+        elif key is None:
+            with self._lock:
+                self._unowned += 1
+                key = f"-/{self._unowned}"
+        return random.Random(f"{self.seed}/{name}/{key}")
+
+    def draw(self, name: str, rng: random.Random) -> float:
+        return self.latencies[name].sample(rng) * self.time_scale
+
+    def wait(self, name: str, key: str = None):
+        """Sleep for one sampled latency and record it as that stage"""
+        started = time.perf_counter()
+        time.sleep(self.draw(name, self.rng(name, key)))
+        self.record(name, time.perf_counter() - started)
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages.setdefault(stage, []).append(seconds)
+
+    # --------------------------------------------------------------------- fakes
+
+    def _decision(self, query: str) -> str:
+        utterance = current.get()
+        if utterance is not None and utterance.decision:
+            return utterance.decision
+        query = query.lower().strip(" .?!")
+        kind = "realtime" if any(word in query for word in REALTIME_WORDS) else "general"
+        return f"{kind} {query}"
+
+    def _chat_stream(self, model=None, message: str = "", **kwargs):
+        rng = self.rng("dmm")
+        decision = self._decision(message)
+        delays = [self.draw("dmm_first_token", rng)]
+        pieces = [decision[i:i + 4] for i in range(0, len(decision), 4)]
+        delays += [self.draw("dmm_token", rng) for _ in pieces[1:]]
+        for piece, delay in zip(pieces, delays):
+            time.sleep(delay)
+            yield SimpleNamespace(event_type="text-generation", text=piece)
+        yield SimpleNamespace(event_type="stream-end", text="")
+
+    def _chat(self, model=None, message: str = "", **kwargs):
+        time.sleep(self.draw("dmm_first_token", self.rng("dmm")))
+        return SimpleNamespace(text=self._decision(message))
+
+    def _search(self, query, num_results: int = 10, advanced: bool = False, **kwargs):
+        self.wait("search")
+        results = [SimpleNamespace(url=f"https://example.com/{i}", title=f"Result {i + 1} for {query}",
+                                   description=f"Replayed search result {i + 1} about {query}.")
+                   for i in range(num_results)]
+        return iter(results if advanced else [result.url for result in results])
+
+    def _automation(self, *args, **kwargs):
+        self.wait("automation")
+        return True
+
+    def _recognize(self, max_wait_time: int = 30) -> str:
+        from .SpeechToText import QueryModifier
+        self.wait("stt")
+        # The browser returns raw text; SpeechRecognition normalizes it the same way
+        return QueryModifier(current.get().text)
+
+    def _synthesize(self, text: str):
+        self.wait("tts", text)
+        return text
+
+    def _play(self, audio):
+        self.wait("playback", audio)
+
+    def install(self):
+        """Replace every outside service, then import the real brain with the fakes in place"""
+        if "Backend.Chatbot" in sys.modules or "main" in sys.modules:
+            raise RuntimeError("the replay fakes must be installed before the backend is imported")
+        self._tmp = tempfile.TemporaryDirectory(prefix="replay-")
+        directory = Path(self._tmp.name)
+
+        for name in self.FAKE_MODULES:
+            sys.modules[name] = _FakeModule(name)
+        sys.modules["cohere"].Client = lambda *args, **kwargs: SimpleNamespace(chat_stream=self._chat_stream,
+                                                                               chat=self._chat)
+        sys.modules["googlesearch"].search = self._search
+        sys.modules["AppOpener"].open = sys.modules["AppOpener"].close = self._automation
+        sys.modules["pywhatkit"].search = sys.modules["pywhatkit"].playonyt = self._automation
+        sys.modules["keyboard"].press_and_release = self._automation
+        for key, value in self.ENVIRONMENT.items():
+            os.environ.setdefault(key, value)
+
+        # Modules bind llm_client when they are imported, so it is swapped before any of them is
+        from . import LLMProvider
+        LLMProvider.llm_client = ReplayLLMClient(self)
+        from .ModelHealth import model_health
+        from .Tracing import tracer
+        model_health.path = directory / "ModelHealth.json"
+        tracer.path = directory / "Traces" / "trace.jsonl"
+
+        if str(BASE_DIR) not in sys.path:
+            sys.path.insert(0, str(BASE_DIR))
+        import main
+        from .SpeechStream import speech_pipeline
+        from .SessionStore import SessionStore
+
+        main.SpeechRecognition = self._recognize
+        # Replayed decisions are not training data for the intent classifier
+        main.LogDecision = lambda *args, **kwargs: None
+        speech_pipeline.synthesize = self._synthesize
+        speech_pipeline.play = self._play
+        speech_pipeline.stop = speech_pipeline.discard = lambda *args: None
+        if main.Automation is None:
+            # Every automation command would fail fast and the run would measure nothing real
+            raise RuntimeError("Backend.Automation did not import with the fakes installed")
+        import Backend.Automation as automation
+        automation.DATA_DIR = directory / "Content"
+        automation.OpenNotepad = lambda file: None
+        automation.webopen = self._automation
+        automation.webbrowser = SimpleNamespace(open=self._automation)
+
+        self.store = SessionStore(directory / "Sessions")
+        self.brain = main.JarvisBrain()
+        decide_stream = self.brain.decide_stream
+        self.brain.decide_stream = lambda user_input, session=None: self._timed_decisions(
+            decide_stream(user_input, session), current.get())
+        return self
+
+    def _timed_decisions(self, commands, utterance):
+        """Time to the first command and to the whole decision; runs on the brain's producer thread"""
+        previous = current.get()
+        current.set(utterance)
+        started = time.perf_counter()
+        first = True
+        try:
+            for command in commands:
+                if first:
+                    self.record("decision_first_command", time.perf_counter() - started)
+                    first = False
+                yield command
+            self.record("decision", time.perf_counter() - started)
+        finally:
+            current.set(previous)
+
+    # -------------------------------------------------------------------- replay
+
+    async def _utterance(self, utterance: Utterance, session):
+        from .SpeechStream import speech_output
+        from .Tracing import tracer
+
+        current.set(utterance)
+        # Like the voice loop: the utterance starts before speech recognition
+        tracer.begin()
+        if not self.speech:
+            speech_output.set(utterance.write)
+        started = time.perf_counter()
+        text = await asyncio.to_thread(self.brain.listen_with_retries, attempts=0)
+        answering = time.perf_counter()
+        try:
+            results = await self.brain.handle_command(text, session=session)
+        except Exception as e:
+            print(f"[ERROR] Replay of {utterance.text!r} failed: {e}")
+            results = None
+        finished = time.perf_counter()
+        self.record("command", finished - answering)
+        self.record("utterance", finished - started)
+        if utterance.first_output is not None:
+            self.record("first_output", utterance.first_output - answering)
+        for sub in results or []:
+            self.record(f"task.{sub.kind}", sub.seconds)
+            statuses = self.subtasks.setdefault(sub.kind, {})
+            statuses[sub.status] = statuses.get(sub.status, 0) + 1
+        # An utterance whose sub-task errored or timed out failed, even though the brain answered
+        return results is not None and all(sub.status == "ok" for sub in results)
+
+    async def _replay(self, transcripts: list, concurrency: int) -> int:
+        # Every utterance blocks pooled threads (STT, the decision stream, each answer)
+        asyncio.get_running_loop().set_default_executor(concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency * 4 + 4, thread_name_prefix="Replay"))
+        pending = iter(enumerate(transcripts))
+        failed = 0
+
+        async def user(number: int):
+            # Each concurrent user is one session, so its history grows like a real conversation
+            nonlocal failed
+            session = await asyncio.to_thread(self.store.acquire, f"replay-{number}")
+            try:
+                for index, (text, decision, answer) in pending:
+                    if not await self._utterance(Utterance(index, text, decision, answer), session):
+                        failed += 1
+            finally:
+                self.store.release(session)
+
+        await asyncio.gather(*(user(number) for number in range(concurrency)))
+        return failed
+
+    def run(self, transcripts: list, concurrency: int = 4) -> dict:
+        from .AsyncRuntime import runtime
+        from .SpeechStream import speech_pipeline
+
+        first_audio = len(speech_pipeline.history)
+        started = time.perf_counter()
+        failed = runtime.run(self._replay(transcripts, concurrency))
+        seconds = time.perf_counter() - started
+        for latency in speech_pipeline.history[first_audio:]:
+            self.record("first_audio", latency)
+        return self.report(len(transcripts), failed, concurrency, seconds)
+
+    def report(self, utterances: int, failed: int, concurrency: int, seconds: float) -> dict:
+        stages = {}
+        for stage, values in sorted(self.stages.items()):
+            values = sorted(values)
+            stages[stage] = {"count": len(values), "mean_ms": round(sum(values) / len(values) * 1000, 1)}
+            for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+                stages[stage][name] = round(_percentile(values, q) * 1000, 1)
+            stages[stage]["max_ms"] = round(values[-1] * 1000, 1)
+        return {
+            "utterances": utterances, "failed": failed, "concurrency": concurrency,
+            "speech": "local" if self.speech else "text", "seed": self.seed, "time_scale": self.time_scale,
+            "seconds": round(seconds, 3), "utterances_per_second": round(utterances / seconds, 3),
+            "stages": stages, "subtasks": self.subtasks,
+            "latencies": {name: latency.spec for name, latency in self.latencies.items()},
+        }
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+
+def CompareReports(report: dict, baseline: dict, tolerance: float = 0.2, slack_ms: float = 5.0) -> list:
+    """
+    Regressions against a baseline report: p50/p95/p99 of a stage more than tolerance (plus
+    slack_ms, so millisecond stages do not flap) above it, lower throughput or more failures
+    """
+    regressions = []
+    for stage, before in baseline.get("stages", {}).items():
+        after = report["stages"].get(stage)
+        if after is None:
+            continue
+        for name in ("p50_ms", "p95_ms", "p99_ms"):
+            limit = before[name] * (1 + tolerance) + slack_ms
+            if after[name] > limit:
+                regressions.append(f"{stage} {name}: {after[name]} > {limit:.1f} (baseline {before[name]})")
+    limit = baseline["utterances_per_second"] * (1 - tolerance)
+    if report["utterances_per_second"] < limit:
+        regressions.append(f"utterances_per_second: {report['utterances_per_second']} < {limit:.3f} "
+                           f"(baseline {baseline['utterances_per_second']})")
+    if report["failed"] > baseline.get("failed", 0):
+        regressions.append(f"failed: {report['failed']} > {baseline.get('failed', 0)}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Backend.ReplayLoadTest",
+                                     description="Replay transcripts through JarvisBrain with fake services")
+    parser.add_argument("--corpus", action="append", default=[],
+                        help="transcript file (.txt, .json, .jsonl) or chat log directory; repeatable "
+                             "(default: the built-in corpus)")
+    parser.add_argument("--concurrency", type=int, default=4, help="users replaying at the same time")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the corpus this many times")
+    parser.add_argument("--speech", action="store_true",
+                        help="speak through the local speech pipeline (fake TTS and playback) instead of "
+                             "streaming text like the headless server")
+    parser.add_argument("--seed", type=int, default=1, help="seed for every sampled latency")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply every latency (0.1 for quick runs)")
+    parser.add_argument("--latency", action="append", default=[], metavar="STAGE=SPEC",
+                        help=f"override a latency, e.g. search=lognormal:1.5,0.6 (stages: {', '.join(LATENCIES)})")
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report; exit 1 if this run regressed against it")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--verbose", action="store_true", help="keep the brain's console output")
+    args = parser.parse_args(argv)
+
+    latencies = {}
+    for item in args.latency:
+        stage, _, spec = item.partition("=")
+        if stage not in LATENCIES:
+            parser.error(f"unknown latency stage {stage!r}")
+        latencies[stage] = spec
+    try:
+        harness = ReplayHarness(latencies, seed=args.seed, time_scale=args.time_scale, speech=args.speech)
+    except ValueError as e:
+        parser.error(str(e))
+    transcripts = LoadCorpus(args.corpus) if args.corpus else [(text, decision, None) for text, decision in CORPUS]
+    transcripts *= args.repeat
+    if not transcripts:
+        parser.error("the corpus has no transcripts")
+
+    print(f"[INFO] Replaying {len(transcripts)} utterances with {args.concurrency} concurrent users...",
+          file=sys.stderr)
+    stdout = sys.stdout
+    try:
+        with open(os.devnull, "w") as devnull:
+            if not args.verbose:
+                sys.stdout = devnull
+            harness.install()
+            report = harness.run(transcripts, args.concurrency)
+    finally:
+        sys.stdout = stdout
+        harness.close()
+
+    text = json.dumps(report, indent=4)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = CompareReports(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"[OK] No regression against {args.baseline}", file=sys.stderr)
+    if report["failed"]:
+        print(f"[ERROR] {report['failed']} of {report['utterances']} utterances failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
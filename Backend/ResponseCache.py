@@ -0,0 +1,297 @@
+"""
+Semantic Response Cache
+Answers repeated general questions locally. Queries are matched by their
+normalized text or by cosine similarity of hashed TF-IDF vectors, so no
+network call is needed for the lookup. Only questions of the same kind
+match: "who is java" never gets the answer cached for "what is java", and
+words two questions share must come in the same order ("is java faster
+than python" never gets the answer for "is python faster than java").
+Creative requests are never cached: a joke should not be the same joke.
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+import numpy as np
+import threading
+import hashlib
+import json
+import time
+import os
+import re
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+ENABLED = env_vars.get("RESPONSE_CACHE", "on").lower() not in ("off", "false", "0")
+THRESHOLD = float(env_vars.get("RESPONSE_CACHE_THRESHOLD", 0.82))
+TTL_HOURS = float(env_vars.get("RESPONSE_CACHE_TTL_HOURS", 168))
+MAX_ENTRIES = int(env_vars.get("RESPONSE_CACHE_SIZE", 500))
+DIMENSIONS = 2048
+
+# Answers to these depend on the clock, the news or the previous turn, so they are never cached
+TIME_SENSITIVE = re.compile(
+    r"\b(time|date|day|today|tonight|tomorrow|yesterday|now|current|currently|latest|recent|recently|"
+    r"news|headlines?|weather|temperature|forecast|score|price|stock|this (week|month|year)|"
+    r"he|she|him|her|his|hers|they|them|their|it|that|this|those|these|more|again)\b"
+)
+
+# Requests whose answer should differ every time ("tell me a joke", "write a poem", "give me an idea")
+CREATIVE = re.compile(
+    r"\b(jokes?|funny|puns?|riddles?|poems?|poetry|haikus?|limericks?|rap|songs?|lyrics|story|stories|"
+    r"write|compose|create|generate|invent|imagine|make up|pretend|roleplay|random|surprise|ideas?|"
+    r"suggest|suggestions?|recommend|another|different|something|interesting|fun fact|quote)\b"
+)
+
+_CONTRACTIONS = {
+    "what's": "what is", "who's": "who is", "where's": "where is", "how's": "how is",
+    "it's": "it is", "that's": "that is", "i'm": "i am", "you're": "you are",
+    "can't": "cannot", "don't": "do not", "doesn't": "does not", "isn't": "is not"
+}
+# Words that carry no meaning for matching ("what is python" == "tell me about python" == "python")
+_FILLER = {"a", "an", "the", "please", "tell", "me", "about", "can", "you", "could", "would",
+           "explain", "describe", "define", "meaning", "jarvis", "hey", "hi", "okay", "ok", "so",
+           "just", "do", "does", "know", "what", "is", "are", "was", "were", "of"}
+# Question words that change what is asked; they stay in the key and only match the same word.
+# "what" is the default kind, like a bare topic or "tell me about ..."
+_QUESTION_WORDS = ("who", "whom", "whose", "where", "when", "why", "how", "which")
+# "X programming language" names X itself ("what's python programming language" == "what is python")
+_DESCRIPTORS = (("programming", "languages"), ("programming", "language"), ("coding", "language"))
+_ARTICLES = {"a", "an", "the"}
+_QUALIFIERS = {"best", "top", "most", "good", "popular", "first", "new", "which", "favorite", "favourite"}
+
+
+def NormalizeQuery(query: str) -> str:
+    text = query.lower().strip()
+    for short, full in _CONTRACTIONS.items():
+        text = text.replace(short, full)
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    raw = text.split()
+    words = [w for w in raw if w not in _FILLER]
+    for descriptor in _DESCRIPTORS:
+        size = len(descriptor)
+        if len(words) > size and tuple(words[-size:]) == descriptor:
+            # "(the) best programming language" is not about "best"
+            topic = words[-size - 1]
+            position = len(raw) - 1 - raw[::-1].index(topic)
+            qualified = topic in _QUALIFIERS or topic.endswith("est")
+            if not qualified and (position == 0 or raw[position - 1] not in _ARTICLES):
+                words = words[:-size]
+            break
+    return " ".join(words)
+
+
+def QuestionKind(normalized: str) -> str:
+    """The question word a normalized query keeps ("" for what-questions and bare topics)"""
+    return next((word for word in normalized.split() if word in _QUESTION_WORDS), "")
+
+
+def SameOrder(a: str, b: str) -> bool:
+    """True when the words two normalized queries share appear in the same order in both"""
+    a, b = a.split(), b.split()
+    shared = set(a) & set(b)
+    return [w for w in a if w in shared] == [w for w in b if w in shared]
+
+
+def _bucket(feature: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=4).digest(), "little") % DIMENSIONS
+
+
+def TermVector(normalized: str) -> np.ndarray:
+    """Hashed term frequencies of words, word bigrams and character trigrams"""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    words = normalized.split()
+    features = words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    for feature in features:
+        vector[_bucket(feature)] += 1.0
+    return vector
+
+
+class ResponseCache:
+    """Similarity-matched answer cache with TTL, LRU eviction and JSON persistence"""
+
+    def __init__(self, path=DATA_DIR / "ResponseCache.json", threshold: float = THRESHOLD,
+                 ttl_hours: float = TTL_HOURS, max_entries: int = MAX_ENTRIES, clock=time.time):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = []
+        self._vectors = np.zeros((0, DIMENSIONS), dtype=np.float32)
+        self._exact = {}
+        self._kinds = np.zeros(0, dtype=object)
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "lookups": 0, "lookup_seconds": 0.0}
+        self._load()
+
+    # ----------------------------------------------------------- persistence
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = self.clock()
+        self._entries = []
+        seen = set()
+        for entry in sorted(entries, key=lambda e: e.get("last_used", 0), reverse=True):
+            # Keys are rebuilt so entries saved with older normalization rules follow the current ones
+            entry["normalized"] = NormalizeQuery(entry.get("query", ""))
+            if entry["normalized"] and entry["normalized"] not in seen and now - entry.get("created", 0) < self.ttl:
+                seen.add(entry["normalized"])
+                self._entries.append(entry)
+        self._entries.reverse()
+        self._reindex()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def _reindex(self):
+        self._exact = {e["normalized"]: i for i, e in enumerate(self._entries)}
+        self._kinds = np.array([QuestionKind(e["normalized"]) for e in self._entries], dtype=object)
+        if self._entries:
+            self._vectors = np.stack([TermVector(e["normalized"]) for e in self._entries])
+        else:
+            self._vectors = np.zeros((0, DIMENSIONS), dtype=np.float32)
+
+    # ---------------------------------------------------------------- lookup
+
+    @staticmethod
+    def is_cacheable(query: str) -> bool:
+        query = query.lower()
+        return not TIME_SENSITIVE.search(query) and not CREATIVE.search(query)
+
+    def _similarities(self, vector: np.ndarray, kind: str = "") -> np.ndarray:
+        """Cosine similarity to every cached query; 0 for questions of another kind"""
+        # IDF over the cached queries so words shared by many questions weigh less than topics
+        document_frequency = (self._vectors > 0).sum(axis=0)
+        idf = np.log((1 + len(self._entries)) / (1 + document_frequency)) + 1.0
+        matrix = self._vectors * idf
+        query = vector * idf
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        similarities = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+        return np.where(self._kinds == kind, similarities, 0.0)
+
+    def get(self, query: str):
+        """Return a cached answer for a similar query, or None"""
+        start = time.perf_counter()
+        with self._lock:
+            self.stats["lookups"] += 1
+            try:
+                if not self.is_cacheable(query):
+                    self.stats["bypassed"] += 1
+                    return None
+                normalized = NormalizeQuery(query)
+                if not normalized or not self._entries:
+                    self.stats["misses"] += 1
+                    return None
+
+                index = self._exact.get(normalized)
+                if index is None:
+                    similarities = self._similarities(TermVector(normalized), QuestionKind(normalized))
+                    # Bag-of-words similarity ignores order; the best candidate must also keep it
+                    for candidate in np.argsort(-similarities):
+                        if similarities[candidate] < self.threshold:
+                            break
+                        if SameOrder(normalized, self._entries[candidate]["normalized"]):
+                            index = int(candidate)
+                            break
+
+                now = self.clock()
+                if index is None or now - self._entries[index]["created"] >= self.ttl:
+                    self.stats["misses"] += 1
+                    return None
+
+                entry = self._entries[index]
+                entry["last_used"] = now
+                entry["hits"] = entry.get("hits", 0) + 1
+                self.stats["hits"] += 1
+                return entry["answer"]
+            finally:
+                self.stats["lookup_seconds"] += time.perf_counter() - start
+
+    def put(self, query: str, answer: str):
+        if not answer or not self.is_cacheable(query):
+            return
+        normalized = NormalizeQuery(query)
+        if not normalized:
+            return
+        with self._lock:
+            now = self.clock()
+            if normalized in self._exact:
+                entry = self._entries[self._exact[normalized]]
+                entry.update({"answer": answer, "created": now, "last_used": now})
+            else:
+                self._entries.append({"query": query, "normalized": normalized, "answer": answer,
+                                      "created": now, "last_used": now, "hits": 0})
+                self._evict(now)
+                self._reindex()
+            self._save()
+
+    def _evict(self, now):
+        self._entries = [e for e in self._entries if now - e["created"] < self.ttl]
+        if len(self._entries) > self.max_entries:
+            self._entries.sort(key=lambda e: e["last_used"])
+            self._entries = self._entries[-self.max_entries:]
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._reindex()
+            self._save()
+
+    def report(self) -> dict:
+        lookups = self.stats["lookups"] or 1
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": self.stats["hits"] / lookups,
+            "avg_lookup_ms": self.stats["lookup_seconds"] / lookups * 1000
+        }
+
+
+# Shared cache used by ChatBot
+response_cache = ResponseCache()
+
+
+def _replay(chatlog=None, llm_seconds: float = 1.5):
+    """Replay the user questions of a recorded chat log through a fresh cache"""
+    import tempfile
+
+    if chatlog:
+        with open(chatlog, "r", encoding="utf-8") as f:
+            messages = json.load(f)
+    else:
+        from .ConversationState import conversation
+        messages = conversation.read()
+
+    turns = [(m["content"], messages[i + 1]["content"]) for i, m in enumerate(messages[:-1])
+             if m["role"] == "user" and messages[i + 1]["role"] == "assistant"]
+    if not turns:
+        print("No recorded turns to replay.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(Path(tmp) / "cache.json")
+        for question, answer in turns:
+            if cache.get(question) is None:
+                cache.put(question, answer)
+        report = cache.report()
+
+    report["turns"] = len(turns)
+    report["estimated_seconds_saved"] = report["hits"] * llm_seconds
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    import sys
+    _replay(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,308 @@
+"""
+Session Store
+Per-user conversation state so one process can serve many users: every
+session has its own chat log, context summary, decision-model history and
+content-writer history. Sessions live on disk in hash-sharded directories
+(Data/Sessions/<shard>/<session id>/) and only the most recently used ones
+are kept in memory; idle sessions are flushed and evicted (LRU).
+
+The "default" session is the single-user state the GUI has always used
+(Data/Chatlog/, Data/ChatSummary.json) and is never evicted. Network
+clients never get it: they name their own session, or get a throwaway one.
+"""
+from pathlib import Path
+from collections import OrderedDict, deque
+from dotenv import dotenv_values
+from .ChatLogStore import ChatLogStore
+from .ConversationState import ConversationState, conversation
+from .ContextWindow import ContextWindow, context_window
+import threading
+import tempfile
+import hashlib
+import shutil
+import atexit
+import json
+import time
+import os
+import re
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# Sessions kept in memory; the least recently used idle one is evicted beyond this
+MAX_ACTIVE = int(env_vars.get("SESSION_MAX_ACTIVE", 256))
+# Sessions unused for this many seconds are evicted even below SESSION_MAX_ACTIVE
+IDLE_SECONDS = float(env_vars.get("SESSION_IDLE_SECONDS", 1800))
+# Number of shard directories under Data/Sessions
+SHARDS = int(env_vars.get("SESSION_SHARDS", 256))
+# Recent chat messages each session keeps in memory (older ones are read from its log)
+TAIL_SIZE = int(env_vars.get("SESSION_TAIL_SIZE", 40))
+# Decision-model and content-writer messages remembered per session
+HISTORY_SIZE = int(env_vars.get("SESSION_HISTORY_SIZE", 20))
+
+DEFAULT = "default"
+# No leading dot, so "." and ".." can never name a directory outside the shard
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$")
+ANONYMOUS = "anonymous"
+
+
+def CheckSessionId(session_id: str) -> str:
+    """Return a session id a network client may use; raises ValueError for any other"""
+    if session_id == DEFAULT:
+        raise ValueError("the default session belongs to the local user")
+    if not isinstance(session_id, str) or not SESSION_ID.match(session_id):
+        raise ValueError("invalid session id (use 1-64 letters, digits, '.', '_' or '-', not starting with '.')")
+    return session_id
+
+
+class Session:
+    """Everything one user's requests read and write"""
+    __slots__ = ("id", "directory", "conversation", "context_window", "dmm_messages", "content_messages",
+                 "last_used", "users")
+
+    def __init__(self, session_id: str, directory, conversation, context_window, history: dict = None,
+                 history_size: int = HISTORY_SIZE):
+        self.id = session_id
+        self.directory = Path(directory) if directory is not None else None
+        self.conversation = conversation
+        self.context_window = context_window
+        history = history or {}
+        self.dmm_messages = deque(history.get("dmm", []), maxlen=history_size)
+        self.content_messages = deque(history.get("content", []), maxlen=history_size)
+        self.last_used = time.monotonic()
+        # Requests currently using the session; it is never evicted while this is non-zero
+        self.users = 0
+
+    def __repr__(self):
+        return f"Session({self.id!r}, {len(self.conversation)} messages)"
+
+    @classmethod
+    def open(cls, session_id: str, directory, tail_size: int = TAIL_SIZE, history_size: int = HISTORY_SIZE,
+             summarizer=None):
+        directory = Path(directory)
+        store = ChatLogStore(directory / "Chatlog", tail_size=tail_size)
+        state = ConversationState(store, tail_size=tail_size, background=False)
+        window = ContextWindow(state, summary_path=directory / "ChatSummary.json", summarizer=summarizer)
+        history = {}
+        try:
+            with open(directory / "History.json", "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return cls(session_id, directory, state, window, history, history_size)
+
+    def save(self):
+        """Write the decision-model and content-writer histories next to the chat log"""
+        if self.directory is None:
+            return
+        temp_path = self.directory / "History.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"dmm": list(self.dmm_messages), "content": list(self.content_messages)}, f)
+        os.replace(temp_path, self.directory / "History.json")
+
+    def close(self):
+        self.save()
+        if self.context_window is not None:
+            # A summary still being written belongs to this session's directory
+            self.context_window.wait()
+        self.conversation.close()
+
+
+class SessionStore:
+    """Hash-sharded session directories with an in-memory LRU of open sessions"""
+
+    def __init__(self, directory=DATA_DIR / "Sessions", max_active: int = MAX_ACTIVE,
+                 idle_seconds: float = IDLE_SECONDS, shards: int = SHARDS, tail_size: int = TAIL_SIZE,
+                 default: Session = None, summarizer=None):
+        self.directory = Path(directory)
+        self.max_active = max_active
+        self.idle_seconds = idle_seconds
+        self.shards = shards
+        self.tail_size = tail_size
+        self.summarizer = summarizer
+        self._lock = threading.Lock()
+        self._active = OrderedDict()
+        # Evicted sessions still being flushed; reopening one waits until its files are written
+        self._closing = {}
+        self._anonymous = set()
+        self.default = default or Session(DEFAULT, None, conversation, context_window)
+        self.stats = {"opened": 0, "hits": 0, "evicted": 0}
+        atexit.register(self.close)
+
+    def path(self, session_id: str) -> Path:
+        shard = int(hashlib.sha1(session_id.encode("utf-8")).hexdigest(), 16) % self.shards
+        return self.directory / f"{shard:03d}" / session_id
+
+    def acquire(self, session_id: str = None) -> Session:
+        """Open (or reuse) a session and pin it in memory until release(); no id is the local user"""
+        if not session_id or session_id == DEFAULT:
+            return self.default
+        CheckSessionId(session_id)
+        while True:
+            with self._lock:
+                closing = self._closing.get(session_id)
+                if closing is None:
+                    session = self._active.get(session_id)
+                    if session is not None:
+                        self._active.move_to_end(session_id)
+                        self.stats["hits"] += 1
+                    else:
+                        directory = self.path(session_id)
+                        directory.mkdir(parents=True, exist_ok=True)
+                        session = Session.open(session_id, directory, self.tail_size, summarizer=self.summarizer)
+                        self._active[session_id] = session
+                        self.stats["opened"] += 1
+                    session.users += 1
+                    session.last_used = time.monotonic()
+                    evicted = self._evict()
+                    break
+            # Its old copy is still being written
+            closing.wait()
+        self._close(evicted)
+        return session
+
+    def acquire_remote(self, session_id: str = None) -> Session:
+        """
+        acquire() for a network client: a named session of its own, never the local user's.
+        Without an id it gets a throwaway session (no history) that release() deletes
+        """
+        if session_id:
+            return self.acquire(CheckSessionId(session_id))
+        session = Session.open(ANONYMOUS, tempfile.mkdtemp(prefix="session-"), self.tail_size,
+                               summarizer=self.summarizer)
+        session.users = 1
+        with self._lock:
+            self._anonymous.add(session)
+        return session
+
+    def release(self, session: Session):
+        if session is self.default:
+            return
+        with self._lock:
+            if session in self._anonymous:
+                self._anonymous.discard(session)
+                evicted = None
+            else:
+                session.users -= 1
+                session.last_used = time.monotonic()
+                evicted = self._evict()
+        if evicted is None:
+            session.close()
+            shutil.rmtree(session.directory, ignore_errors=True)
+            return
+        self._close(evicted)
+
+    def _evict(self) -> list:
+        """
+        Drop unused sessions beyond the LRU limit or past the idle timeout (call with the lock held).
+        Returns them for _close(), which flushes them after the lock is released
+        """
+        now = time.monotonic()
+        evicted = []
+        for session_id, session in list(self._active.items()):
+            over = len(self._active) > self.max_active
+            if not over and now - session.last_used < self.idle_seconds:
+                # Oldest first: the rest are newer
+                break
+            if session.users == 0:
+                del self._active[session_id]
+                self._closing[session_id] = threading.Event()
+                evicted.append(session)
+                self.stats["evicted"] += 1
+        return evicted
+
+    def _close(self, evicted: list):
+        """Flush evicted sessions without holding the lock, then let waiting acquire() calls reopen them"""
+        for session in evicted:
+            try:
+                session.close()
+            finally:
+                with self._lock:
+                    closing = self._closing.pop(session.id)
+                closing.set()
+
+    def __len__(self):
+        return len(self._active)
+
+    def close(self):
+        with self._lock:
+            sessions, self._active = list(self._active.values()), OrderedDict()
+            anonymous, self._anonymous = list(self._anonymous), set()
+        for session in sessions:
+            session.close()
+        for session in anonymous:
+            session.close()
+            shutil.rmtree(session.directory, ignore_errors=True)
+
+
+# Shared store for the headless server; the GUI and voice loop use sessions.default
+sessions = SessionStore()
+
+
+def _benchmark(count: int = 1000, turns: int = 6, max_active: int = 100):
+    """Memory per resident session and the cost of LRU eviction with many simulated users"""
+    import contextlib
+    import tempfile
+    import tracemalloc
+    import gc
+
+    def summarize(previous, messages):
+        return (previous + " " + " ".join(str(m["content"])[:20] for m in messages))[-400:]
+
+    def simulate(store, session_id):
+        session = store.acquire(session_id)
+        try:
+            for turn in range(turns):
+                query = f"{session_id} question {turn} about something"
+                session.dmm_messages.append({"role": "user", "content": query})
+                session.context_window.build([{"role": "system", "content": "system prompt"}], query)
+                session.conversation.append_turn(query, f"answer {turn} for {session_id} " * 12)
+            session.content_messages.append({"role": "user", "content": f"write a note for {session_id}"})
+        finally:
+            store.release(session)
+
+    def run(directory, limit):
+        default = Session(DEFAULT, None, None, None)
+        store = SessionStore(directory, max_active=limit, idle_seconds=3600, default=default, summarizer=summarize)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for i in range(count):
+                session_id = f"user-{i:04d}"
+                simulate(store, session_id)
+        seconds = time.perf_counter() - start
+        # Memory the resident sessions own is what closing them gives back (interpreter-wide tables
+        # such as interned path strings grow with every id ever opened and are not per session)
+        gc.collect()
+        in_use = tracemalloc.get_traced_memory()[0] - base
+        report = (len(store), in_use, seconds, dict(store.stats))
+        store.close()
+        gc.collect()
+        report += (in_use - (tracemalloc.get_traced_memory()[0] - base),)
+        tracemalloc.stop()
+
+        # Isolation: a reopened session sees only its own turns
+        probe = store.acquire("user-0007")
+        own = all("user-0007" in m["content"] for m in probe.conversation.tail())
+        messages = len(probe.conversation)
+        store.release(probe)
+        store.close()
+        return report, own, messages
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{count} sessions x {turns} turns")
+        for label, limit in [("all resident", count), (f"LRU of {max_active}", max_active)]:
+            (resident, in_use, seconds, stats, owned), own, messages = run(Path(tmp) / label.replace(" ", "_"), limit)
+            print(f"{label:14}: {resident:5d} in memory, {owned / resident / 1024:5.1f} KiB per resident session "
+                  f"({in_use / 1024 / 1024:5.1f} MiB traced in total), "
+                  f"{seconds / count * 1000:5.2f} ms per session, {stats['evicted']} evicted")
+            print(f"{'':14}  reopened user-0007: {messages} messages, only its own: {own}")
+        shards = [p for p in (Path(tmp) / "all_resident").iterdir() if p.is_dir()]
+        print(f"on disk: {count} session directories across {len(shards)} shards "
+              f"(~{count / max(1, len(shards)):.1f} per shard directory)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,336 @@
+"""
+Sentence-streamed Speech
+Splits a streaming LLM answer into sentences and speaks each one as soon as
+it is complete, so the first sentence is audible while the rest is still
+being generated. Synthesis of the next sentence overlaps playback of the
+current one. Answers generated concurrently take turns: whichever has a
+sentence ready first is spoken first, the others are buffered until it is done.
+interrupt() stops the current sentence and skips everything queued (barge-in).
+"""
+from .EventBus import event_bus, TokenEvent
+from .Tracing import tracer
+import contextvars
+import itertools
+import threading
+import queue
+import time
+import re
+
+# Sentence end: . ! ? (optionally followed by quotes/brackets) then whitespace, or a line break
+_SENTENCE_END = re.compile(r'([.!?]+["\')\]]*)\s+|\n+')
+# Numbers the streamed answers so GUI previews can tell them apart
+_answer_ids = itertools.count(1)
+# Words that end with a dot without ending the sentence
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx"}
+# Abbreviations only when a number follows ("No. 5"); "The answer is no." ends a sentence
+_NUMBER_ABBREVIATIONS = {"no", "nos", "vol", "fig"}
+
+
+class SentenceSegmenter:
+    """Incrementally turns a stream of text pieces into complete sentences"""
+
+    def __init__(self, min_chars: int = 20):
+        # Very short fragments ("Sure.") are merged with the next sentence to avoid choppy audio
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> list:
+        self.buffer += text.replace("</s>", "")
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self.buffer):
+            end = match.end()
+            candidate = self.buffer[start:end].strip()
+            dot = match.group(1) and match.group(1).startswith(".")
+            if dot and self._is_abbreviation(candidate, self.buffer[end:end + 1]):
+                continue
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = end
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> list:
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+    @staticmethod
+    def _is_abbreviation(candidate: str, following: str = "") -> bool:
+        """following is the character after the dot and its whitespace ("" when not streamed in yet)"""
+        words = candidate.rstrip(".!?\"')]").split()
+        if not words:
+            return False
+        word = words[-1].lower()
+        if word in _NUMBER_ABBREVIATIONS:
+            # Undecided until the next word arrives; flush() still speaks it at the end of the answer
+            return not following or following.isdigit()
+        return word in _ABBREVIATIONS
+
+
+def _default_synthesize(text: str):
+    from .TextToSpeech import SynthesizeSpeech
+    from .AsyncRuntime import runtime
+    # edge-tts is async; every sentence shares the one runtime loop instead of a new loop each
+    return runtime.run(SynthesizeSpeech(text))
+
+
+def _default_play(audio):
+    from .TextToSpeech import PlaySpeech
+    PlaySpeech(audio)
+
+
+def _default_stop():
+    from .TextToSpeech import StopSpeech
+    StopSpeech()
+
+
+def _default_discard(audio):
+    from .TextToSpeech import DiscardSpeech
+    DiscardSpeech(audio)
+
+
+class SpeechPipeline:
+    """Two-stage sentence queue: one thread synthesizes, another plays"""
+
+    def __init__(self, synthesize=None, play=None, clock=time.perf_counter, prefetch: int = 2,
+                 stop=None, discard=None):
+        self.synthesize = synthesize or _default_synthesize
+        self.play = play or _default_play
+        # stop() ends the sentence being played; discard(audio) cleans up audio that will never play
+        self.stop = stop or _default_stop
+        self.discard = discard or _default_discard
+        self.clock = clock
+        # Bumped by interrupt(); queued sentences from an older generation are skipped
+        self._generation = 0
+        self._sentences = queue.Queue()
+        # Bounded so synthesis runs at most a couple of sentences ahead of playback
+        self._audio = queue.Queue(maxsize=prefetch)
+        self._pending = 0
+        self._idle = threading.Condition()
+        # Held by one answer while it queues its sentences, so concurrent answers never interleave
+        self._floor = threading.Lock()
+        # Timing of the answer last begun, for put() callers that do not carry their own
+        self._timing = None
+        # Most recent time-to-first-audio of any answer (per answer: history, in the order first heard)
+        self.last_time_to_first_audio = None
+        self.history = []
+        self._threads = [
+            threading.Thread(target=self._synthesis_worker, daemon=True),
+            threading.Thread(target=self._playback_worker, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # --------------------------------------------------------------- workers
+
+    def _synthesis_worker(self):
+        while True:
+            # Sentences carry the utterance they belong to; these threads serve every utterance
+            generation, sentence, utterance, timing = self._sentences.get()
+            audio = None
+            if generation == self._generation:
+                started = time.perf_counter()
+                try:
+                    audio = self.synthesize(sentence)
+                    tracer.record("tts", started, time.perf_counter() - started, utterance, characters=len(sentence))
+                except Exception as e:
+                    tracer.record("tts", started, time.perf_counter() - started, utterance, status="error",
+                                  error=repr(e)[:200])
+                    print(f"Error in TextToSpeech: {e}")
+            self._audio.put((generation, audio, utterance, timing))
+
+    def _playback_worker(self):
+        while True:
+            generation, audio, utterance, timing = self._audio.get()
+            if audio is not None and generation != self._generation:
+                try:
+                    self.discard(audio)
+                except Exception:
+                    pass
+            elif audio is not None:
+                if timing is not None and timing["first_audio_at"] is None:
+                    timing["first_audio_at"] = self.clock()
+                    self.last_time_to_first_audio = timing["first_audio_at"] - timing["started_at"]
+                    self.history.append(self.last_time_to_first_audio)
+                started = time.perf_counter()
+                try:
+                    self.play(audio)
+                    tracer.record("playback", started, time.perf_counter() - started, utterance,
+                                  status="ok" if generation == self._generation else "cancelled")
+                except Exception as e:
+                    tracer.record("playback", started, time.perf_counter() - started, utterance, status="error",
+                                  error=repr(e)[:200])
+                    print(f"Error in TextToSpeech: {e}")
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    # ------------------------------------------------------------------ API
+
+    def begin(self, started_at: float = None) -> dict:
+        """Start timing a new answer; its time-to-first-audio is measured from here"""
+        self._timing = {"started_at": self.clock() if started_at is None else started_at, "first_audio_at": None}
+        return self._timing
+
+    def put(self, sentence: str, timing: dict = None):
+        """Queue a sentence; timing (from begin()) travels with it so concurrent answers are timed apart"""
+        if not sentence.strip():
+            return
+        with self._idle:
+            self._pending += 1
+        self._sentences.put((self._generation, sentence, tracer.utterance(), timing or self._timing))
+
+    def interrupt(self):
+        """Stop the sentence being played and skip everything already queued"""
+        self._generation += 1
+        try:
+            self.stop()
+        except Exception as e:
+            print(f"Error in TextToSpeech: {e}")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until every queued sentence has been played"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def speak(self, text: str, wait: bool = True):
+        """Speak a complete text sentence by sentence"""
+        self.speak_stream([text], wait=wait)
+
+    def speak_stream(self, pieces, started_at: float = None, wait: bool = True, cancel: threading.Event = None) -> str:
+        """
+        Consume an iterable of text pieces, speaking sentences as they complete; returns the full text.
+        While another answer has the floor, sentences are buffered and the stream keeps being read.
+        Setting cancel stops reading and speaking; the text read so far is returned.
+        """
+        answer = next(_answer_ids)
+        output = speech_output.get()
+        if output is not None:
+            return self._write_stream(pieces, output, answer, cancel)
+        segmenter = SentenceSegmenter()
+        waiting = []
+        holding = False
+        timing = None
+        text = ""
+        try:
+            for piece in pieces:
+                if cancel is not None and cancel.is_set():
+                    break
+                if not piece:
+                    continue
+                text += piece
+                event_bus.publish(TokenEvent(piece, answer))
+                waiting += segmenter.feed(piece)
+                if waiting and not holding:
+                    holding = self._floor.acquire(blocking=False)
+                    if holding:
+                        timing = self.begin(started_at)
+                if holding:
+                    for sentence in waiting:
+                        self.put(sentence, timing)
+                    waiting = []
+            if cancel is not None and cancel.is_set():
+                return text
+            waiting += segmenter.flush()
+            if waiting and not holding:
+                self._floor.acquire()
+                holding = True
+                timing = self.begin(started_at)
+            for sentence in waiting:
+                if cancel is not None and cancel.is_set():
+                    return text
+                self.put(sentence, timing)
+        finally:
+            if holding:
+                self._floor.release()
+            if cancel is not None and cancel.is_set():
+                # Stop the LLM stream behind the pieces instead of letting it run to the end
+                close = getattr(pieces, "close", None)
+                if close is not None:
+                    close()
+        if wait:
+            self.wait()
+        return text
+
+    @staticmethod
+    def _write_stream(pieces, output, answer: int, cancel: threading.Event = None) -> str:
+        """Hand every piece to output(text, answer) instead of speaking it; returns the full text"""
+        text = ""
+        try:
+            for piece in pieces:
+                if cancel is not None and cancel.is_set():
+                    break
+                if piece:
+                    text += piece
+                    output(piece, answer)
+        finally:
+            if cancel is not None and cancel.is_set():
+                close = getattr(pieces, "close", None)
+                if close is not None:
+                    close()
+        return text
+
+
+def CompletionText(completion, echo: bool = False, started_at: float = None):
+    """
+    Yield the text pieces of a provider stream (chunk.choices[0].delta.content). The LLM's
+    time to first token and total time are traced from started_at (when the request was made)
+    """
+    started_at = time.perf_counter() if started_at is None else started_at
+    first = None
+    status = "ok"
+    try:
+        for chunk in completion:
+            content_piece = chunk.choices[0].delta.content
+            if content_piece:
+                if first is None:
+                    first = time.perf_counter()
+                    tracer.record("llm.first_token", started_at, first - started_at)
+                if echo:
+                    print(content_piece, end="", flush=True)
+                yield content_piece
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        tracer.record("llm", started_at, time.perf_counter() - started_at, status=status,
+                      first_token_ms=round((first - started_at) * 1000, 1) if first is not None else None)
+        # Closing this generator early closes the provider stream too
+        close = getattr(completion, "close", None)
+        if close is not None:
+            close()
+
+
+# Set by the headless server for the duration of one request: answers spoken under it are
+# written to output(text, answer) instead of the shared pipeline (asyncio tasks and to_thread inherit it)
+speech_output = contextvars.ContextVar("speech_output", default=None)
+
+# Shared pipeline so answers from every module are spoken in order
+speech_pipeline = SpeechPipeline()
+
+
+def _fake_stream(text, delay=0.05):
+    for word in text.split(" "):
+        time.sleep(delay)
+        yield word + " "
+
+
+def _demo():
+    """Time to first audio with a fake LLM stream and fake synthesis/playback"""
+    answer = ("Python is a high-level programming language. It was created by Guido van Rossum. "
+              "It is widely used for web development, data science and automation.")
+    pipeline = SpeechPipeline(synthesize=lambda s: (time.sleep(0.1), s)[1],
+                              play=lambda a: (print(f"[PLAY] {a}"), time.sleep(0.2)))
+    start = time.perf_counter()
+    pipeline.speak_stream(_fake_stream(answer))
+    total = time.perf_counter() - start
+    print(f"time to first audio: {pipeline.last_time_to_first_audio:.2f}s, total: {total:.2f}s")
+
+
+if __name__ == "__main__":
+    _demo()
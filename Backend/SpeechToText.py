@@ -13,6 +13,9 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from .EventBus import event_bus, StatusEvent
+from .Tracing import tracer
+
 # Base/project directories (adjusts to your project layout)
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "Data"
@@ -146,9 +149,7 @@ TempDirPath = BASE_DIR / "Frontend" / "Files"
 TempDirPath.mkdir(parents=True, exist_ok=True)
 
 def SetAssistantStatus(Status):
-    status_file = TempDirPath / "Status.data"
-    with open(status_file, "w", encoding='utf-8') as file:
-        file.write(Status)
+    event_bus.publish(StatusEvent(Status))
 
 def QueryModifier(Query: str) -> str:
     new_query = Query.lower().strip()
@@ -171,7 +172,8 @@ def QueryModifier(Query: str) -> str:
 
 def UniversalTranslator(Text: str) -> str:
     try:
-        english_translation = mt.translate(Text, "en", "auto")
+        with tracer.span("translation", language=InputLanguage):
+            english_translation = mt.translate(Text, "en", "auto")
         return english_translation.capitalize()
     except Exception as e:
         print("[WARN] Translation failed:", e)
@@ -0,0 +1,166 @@
+"""
+Task Scheduler
+Runs every sub-task of a multi-command utterance (automation, general and
+realtime answers) concurrently with a per-task timeout, so the user waits
+for the slowest part instead of the sum of all parts. Results come back in
+the order the user asked for them.
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+from .Tracing import tracer
+import threading
+import asyncio
+import time
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# Seconds each kind of sub-task may take before it is abandoned
+TIMEOUTS = {
+    "automation": float(env_vars.get("TASK_TIMEOUT_AUTOMATION", 30)),
+    "general": float(env_vars.get("TASK_TIMEOUT_GENERAL", 60)),
+    "realtime": float(env_vars.get("TASK_TIMEOUT_REALTIME", 90)),
+}
+
+
+class _HandlerTimeout(Exception):
+    """A TimeoutError raised by the handler itself (an HTTP client's, say), not by the scheduler"""
+
+
+async def _own_timeouts(run, cancel):
+    # Since Python 3.11 asyncio.TimeoutError is the builtin TimeoutError, so wait_for's
+    # timeout could not otherwise be told apart from one the handler raised
+    try:
+        return await run(cancel)
+    except asyncio.TimeoutError as e:
+        raise _HandlerTimeout() from e
+
+
+class SubTask:
+    """One command of the utterance and what became of it"""
+    __slots__ = ("index", "kind", "command", "status", "result", "error", "seconds", "cancel", "task")
+
+    def __init__(self, index: int, kind: str, command: str):
+        self.index = index
+        self.kind = kind
+        self.command = command
+        self.status = "running"  # running, ok, error, timeout, cancelled
+        self.result = None
+        self.error = None
+        self.seconds = None
+        # Set on timeout; blocking handlers stop reading and speaking when they see it
+        self.cancel = threading.Event()
+        self.task = None
+
+    def __repr__(self):
+        return f"SubTask({self.index}, {self.command!r}, {self.status})"
+
+
+class TaskScheduler:
+    """Starts sub-tasks as soon as they are submitted and collects them in submission order"""
+
+    def __init__(self, timeouts: dict = None):
+        self.timeouts = dict(TIMEOUTS, **(timeouts or {}))
+        self.tasks = []
+        self.started_at = time.perf_counter()
+
+    def submit(self, kind: str, command: str, run) -> SubTask:
+        """run(cancel) returns an awaitable; it starts right away on the running loop"""
+        sub = SubTask(len(self.tasks), kind, command)
+        sub.task = asyncio.create_task(self._run(sub, run))
+        self.tasks.append(sub)
+        return sub
+
+    def submit_blocking(self, kind: str, command: str, function, *args, **kwargs) -> SubTask:
+        """Run a blocking function(*args, cancel=event, **kwargs) on a worker thread"""
+        return self.submit(kind, command,
+                           lambda cancel: asyncio.to_thread(function, *args, cancel=cancel, **kwargs))
+
+    async def _run(self, sub: SubTask, run):
+        # One span per sub-task, the parent of the search/LLM spans its worker records
+        with tracer.span(f"task.{sub.kind}", command=sub.command) as span:
+            await self._timed(sub, run)
+            span["outcome"] = sub.status
+
+    async def _timed(self, sub: SubTask, run):
+        start = time.perf_counter()
+        try:
+            sub.result = await asyncio.wait_for(_own_timeouts(run, sub.cancel), self.timeouts.get(sub.kind))
+            sub.status = "ok"
+        except asyncio.TimeoutError:
+            # A worker thread cannot be killed; the event makes it stop at its next piece
+            sub.cancel.set()
+            sub.status = "timeout"
+            print(f"[WARN] {sub.command!r} timed out after {self.timeouts.get(sub.kind):.0f}s")
+        except asyncio.CancelledError:
+            sub.cancel.set()
+            sub.status = "cancelled"
+            raise
+        except _HandlerTimeout as e:
+            sub.status = "error"
+            sub.error = e.__cause__
+        except Exception as e:
+            sub.status = "error"
+            sub.error = e
+        finally:
+            sub.seconds = time.perf_counter() - start
+
+    async def results(self) -> list:
+        """Wait for every sub-task; returned in the order they were submitted"""
+        await asyncio.gather(*(sub.task for sub in self.tasks), return_exceptions=True)
+        return list(self.tasks)
+
+    def report(self) -> dict:
+        wall = time.perf_counter() - self.started_at
+        busy = sum(sub.seconds or 0.0 for sub in self.tasks)
+        for sub in self.tasks:
+            seconds = f"{sub.seconds:.2f}s" if sub.seconds is not None else "-"
+            print(f"[TASK] {sub.index + 1}. {sub.command} -> {sub.status} ({seconds})")
+        if len(self.tasks) > 1:
+            print(f"[TASK] {len(self.tasks)} tasks in {wall:.2f}s (one after another: {busy:.2f}s)")
+        return {"tasks": len(self.tasks), "wall_seconds": wall, "sequential_seconds": busy}
+
+
+def _demo():
+    """A multi-command utterance run one after another vs through the scheduler"""
+    durations = [("automation", "open chrome", 0.3), ("realtime", "realtime weather in delhi", 1.2),
+                 ("general", "general tell me a joke", 0.8), ("general", "general write a long essay", 5.0)]
+
+    def answer(seconds, cancel=None):
+        # Stands in for ChatBot: checks the cancel event between streamed pieces
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            if cancel is not None and cancel.is_set():
+                return None
+            time.sleep(0.01)
+        return f"done in {seconds}s"
+
+    async def automation(seconds):
+        await asyncio.sleep(seconds)
+        return True
+
+    async def sequential():
+        start = time.perf_counter()
+        for kind, _, seconds in durations:
+            if kind == "automation":
+                await automation(seconds)
+            else:
+                await asyncio.to_thread(answer, min(seconds, 2.0))
+        return time.perf_counter() - start
+
+    async def scheduled():
+        scheduler = TaskScheduler({"general": 2.0})
+        for kind, command, seconds in durations:
+            if kind == "automation":
+                scheduler.submit(kind, command, lambda cancel, s=seconds: automation(s))
+            else:
+                scheduler.submit_blocking(kind, command, answer, seconds)
+        await scheduler.results()
+        return scheduler.report()
+
+    print(f"one after another (2s cap on the essay): {asyncio.run(sequential()):.2f}s")
+    print(f"scheduler: {asyncio.run(scheduled())['wall_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    _demo()
@@ -1,64 +1,56 @@
 import edge_tts
-import asyncio
 import pygame
 import os
-import tempfile
 import uuid
-import threading
 
 DATA_DIR = os.path.join("Data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-async def _generate_and_play(text: str, voice: str = "en-CA-LiamNeural"):
-    try:
-        # Generate speech into a temporary file to avoid conflicts
-        temp_filename = os.path.join(DATA_DIR, f"speech_{uuid.uuid4().hex}.mp3")
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(temp_filename)
+async def SynthesizeSpeech(text: str, voice: str = "en-CA-LiamNeural") -> str:
+    """Generate speech into a temporary mp3 file and return its path."""
+    # Unique file per call so queued sentences never overwrite each other
+    temp_filename = os.path.join(DATA_DIR, f"speech_{uuid.uuid4().hex}.mp3")
+    communicate = edge_tts.Communicate(text, voice)
+    await communicate.save(temp_filename)
+    return temp_filename
 
-        # Play with pygame
-        try:
-            pygame.mixer.init()
-        except Exception:
-            # Already initialized or cannot init, continue to attempt loading
-            pass
-        pygame.mixer.music.load(temp_filename)
-        pygame.mixer.music.play()
 
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
+def PlaySpeech(filename: str):
+    """Play an mp3 file with pygame, block until it finishes and delete it."""
+    try:
+        pygame.mixer.init()
+    except Exception:
+        # Already initialized or cannot init, continue to attempt loading
+        pass
+    pygame.mixer.music.load(filename)
+    pygame.mixer.music.play()
 
-        # Cleanup temporary file after playback
-        try:
-            os.remove(temp_filename)
-        except Exception:
-            pass
+    while pygame.mixer.music.get_busy():
+        pygame.time.Clock().tick(10)
 
-    except Exception as e:
-        print(f"Error in TextToSpeech: {e}")
+    # Release the file so it can be removed on Windows
+    try:
+        pygame.mixer.music.unload()
+    except Exception:
+        pass
+    try:
+        os.remove(filename)
+    except Exception:
+        pass
 
 
-def TextToSpeech(text: str, voice: str = "en-CA-LiamNeural"):
-    """Convert text to speech and play it."""
+def StopSpeech():
+    """Stop the mp3 that is playing right now; PlaySpeech returns and deletes it."""
     try:
-        # If there's already an event loop running (e.g., in GUI), run TTS in a separate thread
-        loop = None
-        try:
-            loop = asyncio.get_event_loop()
-        except Exception:
-            pass
+        if pygame.mixer.get_init():
+            pygame.mixer.music.stop()
+    except Exception:
+        pass
 
-        if loop and loop.is_running():
-            def _runner():
-                try:
-                    asyncio.run(_generate_and_play(text, voice))
-                except Exception as e:
-                    print(f"Error playing TTS in thread: {e}")
 
-            t = threading.Thread(target=_runner, daemon=True)
-            t.start()
-        else:
-            asyncio.run(_generate_and_play(text, voice))
-    except RuntimeError:
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(_generate_and_play(text, voice))
+def DiscardSpeech(filename: str):
+    """Delete synthesized speech that will not be played."""
+    try:
+        os.remove(filename)
+    except Exception:
+        pass
@@ -0,0 +1,340 @@
+"""
+Tracing
+One span per pipeline stage: mic wake, speech recognition, translation,
+the decision (fast path, intent classifier or FirstLayerDMM), every
+sub-task, Google search, LLM time-to-first-token and total, speech
+synthesis and playback. Spans carry the ID of the utterance they belong
+to, are appended to a rotating JSONL file (Data/Traces/trace.jsonl) and,
+when TRACE_OTLP_ENDPOINT is set, are exported in batches to an
+OpenTelemetry collector over OTLP/HTTP (JSON encoding).
+
+Slowest stages of the last hour: python -m Backend.Tracing --since 1h
+"""
+from pathlib import Path
+from dotenv import dotenv_values
+from logging.handlers import RotatingFileHandler
+import urllib.request
+import contextvars
+import contextlib
+import threading
+import argparse
+import logging
+import atexit
+import queue
+import uuid
+import json
+import time
+import os
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "Data"
+env_vars = dotenv_values(BASE_DIR / ".env")
+
+# Write spans at all (on/off)
+ENABLED = env_vars.get("TRACING", "on").lower() in ("on", "true", "1", "yes")
+TRACE_PATH = DATA_DIR / "Traces" / "trace.jsonl"
+# The file is rotated at this size; this many older files are kept (trace.jsonl.1, .2, ...)
+MAX_BYTES = int(env_vars.get("TRACE_MAX_BYTES", 5_000_000))
+BACKUPS = int(env_vars.get("TRACE_BACKUPS", 5))
+# OTLP/HTTP traces endpoint, e.g. http://localhost:4318/v1/traces (empty: no export)
+OTLP_ENDPOINT = env_vars.get("TRACE_OTLP_ENDPOINT") or None
+SERVICE_NAME = env_vars.get("TRACE_SERVICE_NAME", "jarvis")
+
+# Utterance the current code is working on, and the innermost open span (the parent of new ones)
+_utterance = contextvars.ContextVar("trace_utterance", default=None)
+_parent = contextvars.ContextVar("trace_span", default=None)
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter:
+    """Sends spans to an OTLP/HTTP collector in batches from a background thread; drops them when it falls behind"""
+
+    def __init__(self, endpoint: str, service: str = SERVICE_NAME, interval: float = 2.0, batch_size: int = 256,
+                 max_queue: int = 4096):
+        self.endpoint = endpoint
+        self.service = service
+        self.interval = interval
+        self.batch_size = batch_size
+        self.exported = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._failing = False
+        threading.Thread(target=self._worker, name="OTLPExporter", daemon=True).start()
+        atexit.register(self.flush)
+
+    def export(self, span: dict):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def flush(self):
+        """Send whatever is still queued (at exit)"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._send(batch)
+
+    def payload(self, spans: list) -> dict:
+        """ExportTraceServiceRequest in the OTLP JSON encoding"""
+        otlp_spans = []
+        for span in spans:
+            start = int(span["time"] * 1e9)
+            attributes = dict(span["attributes"], **{"thread.name": span["thread"]})
+            otlp_span = {
+                # Spans outside an utterance get a trace of their own
+                "traceId": span["utterance"] or uuid.uuid4().hex,
+                "spanId": span["span"],
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(start),
+                "endTimeUnixNano": str(start + int(span["ms"] * 1e6)),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+                "status": {"code": 2 if span["status"] == "error" else 1},
+            }
+            if span["parent"]:
+                otlp_span["parentSpanId"] = span["parent"]
+            otlp_spans.append(otlp_span)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service}}]},
+            "scopeSpans": [{"scope": {"name": "jarvis.tracing"}, "spans": otlp_spans}],
+        }]}
+
+    def _send(self, batch: list):
+        request = urllib.request.Request(self.endpoint, data=json.dumps(self.payload(batch)).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+            self.exported += len(batch)
+            self._failing = False
+        except Exception as e:
+            self.dropped += len(batch)
+            if not self._failing:
+                print(f"[WARN] OTLP export to {self.endpoint} failed: {e}")
+            self._failing = True
+
+
+class Tracer:
+    """Records spans for the utterance in the current context; a no-op when disabled"""
+
+    def __init__(self, path=TRACE_PATH, max_bytes: int = MAX_BYTES, backups: int = BACKUPS,
+                 enabled: bool = ENABLED, exporter: OTLPExporter = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.enabled = enabled
+        self.exporter = exporter
+        self._handler = None
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------- utterances
+
+    def begin(self) -> contextvars.Token:
+        """Start a new utterance in the current context; pass the token to end()"""
+        return _utterance.set(uuid.uuid4().hex)
+
+    def end(self, token: contextvars.Token):
+        try:
+            _utterance.reset(token)
+        except ValueError:
+            # Ended from another context; the utterance simply goes out of scope with it
+            pass
+
+    def utterance(self) -> str:
+        return _utterance.get()
+
+    # --------------------------------------------------------------------- spans
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Time the block as one span; yields its attributes dict so the block can add to it"""
+        if not self.enabled:
+            yield attributes
+            return
+        span_id = os.urandom(8).hex()
+        parent = _parent.get()
+        token = _parent.set(span_id)
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield attributes
+        except (GeneratorExit, KeyboardInterrupt):
+            status = "cancelled"
+            raise
+        except BaseException as e:
+            status = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+            if status == "error":
+                attributes["error"] = repr(e)[:200]
+            raise
+        finally:
+            try:
+                _parent.reset(token)
+            except ValueError:
+                pass
+            self._finish(name, start, time.perf_counter() - start, status, attributes, span_id, parent,
+                         _utterance.get())
+
+    def record(self, name: str, start: float, seconds: float, utterance: str = None, status: str = "ok",
+               **attributes):
+        """A span the caller timed itself (start is a time.perf_counter() value), e.g. on a worker thread"""
+        if self.enabled:
+            self._finish(name, start, seconds, status, attributes, os.urandom(8).hex(), _parent.get(),
+                         utterance or _utterance.get())
+
+    def _finish(self, name, start, seconds, status, attributes, span_id, parent, utterance):
+        span = {
+            "time": round(time.time() - (time.perf_counter() - start), 6),
+            "utterance": utterance, "span": span_id, "parent": parent, "name": name,
+            "ms": round(seconds * 1000, 3), "status": status, "thread": threading.current_thread().name,
+            "attributes": attributes,
+        }
+        self._write(json.dumps(span, ensure_ascii=False, default=str))
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+    def _write(self, line: str):
+        if self._handler is None:
+            with self._lock:
+                if self._handler is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes,
+                                                        backupCount=self.backups, encoding="utf-8")
+        # The handler locks, rotates and writes one line per span
+        self._handler.handle(logging.makeLogRecord({"msg": line}))
+
+    def close(self):
+        if self._handler is not None:
+            self._handler.close()
+
+
+# Shared tracer for the brain and every backend module
+tracer = Tracer(exporter=OTLPExporter(OTLP_ENDPOINT) if OTLP_ENDPOINT and ENABLED else None)
+
+
+def LoadSpans(path=TRACE_PATH, since: float = None) -> list:
+    """Spans from the trace file and its rotated backups, oldest first, optionally only those after `since`"""
+    path = Path(path)
+    files = sorted(path.parent.glob(path.name + ".*"), key=lambda p: -int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0)
+    spans = []
+    for file in files + [path]:
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        span = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash
+                        continue
+                    if since is None or span["time"] >= since:
+                        spans.append(span)
+        except FileNotFoundError:
+            continue
+    return spans
+
+
+def _percentile(values: list, q: float) -> float:
+    position = (len(values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def Summarize(spans: list, top: int = 10) -> dict:
+    """Stages ranked by p95 duration, and the slowest utterances with their slowest stage"""
+    stages = {}
+    utterances = {}
+    for span in spans:
+        stages.setdefault(span["name"], []).append(span["ms"])
+        if span["utterance"]:
+            utterances.setdefault(span["utterance"], []).append(span)
+
+    summary = []
+    for name, durations in stages.items():
+        durations.sort()
+        summary.append({"stage": name, "count": len(durations), "p50_ms": round(_percentile(durations, 0.5), 1),
+                        "p95_ms": round(_percentile(durations, 0.95), 1), "max_ms": round(durations[-1], 1),
+                        "total_s": round(sum(durations) / 1000, 2)})
+    summary.sort(key=lambda stage: stage["p95_ms"], reverse=True)
+
+    slowest = []
+    for utterance, members in utterances.items():
+        command = next((span for span in members if span["name"] == "command"), None)
+        start = min(span["time"] for span in members)
+        end = max(span["time"] + span["ms"] / 1000 for span in members)
+        worst = max((span for span in members if span["name"] != "command"), key=lambda span: span["ms"],
+                    default=None)
+        slowest.append({"utterance": utterance, "seconds": round(end - start, 3),
+                        "text": command["attributes"].get("text") if command else None,
+                        "slowest_stage": worst["name"] if worst else None,
+                        "slowest_stage_ms": worst["ms"] if worst else None})
+    slowest.sort(key=lambda utterance: utterance["seconds"], reverse=True)
+    return {"spans": len(spans), "utterances": len(utterances), "stages": summary[:top], "slowest": slowest[:top]}
+
+
+def _window(text: str) -> float:
+    """Seconds in "90", "30s", "15m", "2h" or "1d" """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Backend.Tracing",
+                                     description="Summarise the slowest stages in the trace file")
+    parser.add_argument("--since", default="1h", help="time window, e.g. 15m, 2h, 1d (default 1h)")
+    parser.add_argument("--top", type=int, default=10, help="stages and utterances to list")
+    parser.add_argument("--file", default=str(TRACE_PATH), help="trace file (rotated backups are read too)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        window = _window(args.since)
+    except ValueError:
+        parser.error(f"invalid window {args.since!r}")
+    summary = Summarize(LoadSpans(args.file, since=time.time() - window), args.top)
+    if args.json:
+        print(json.dumps(summary, indent=4))
+        return
+    if not summary["spans"]:
+        print(f"No spans in the last {args.since} ({args.file})")
+        return
+
+    print(f"{summary['spans']} spans from {summary['utterances']} utterances in the last {args.since}")
+    print(f"{'stage':<24} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>8}")
+    for stage in summary["stages"]:
+        print(f"{stage['stage']:<24} {stage['count']:>6} {stage['p50_ms']:>9.1f} {stage['p95_ms']:>9.1f} "
+              f"{stage['max_ms']:>9.1f} {stage['total_s']:>8.2f}")
+    print("\nslowest utterances:")
+    for utterance in summary["slowest"]:
+        text = (utterance["text"] or "")[:48]
+        stage = f"{utterance['slowest_stage']} {utterance['slowest_stage_ms']:.0f} ms" if utterance["slowest_stage"] else "-"
+        print(f"  {utterance['seconds']:7.2f}s  {utterance['utterance'][:8]}  {text!r:<50}  slowest: {stage}")
+
+
+if __name__ == "__main__":
+    main()
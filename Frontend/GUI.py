@@ -1,14 +1,17 @@
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTextEdit, QStackedWidget, QWidget, QLineEdit, QGridLayout, QVBoxLayout, QHBoxLayout, QPushButton, QFrame, QLabel, QSizePolicy)
 from PyQt5.QtGui import QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QSize, QObject, pyqtSignal
 from dotenv import dotenv_values
 import sys
 import os
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Backend.EventBus import event_bus, StatusEvent, MicEvent, ResponseEvent, TokenEvent
+from Backend.AsyncRuntime import runtime
+
 # Load environment variables
 env_vars = dotenv_values(".env")
 Assistantname = env_vars.get("Assistantname")
-old_chat_message = ""
 # Directory paths
 current_dir = os.getcwd()
 TempDirPath = rf"{current_dir}\Frontend\Files"
@@ -40,27 +43,23 @@ def QueryModifier(Query):
     return new_query.capitalize()
 
 
+# Brain and GUI share state through the in-process event bus (Frontend/Files is only a mirror)
 def SetMicrophoneStatus(Command):
-    with open(TempDirectoryPath('Mic.data'), 'w', encoding='utf-8') as file:
-        file.write(Command)
+    event_bus.publish(MicEvent(str(Command).strip() == "True"))
     
 
 def GetMicrophoneStatus():
-    
-    with open(TempDirectoryPath('Mic.data'), 'r', encoding='utf-8') as file:
-        Status = file.read().strip()
-    return Status
+    event = event_bus.last(MicEvent)
+    return "True" if event is not None and event.active else "False"
 
 
 def SetAssistantStatus(Status):
-    with open(rf'{TempDirPath}\Status.data','w',encoding='utf-8') as file:
-        file.write(Status)
+    event_bus.publish(StatusEvent(Status))
 
 
 def GetAssistantStatus():
-    with open(rf'{TempDirPath}\Status.data', 'r', encoding='utf-8') as file:
-        Status = file.read()
-    return Status
+    event = event_bus.last(StatusEvent)
+    return event.status if event is not None else ""
     
 
     
@@ -83,8 +82,29 @@ def TempDirectoryPath(Filename):
     return path
 
 def ShowTextToScreen(Text):
-    with open (rf'{TempDirPath}\Responses.data','w', encoding='utf-8') as file:
-        file.write(Text)
+    event_bus.publish(ResponseEvent(Text))
+
+
+class GuiEvents(QObject):
+    """Re-emits bus events as Qt signals, so widgets are updated on the GUI thread"""
+    status = pyqtSignal(str)
+    response = pyqtSignal(str)
+    token = pyqtSignal(str, int)
+
+    def __init__(self, bus=event_bus):
+        super().__init__()
+        bus.subscribe(StatusEvent, lambda event: self.status.emit(event.status))
+        bus.subscribe(ResponseEvent, lambda event: self.response.emit(event.text))
+        bus.subscribe(TokenEvent, lambda event: self.token.emit(event.text, event.answer))
+
+
+gui_events = None
+
+def GuiSignals():
+    global gui_events
+    if gui_events is None:
+        gui_events = GuiEvents()
+    return gui_events
 
     
 class ChatSection(QWidget):
@@ -130,10 +150,12 @@ class ChatSection(QWidget):
         font.setPointSize(13)
         self.chat_text_edit.setFont(font)
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.loadMessages)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
+        self.partial_answer = (None, "")
+        signals = GuiSignals()
+        signals.response.connect(self.loadMessages)
+        signals.status.connect(self.SpeechRecogText)
+        signals.token.connect(self.showPartialAnswer)
+        self.SpeechRecogText(GetAssistantStatus())
 
         self.chat_text_edit.viewport().installEventFilter(self)
         self.setStyleSheet("""
@@ -175,26 +197,22 @@ class ChatSection(QWidget):
 
         """)
 
-    def loadMessages(self):
-        global old_chat_message
-        try:
-            with open(rf'{TempDirPath}\Responses.data', 'r', encoding='utf-8') as file:
-                messages = file.read()
-            if messages and messages != old_chat_message:
-                self.addMessage(message=messages, color='White')
-                old_chat_message = messages
-        except FileNotFoundError:
-            pass
-
-    def SpeechRecogText(self):
-        status_path = rf'{TempDirPath}\Status.data'
-        if not os.path.exists(status_path):
-            with open(status_path, 'w', encoding='utf-8') as file:
-                file.write("")
-        with open(status_path, 'r', encoding='utf-8') as file:
-            messages = file.read()
+    def loadMessages(self, messages):
+        # Every response arrives once, so repeated lines are real repeats
+        self.partial_answer = (None, "")
+        if messages:
+            self.addMessage(message=messages, color='White')
+
+    def SpeechRecogText(self, messages):
         self.label.setText(messages)
 
+    def showPartialAnswer(self, text, answer):
+        # The status line previews the answer that is still streaming
+        current, partial = self.partial_answer
+        partial = partial + text if current == answer else text
+        self.partial_answer = (answer, partial)
+        self.label.setText(partial[-80:])
+
     def load_icon(self, path, width=60, height=60):
         pixmap = QPixmap(path)
         new_pixmap = pixmap.scaled(width, height)
@@ -263,18 +281,11 @@ class InitialScreen(QWidget):
         self.setFixedHeight(screen_height)
         self.setFixedWidth(screen_width)
         self.setStyleSheet("background-color: black;")
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
-
-    def SpeechRecogText(self):
-        status_path = TempDirPath + r'\Status.data'
-        if not os.path.exists(status_path):
-            with open(status_path, 'w', encoding='utf-8') as file:
-                file.write("")
-        with open(status_path, 'r', encoding='utf-8') as file:
-            messages = file.read()
-            self.label.setText(messages)
+        GuiSignals().status.connect(self.SpeechRecogText)
+        self.SpeechRecogText(GetAssistantStatus())
+
+    def SpeechRecogText(self, messages):
+        self.label.setText(messages)
 
     def load_icon(self, path, width=60, height=60):
         pixmap = QPixmap(path)
@@ -399,11 +410,16 @@ class MainWindow(QMainWindow):
         self.setMenuWidget(top_bar)
         self.setCentralWidget(stacked_widget)
 
-def GraphicalUserInterface():
+def GraphicalUserInterface(main=None):
+    """main is an optional coroutine (the voice control task) run on the shared asyncio loop"""
     app = QApplication(sys.argv)
+    GuiSignals()
     main_window = MainWindow()
     main_window.show()
-    sys.exit(app.exec_())
+    if main is None:
+        sys.exit(app.exec_())
+    # One loop for Qt and asyncio when qasync is installed, a background loop otherwise
+    sys.exit(runtime.run_qt(app, main))
 
 
 if __name__ == "__main__":
@@ -6,8 +6,10 @@ Brain that coordinates all backend modules with Frontend GUI
 
 import sys
 import os
-import threading
 import time
+import argparse
+import threading
+import contextvars
 import asyncio
 from pathlib import Path
 
@@ -16,22 +18,52 @@ sys.path.insert(0, str(Path(__file__).parent / "Backend"))
 
 # Import backend modules
 from Backend.SpeechToText import SpeechRecognition, SetAssistantStatus
-from Backend.TextToSpeech import TextToSpeech
-from Backend.Model import FirstLayerDMM
-from Backend.Chatbot import ChatBot
+from Backend.SpeechStream import speech_pipeline
+from Backend.Model import FirstLayerDMM, StartModelProbing
+from Backend.CommandStream import StreamCommands
+from Backend.CommandFastPath import fast_path, ENABLED as FAST_PATH_ENABLED
+from Backend.IntentClassifier import intent_classifier, LogDecision, ENABLED as INTENT_CLASSIFIER_ENABLED
+from Backend.Chatbot import ChatBot, SpeculativeChat, SPECULATIVE
 from Backend.RealtimeSearchEngine import RealtimeSearchEngine
-from Backend.Automation import Automation
-
-# Import frontend GUI functions
-from Frontend.GUI import (
-    GraphicalUserInterface,
-    ShowTextToScreen,
-    GetMicrophoneStatus,
-    SetMicrophoneStatus
-)
-
-# Import SetAssistantStatus from GUI (it's defined in GUI.py)
-import Frontend.GUI as gui_module
+try:
+    from Backend.Automation import Automation
+except (ImportError, OSError) as e:
+    # AppOpener, pywhatkit and keyboard need a desktop session; a headless box answers without them.
+    # Anything else (a missing .env key, a bug) must still stop startup
+    print(f"[WARN] Automation unavailable: {e}")
+    Automation = None
+from Backend.TaskScheduler import TaskScheduler
+from Backend.EventBus import event_bus, MicEvent, ResponseEvent
+from Backend.AsyncRuntime import runtime
+from Backend.HeadlessServer import (HeadlessServer, HOST as SERVER_HOST, PORT as SERVER_PORT,
+                                    ALLOW_AUTOMATION as SERVER_AUTOMATION)
+from Backend.SessionStore import sessions
+from Backend.Tracing import tracer
+from Backend.Profiler import profiler, STARTUP as PROFILE_STARTUP
+
+try:
+    # Import frontend GUI functions
+    from Frontend.GUI import (
+        GraphicalUserInterface,
+        ShowTextToScreen,
+        SetMicrophoneStatus
+    )
+
+    # Import SetAssistantStatus from GUI (it's defined in GUI.py)
+    import Frontend.GUI as gui_module
+except ImportError as e:
+    # No PyQt5 or display libraries: only headless mode works; status and text still go on the bus
+    print(f"[WARN] GUI unavailable: {e}")
+    GraphicalUserInterface = None
+
+    def ShowTextToScreen(Text):
+        event_bus.publish(ResponseEvent(Text))
+
+    def SetMicrophoneStatus(Command):
+        event_bus.publish(MicEvent(str(Command).strip() == "True"))
+
+    # gui_module.SetAssistantStatus is then Backend.SpeechToText's, which publishes the same StatusEvent
+    gui_module = sys.modules[__name__]
 
 class JarvisBrain:
     """Main brain that coordinates all modules"""
@@ -40,7 +72,13 @@ class JarvisBrain:
         self.running = True
         self.processing = False
         self.setup_directories()
-        self.last_mic_status = "False"
+        self.speculations = {}  # (session, utterance) -> speculative general answer confirmed by the DMM, not yet spoken
+        self.mic_events = None  # asyncio queue of mic button clicks, created on the runtime loop
+        self.mic_latencies = []
+        self.mic_reset_at = 0.0  # mic events up to this time are the brain's own resets or stale clicks
+        self.current = None  # task answering the last utterance; a new click cancels it (barge-in)
+        self.cancel_latencies = []
+        self.allow_automation = True  # off for network clients unless SERVER_AUTOMATION=on
 
         print("=" * 60)
         print("JARVIS Voice-Controlled Assistant - Brain Initialized")
@@ -68,12 +106,32 @@ class JarvisBrain:
             responses_file.write_text("", encoding='utf-8')
 
     def process_command(self, user_input: str):
-        """Process user input and route to appropriate handler"""
+        """Process user input from a thread outside the runtime loop (blocks until done or interrupted)"""
+        return runtime.run(self.answer(user_input))
+
+    async def handle_command(self, user_input: str, session=None):
+        """Process user input and route to appropriate handler; session is the user's state (default: the local user)"""
         if not user_input or not user_input.strip():
             return
 
         user_input = user_input.strip()
+        # The voice loop starts the utterance at the mic click; text requests start one here
+        token = tracer.begin() if tracer.utterance() is None else None
+        try:
+            with tracer.span("command", text=user_input[:200], session=getattr(session, "id", None)):
+                return await self._handle_command(user_input, session)
+        finally:
+            profiler.utterance_done()
+            if token is not None:
+                tracer.end(token)
+
+    async def _handle_command(self, user_input: str, session=None):
+        """handle_command inside the utterance's "command" span"""
         self.processing = True
+        leftover = self.speculations.pop((session, user_input), None)
+        if leftover is not None:
+            # Left over from an interrupted utterance
+            leftover.cancel()
 
         # Display user query in GUI
         ShowTextToScreen(f"You: {user_input}")
@@ -83,129 +141,273 @@ class JarvisBrain:
         print("[BRAIN] Processing command...\n")
 
         try:
-            # Use decision-making model to determine command type
             gui_module.SetAssistantStatus("Analyzing command...")
-            stream = FirstLayerDMM(user_input)
-
-            # Parse the decision model response
-            response = ""
-            for event in stream:
-                if event.event_type == "text-generation":
-                    response += event.text
-
-            # Clean and parse response
-            response = response.replace("\n,", "").strip()
-            commands = [cmd.strip() for cmd in response.split(",") if cmd.strip()]
 
-            # Filter valid commands
-            valid_commands = []
-            funcs = ["exit", "general", "realtime", "open", "close", "play",
-                     "system", "content", "google search",
-                     "youtube search", "reminder"]
-
-            for cmd in commands:
-                for func in funcs:
-                    if cmd.startswith(func):
-                        valid_commands.append(cmd)
-                        break
-
-            if not valid_commands:
-                # Default to general query if no valid command found
-                valid_commands = [f"general {user_input}"]
-
-            # Execute commands
-            asyncio.run(self.execute_commands(valid_commands, user_input))
+            # Commands are executed as soon as each one is decided
+            return await self.execute_stream(self.decide_stream(user_input, session), user_input, session)
 
         except Exception as e:
             error_msg = f"Error processing command: {str(e)}"
             print(f"[ERROR] {error_msg}")
             ShowTextToScreen(f"JARVIS: Sorry, I encountered an error. Please try again.")
-            TextToSpeech("Sorry, I encountered an error. Please try again.")
+            await asyncio.to_thread(speech_pipeline.speak, "Sorry, I encountered an error. Please try again.")
             gui_module.SetAssistantStatus("Error")
             self.processing = False
+        except asyncio.CancelledError:
+            print("[BRAIN] Response interrupted")
+            self.processing = False
+            raise
         finally:
+            leftover = self.speculations.pop((session, user_input), None)
+            if leftover is not None:
+                # Confirmed but never spoken (the request failed); do not leak it into the next one
+                leftover.cancel()
             gui_module.SetAssistantStatus("Ready")
 
-    async def execute_commands(self, commands: list, original_query: str):
-        """Execute the parsed commands"""
-        automation_commands = []
-        general_query = None
-        realtime_query = None
+    async def interrupt(self):
+        """Barge-in: stop speaking, cancel the answer in flight and wait until it has let go"""
+        task, self.current = self.current, None
+        if task is None or task.done():
+            return
+        started = time.perf_counter()
+        speech_pipeline.interrupt()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Interrupted response failed: {e}")
+        latency = time.perf_counter() - started
+        self.cancel_latencies.append(latency)
+        print(f"[BRAIN] Barge-in: previous response cancelled in {latency * 1000:.1f} ms")
+
+    def decide(self, user_input: str, session=None) -> list:
+        """Turn the user input into a command list, locally when the command is unambiguous"""
+        return list(self.decide_stream(user_input, session))
+
+    def decide_stream(self, user_input: str, session=None):
+        """Yield commands for the user input; remote decisions are yielded while the model is still streaming"""
+        if FAST_PATH_ENABLED:
+            with tracer.span("fast_path") as span:
+                commands = fast_path.classify(user_input)
+                span["commands"] = len(commands) if commands is not None else 0
+            if commands is not None:
+                print(f"[FAST PATH] {commands}")
+                yield from commands
+                return
+
+        if INTENT_CLASSIFIER_ENABLED:
+            with tracer.span("intent_classifier") as span:
+                commands = intent_classifier.classify(user_input)
+                span["commands"] = len(commands) if commands is not None else 0
+            if commands is not None:
+                print(f"[INTENT] {commands}")
+                yield from commands
+                return
+
+        # Most remote decisions are "general": start answering while the model classifies
+        speculation = SpeculativeChat(user_input, session=session) if SPECULATIVE else None
+        held = []
+
+        try:
+            # Use decision-making model to determine command type
+            started = time.perf_counter()
+            valid_commands = []
+            with tracer.span("dmm") as span:
+                stream = FirstLayerDMM(user_input, session=session)
+                for command in StreamCommands(stream):
+                    print(f"[DMM] {command}")
+                    if not valid_commands:
+                        span["first_command_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    valid_commands.append(command)
+                    span["commands"] = len(valid_commands)
+                    if speculation is not None and command.lower().startswith("general"):
+                        # Whether it is the whole decision is only known when the stream ends
+                        held.append(command)
+                        continue
+                    yield command
+
+            if valid_commands:
+                # Remote decisions are the training data for the local intent classifier
+                LogDecision(user_input, valid_commands, seconds=time.perf_counter() - started)
+            else:
+                # Default to general query if no valid command found
+                held = [f"general {user_input}"]
+
+            if speculation is not None and valid_commands in ([], held) and len(held) == 1:
+                # The DMM confirmed a single general answer: keep the one already streaming
+                self.speculations[session, user_input], speculation = speculation, None
+            yield from held
+        finally:
+            if speculation is not None:
+                speculation.cancel()
+
+    async def execute_stream(self, commands, original_query: str, session=None):
+        """Run commands from a (blocking) iterator while it is still producing them"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for command in commands:
+                    if stop.is_set():
+                        # Interrupted: closing the generator cancels the DMM stream and any speculation
+                        commands.close()
+                        return
+                    loop.call_soon_threadsafe(queue.put_nowait, command)
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        # The decision model stream blocks, so it is read on a pooled worker thread (in this
+        # context, so its spans belong to the utterance)
+        loop.run_in_executor(None, contextvars.copy_context().run, produce)
+
+        async def arrivals():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        try:
+            return await self.execute_commands(arrivals(), original_query, session)
+        finally:
+            stop.set()
+
+    async def execute_commands(self, commands, original_query: str, session=None):
+        """
+        Execute commands as they arrive (a list or an async iterator). Every command runs
+        concurrently with its own timeout; answers are spoken one at a time as each is ready.
+        Returns the sub-tasks in the order the user gave them.
+        """
+        scheduler = TaskScheduler()
+
+        async def arrivals():
+            if hasattr(commands, "__aiter__"):
+                async for command in commands:
+                    yield command
+            else:
+                for command in commands:
+                    yield command
+
+        def argument(command, name):
+            query = command[len(name):].strip()
+            if query.startswith("(") and query.endswith(")"):
+                query = query[1:-1].strip()
+            return query if query else original_query
 
-        for command in commands:
+        async for command in arrivals():
             command_lower = command.lower()
 
             if command_lower.startswith("exit"):
                 self.running = False
                 ShowTextToScreen("JARVIS: Goodbye! Have a great day!")
-                TextToSpeech("Goodbye! Have a great day!")
-                return
+                await asyncio.to_thread(speech_pipeline.speak, "Goodbye! Have a great day!")
+                return await scheduler.results()
 
             elif command_lower.startswith("general"):
-                # Extract the query part
-                query = command.replace("general", "").strip()
-                if query.startswith("(") and query.endswith(")"):
-                    query = query[1:-1].strip()
-                general_query = query if query else original_query
+                # A speculative answer confirmed by decide_stream is already streaming
+                speculation = self.speculations.pop((session, original_query), None)
+                # ChatBot and RealtimeSearchEngine block while they stream, so they run on worker threads
+                scheduler.submit_blocking("general", command, self.answer_general,
+                                          argument(command, "general"), speculation=speculation, session=session)
 
             elif command_lower.startswith("realtime"):
-                # Extract the query part
-                query = command.replace("realtime", "").strip()
-                if query.startswith("(") and query.endswith(")"):
-                    query = query[1:-1].strip()
-                realtime_query = query if query else original_query
+                scheduler.submit_blocking("realtime", command, self.answer_realtime,
+                                          argument(command, "realtime"), session=session)
 
             else:
-                # Automation commands (open, close, play, content, system, etc.)
-                automation_commands.append(command)
-
-        # Execute automation commands first
-        if automation_commands:
-            gui_module.SetAssistantStatus("Executing automation...")
-            print("[AUTO] Executing automation commands...")
-            ShowTextToScreen("JARVIS: Executing your automation commands...")
-            try:
-                await Automation(automation_commands)
-                print("[OK] Automation completed!")
-                ShowTextToScreen("JARVIS: Automation completed successfully!")
-            except Exception as e:
-                print(f"[ERROR] Automation error: {e}")
-                ShowTextToScreen(f"JARVIS: Automation error: {str(e)}")
-
-        # Handle real-time queries
-        if realtime_query:
-            gui_module.SetAssistantStatus("Searching real-time information...")
-            print(f"[SEARCH] Searching for: {realtime_query}")
-            ShowTextToScreen(f"JARVIS: Searching for real-time information about '{realtime_query}'...")
-            try:
-                response = RealtimeSearchEngine(realtime_query)
+                # Automation commands (open, close, play, content, system, etc.) start right away
+                if not any(sub.kind == "automation" for sub in scheduler.tasks):
+                    gui_module.SetAssistantStatus("Executing automation...")
+                    print("[AUTO] Executing automation commands...")
+                    ShowTextToScreen("JARVIS: Executing your automation commands...")
+                print(f"[AUTO] {command}")
+                if Automation is None or not self.allow_automation:
+                    scheduler.submit("automation", command, self.automation_unavailable)
+                else:
+                    scheduler.submit("automation", command,
+                                     lambda cancel, command=command: Automation([command], session=session))
+
+        results = await scheduler.results()
+        scheduler.report()
+
+        automation = [sub for sub in results if sub.kind == "automation"]
+        failed = [sub for sub in automation if sub.status != "ok"]
+        if failed:
+            reason = failed[0].error if failed[0].error is not None else failed[0].status
+            print(f"[ERROR] Automation error: {failed[0].command}: {reason}")
+            ShowTextToScreen(f"JARVIS: Automation error: {str(reason)}")
+        elif automation:
+            print("[OK] Automation completed!")
+            ShowTextToScreen("JARVIS: Automation completed successfully!")
+
+        answers = [sub for sub in results if sub.kind != "automation"]
+        errors = [sub for sub in answers if sub.status == "error"]
+        for sub in errors:
+            print(f"[ERROR] {sub.command}: {sub.error!r}")
+        if any(sub.status == "timeout" for sub in answers):
+            error_msg = "Sorry, part of that took too long to answer."
+            ShowTextToScreen(f"JARVIS: {error_msg}")
+            await asyncio.to_thread(speech_pipeline.speak, error_msg)
+        elif errors:
+            error_msg = "Sorry, I encountered an error. Please try again."
+            ShowTextToScreen(f"JARVIS: {error_msg}")
+            await asyncio.to_thread(speech_pipeline.speak, error_msg)
+
+        gui_module.SetAssistantStatus("Ready")
+        self.processing = False
+        return results
+
+    async def automation_unavailable(self, cancel=None):
+        if Automation is None:
+            raise RuntimeError("automation is not available on this machine")
+        raise RuntimeError("automation is off for network clients (SERVER_AUTOMATION)")
+
+    def answer_realtime(self, realtime_query: str, cancel=None, session=None):
+        gui_module.SetAssistantStatus("Searching real-time information...")
+        print(f"[SEARCH] Searching for: {realtime_query}")
+        ShowTextToScreen(f"JARVIS: Searching for real-time information about '{realtime_query}'...")
+        try:
+            # RealtimeSearchEngine speaks its answer while it streams
+            response = RealtimeSearchEngine(realtime_query, cancel=cancel, session=session)
+            if cancel is None or not cancel.is_set():
                 print(f"[RESPONSE] {response}\n")
                 ShowTextToScreen(f"JARVIS: {response}")
-                TextToSpeech(response)
-            except Exception as e:
-                print(f"[ERROR] Real-time search error: {e}")
-                error_msg = "Sorry, I couldn't find that information."
-                ShowTextToScreen(f"JARVIS: {error_msg}")
-                TextToSpeech(error_msg)
-
-        # Handle general queries
-        if general_query:
-            gui_module.SetAssistantStatus("Thinking...")
-            print(f"[THINKING] Processing your question...\n")
-            ShowTextToScreen(f"JARVIS: Let me think about that...")
-            try:
-                # ChatBot already calls TextToSpeech internally
-                response = ChatBot(general_query)
+            return response
+        except Exception as e:
+            print(f"[ERROR] Real-time search error: {e}")
+            error_msg = "Sorry, I couldn't find that information."
+            ShowTextToScreen(f"JARVIS: {error_msg}")
+            speech_pipeline.speak(error_msg)
+            raise
+
+    def answer_general(self, general_query: str, speculation=None, cancel=None, session=None):
+        gui_module.SetAssistantStatus("Thinking...")
+        print(f"[THINKING] Processing your question...\n")
+        ShowTextToScreen(f"JARVIS: Let me think about that...")
+        try:
+            # ChatBot speaks its answer while it streams; a speculative answer has a head start
+            if speculation is not None:
+                response = speculation.commit(cancel=cancel)
+            else:
+                response = ChatBot(general_query, cancel=cancel, session=session)
+            if cancel is None or not cancel.is_set():
                 print(f"[RESPONSE] {response}\n")
                 ShowTextToScreen(f"JARVIS: {response}")
-            except Exception as e:
-                print(f"[ERROR] Chatbot error: {e}")
-                error_msg = "Sorry, I couldn't process that question."
-                ShowTextToScreen(f"JARVIS: {error_msg}")
-                TextToSpeech(error_msg)
-
-        gui_module.SetAssistantStatus("Ready")
-        self.processing = False
+            return response
+        except Exception as e:
+            print(f"[ERROR] Chatbot error: {e}")
+            error_msg = "Sorry, I couldn't process that question."
+            ShowTextToScreen(f"JARVIS: {error_msg}")
+            speech_pipeline.speak(error_msg)
+            raise
 
     def listen_with_retries(self, attempts: int = 2, max_wait_time: int = 30):
         """
@@ -216,7 +418,9 @@ class JarvisBrain:
         for attempt in range(attempts + 1):
             try:
                 print(f"[LISTEN] Attempt {attempt+1} to capture voice...")
-                text = SpeechRecognition(max_wait_time=max_wait_time)
+                with tracer.span("speech_recognition", attempt=attempt + 1) as span:
+                    text = SpeechRecognition(max_wait_time=max_wait_time)
+                    span["characters"] = len(text or "")
                 # SpeechRecognition now raises on real errors and returns valid text only.
                 if text and text.strip():
                     return text.strip()
@@ -236,107 +440,161 @@ class JarvisBrain:
             print(f"[LISTEN] Final error after retries: {last_exception}")
         return None
 
-    def voice_control_loop(self):
-        """Main voice control loop that monitors microphone status"""
+    async def respond(self, user_input: str, echo: bool = False):
+        """Answer one utterance; runs as self.current so the next click can cancel it"""
+        if echo:
+            # ================= DEBUG ECHO SNIPPET START =================
+            # This snippet immediately echoes the captured text via TTS
+            # to confirm the pipeline from STT -> main -> TTS is working.
+            print(f"[DEBUG] Captured user_input -> {user_input!r}")
+            ShowTextToScreen(f"You: {user_input}")
+            # Immediately speak what was heard (simple echo) to confirm TTS works
+            try:
+                await asyncio.to_thread(speech_pipeline.speak, f"You said: {user_input}")
+            except Exception as tts_exc:
+                print(f"[DEBUG] TextToSpeech failed: {tts_exc}")
+                ShowTextToScreen("JARVIS: TTS failed, see console.")
+            # ================= DEBUG ECHO SNIPPET END =================
+        # Now call the real processor and log if it raises
+        try:
+            return await self.handle_command(user_input)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[DEBUG] process_command raised: {e}")
+            ShowTextToScreen("JARVIS: Error while processing command. See console.")
+
+    def start_response(self, user_input: str, echo: bool = False) -> asyncio.Task:
+        self.current = asyncio.create_task(self.respond(user_input, echo))
+        # "exit" stops the brain; wake the voice loop so it can notice
+        self.current.add_done_callback(lambda task: self.running or self.mic_events is None
+                                       or self.mic_events.put_nowait(None))
+        return self.current
+
+    async def answer(self, user_input: str):
+        """Answer an utterance, interrupting the one in flight; None if a newer one interrupted it"""
+        await self.interrupt()
+        task = self.start_response(user_input)
+        await asyncio.wait({task})
+        return None if task.cancelled() else task.result()
+
+    def reset_microphone(self):
+        SetMicrophoneStatus("False")
+        # Our own reset and any clicks made while listening are not new commands
+        self.mic_reset_at = time.time()
+
+    async def voice_control(self):
+        """Main voice control task on the runtime loop; waits until the microphone button is clicked"""
         print("[BRAIN] Voice control loop started")
+        # Mic button clicks are delivered here; the task sleeps until one arrives
+        self.mic_events = runtime.queue(event_bus, MicEvent)
 
         while self.running:
             try:
-                # Check microphone status
-                current_mic_status = GetMicrophoneStatus()
-
-                # If microphone was just activated and we're not processing
-                if current_mic_status == "True" and self.last_mic_status == "False" and not self.processing:
-                    print("[BRAIN] Microphone activated - listening...")
-                    gui_module.SetAssistantStatus("Listening...")
-
-                    try:
-                        # Use wrapper with retries instead of direct call
-                        user_input = self.listen_with_retries(attempts=2, max_wait_time=30)
-
-                        if user_input and user_input.strip():
-                            # ================= DEBUG ECHO SNIPPET START =================
-                            # This snippet immediately echoes the captured text via TTS
-                            # to confirm the pipeline from STT -> main -> TTS is working.
-                            print(f"[DEBUG] Captured user_input -> {user_input!r}")
-                            ShowTextToScreen(f"You: {user_input}")
-                            # Immediately speak what was heard (simple echo) to confirm TTS works
-                            try:
-                                TextToSpeech(f"You said: {user_input}")
-                            except Exception as tts_exc:
-                                print(f"[DEBUG] TextToSpeech failed: {tts_exc}")
-                                ShowTextToScreen("JARVIS: TTS failed, see console.")
-                            # Now call the real processor and log if it raises
-                            try:
-                                self.process_command(user_input)
-                            except Exception as e:
-                                print(f"[DEBUG] process_command raised: {e}")
-                                ShowTextToScreen("JARVIS: Error while processing command. See console.")
-                            # ================= DEBUG ECHO SNIPPET END =================
-
-                            # Reset microphone status
-                            SetMicrophoneStatus("False")
-                            self.last_mic_status = "False"
-                        else:
-                            print("[WARNING] No voice input detected (or attempts exhausted)")
-                            ShowTextToScreen("JARVIS: No voice input detected. Please try again.")
-                            gui_module.SetAssistantStatus("No input detected")
-                            SetMicrophoneStatus("False")
-                            self.last_mic_status = "False"
-
-                    except Exception as e:
-                        error_msg = str(e)
-                        print(f"[ERROR] Error in voice recognition: {error_msg}")
-
-                        # Show user-friendly error message
-                        if "timeout" in error_msg.lower():
-                            user_msg = "Voice recognition timeout. Please speak clearly and try again."
-                        elif "chrome" in error_msg.lower() or "driver" in error_msg.lower():
-                            user_msg = "Browser error. Please ensure Chrome is installed and try again."
-                        else:
-                            user_msg = "Error in voice recognition. Please check your microphone and try again."
-
-                        ShowTextToScreen(f"JARVIS: {user_msg}")
-                        gui_module.SetAssistantStatus("Error in voice recognition")
-                        SetMicrophoneStatus("False")
-                        self.last_mic_status = "False"
-
-                        # Wait a bit before allowing next attempt
-                        time.sleep(2)
-
-                # Update last status
-                self.last_mic_status = current_mic_status
-
-                # Small delay to prevent excessive CPU usage
-                time.sleep(0.1)
-
-            except KeyboardInterrupt:
-                print("\n[WARNING] Interrupted by user")
+                event = await self.mic_events.get()
+                if event is None or event.timestamp <= self.mic_reset_at:
+                    continue
+
+                if self.current is not None and not self.current.done():
+                    # Barge-in: a click while answering stops the answer and listens for the next command
+                    await self.interrupt()
+                elif not event.active:
+                    continue
+
+                latency = time.time() - event.timestamp
+                self.mic_latencies.append(latency)
+                # Everything from here to the spoken answer is one utterance
+                tracer.begin()
+                tracer.record("mic_wake", time.perf_counter() - latency, latency)
+                print(f"[BRAIN] Microphone activated - listening... ({latency * 1000:.1f} ms after the click)")
+                gui_module.SetAssistantStatus("Listening...")
+
+                try:
+                    # Use wrapper with retries instead of direct call; the browser STT blocks
+                    user_input = await asyncio.to_thread(self.listen_with_retries, attempts=2, max_wait_time=30)
+
+                    if user_input and user_input.strip():
+                        # The answer runs as its own task so the loop keeps listening for barge-in clicks
+                        self.start_response(user_input, echo=True)
+                    else:
+                        print("[WARNING] No voice input detected (or attempts exhausted)")
+                        ShowTextToScreen("JARVIS: No voice input detected. Please try again.")
+                        gui_module.SetAssistantStatus("No input detected")
+                    self.reset_microphone()
+
+                except Exception as e:
+                    error_msg = str(e)
+                    print(f"[ERROR] Error in voice recognition: {error_msg}")
+
+                    # Show user-friendly error message
+                    if "timeout" in error_msg.lower():
+                        user_msg = "Voice recognition timeout. Please speak clearly and try again."
+                    elif "chrome" in error_msg.lower() or "driver" in error_msg.lower():
+                        user_msg = "Browser error. Please ensure Chrome is installed and try again."
+                    else:
+                        user_msg = "Error in voice recognition. Please check your microphone and try again."
+
+                    ShowTextToScreen(f"JARVIS: {user_msg}")
+                    gui_module.SetAssistantStatus("Error in voice recognition")
+
+                    # Wait a bit before allowing next attempt
+                    await asyncio.sleep(2)
+                    self.reset_microphone()
+
+            except asyncio.CancelledError:
+                print("\n[WARNING] Voice control stopped")
                 self.running = False
-                break
+                await self.interrupt()
+                raise
             except Exception as e:
                 print(f"[ERROR] Error in voice control loop: {e}")
-                time.sleep(1)
+                await asyncio.sleep(1)
+
+    def voice_control_loop(self):
+        """Run the voice control task from a plain thread (blocks until it ends)"""
+        runtime.run(self.voice_control())
 
     def start_gui(self):
         """Start the GUI in the main thread"""
         try:
             print("[GUI] Starting graphical interface...")
-            GraphicalUserInterface()
+            # The GUI owns the main thread; voice control runs on the shared asyncio loop
+            GraphicalUserInterface(main=self.voice_control())
         except Exception as e:
             print(f"[ERROR] GUI error: {e}")
             import traceback
             traceback.print_exc()
 
+    async def handle_session_command(self, user_input: str, session: str = None):
+        """Answer a network request in its named session (kept in memory while it runs) or a throwaway one"""
+        state = await asyncio.to_thread(sessions.acquire_remote, session)
+        try:
+            return await self.handle_command(user_input, session=state)
+        finally:
+            sessions.release(state)
+
+    def serve(self, host: str = SERVER_HOST, port: int = SERVER_PORT):
+        """Headless mode: answer text commands over HTTP and WebSocket, streaming the answers back"""
+        print("[SERVER] Headless mode: no GUI, microphone or local speech")
+        # Anyone who can connect could otherwise open, close and type on this machine
+        self.allow_automation = SERVER_AUTOMATION
+        if not SERVER_AUTOMATION:
+            print("[INFO] Automation commands are refused (SERVER_AUTOMATION=off)")
+        # Each request runs handle_command on the shared loop; its answers go to that client, not the speakers
+        server = HeadlessServer(self.handle_session_command, host=host, port=port)
+        try:
+            runtime.run(server.serve_forever())
+        finally:
+            self.running = False
+            print("\n[BYE] JARVIS server shutting down...")
+
     def start(self):
         """Start JARVIS brain - coordinates GUI and voice control"""
+        if GraphicalUserInterface is None:
+            print("[FATAL ERROR] The GUI needs PyQt5; run `python main.py --headless` on machines without it")
+            return
         try:
-            # Start voice control in a separate thread
-            voice_thread = threading.Thread(target=self.voice_control_loop, daemon=True)
-            voice_thread.start()
-            print("[OK] Voice control thread started")
-
-            # Start GUI in main thread (GUI must run in main thread)
+            # Start GUI in main thread (GUI must run in main thread); it starts voice control
             print("[OK] Starting GUI...")
             self.start_gui()
 
@@ -350,14 +608,31 @@ class JarvisBrain:
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="JARVIS voice-controlled assistant")
+    parser.add_argument("--headless", action="store_true",
+                        help="serve the text API (HTTP/WebSocket) instead of the GUI and microphone")
+    parser.add_argument("--host", default=SERVER_HOST, help="headless server address")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="headless server port")
+    parser.add_argument("--profile", default=PROFILE_STARTUP, metavar="SPEC",
+                        help="sample all threads into Data/profiles: 30s, 5u (next 5 utterances) or always")
+    args = parser.parse_args()
+
     try:
         # Set UTF-8 encoding for Windows console
         if sys.platform == "win32":
             os.system("chcp 65001 >nul 2>&1")
 
+        # kill -USR1 <pid> starts or ends a profile of the running assistant
+        profiler.install_signal()
+        profiler.start_from_env(args.profile)
+        StartModelProbing()
+
         # Create and start JARVIS brain
         jarvis = JarvisBrain()
-        jarvis.start()
+        if args.headless:
+            jarvis.serve(args.host, args.port)
+        else:
+            jarvis.start()
 
     except KeyboardInterrupt:
         print("\n[BYE] Shutting down JARVIS...")
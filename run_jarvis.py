@@ -98,7 +98,6 @@ def setup_directories():
     
     # Create necessary data files
     data_files = [
-        ("Data/Chatlog.json", "[]"),
         ("Frontend/Files/Status.data", ""),
         ("Frontend/Files/Mic.data", "False"),
         ("Frontend/Files/Responses.data", ""),
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Tests import the backend the way main.py does, from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Backend.Tracing import tracer
+
+
+@pytest.fixture(autouse=True)
+def no_trace_file():
+    """Keep test spans out of Data/Traces"""
+    enabled, tracer.enabled = tracer.enabled, False
+    yield
+    tracer.enabled = enabled
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+
+from Backend.AsyncRuntime import AsyncRuntime
+
+
+@pytest.fixture
+def runtime():
+    runtime = AsyncRuntime()
+    runtime.start()
+    yield runtime
+    runtime.loop.call_soon_threadsafe(runtime.loop.stop)
+
+
+def test_coroutines_from_any_thread_share_one_loop(runtime):
+    async def loop_of_caller():
+        await asyncio.sleep(0)
+        return asyncio.get_running_loop()
+
+    loops = []
+    threads = [threading.Thread(target=lambda: loops.append(runtime.run(loop_of_caller(), timeout=2)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert loops == [runtime.loop] * 4
+
+
+def test_run_refuses_to_block_its_own_loop(runtime):
+    async def nested():
+        with pytest.raises(RuntimeError):
+            runtime.run(asyncio.sleep(0))
+        return runtime.in_loop()
+
+    assert runtime.run(nested(), timeout=2) is True
+    assert runtime.in_loop() is False
+
+
+def test_a_timed_out_run_cancels_the_coroutine(runtime):
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        runtime.run(slow(), timeout=0.05)
+    assert cancelled.wait(2)
@@ -0,0 +1,101 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from Backend import Chatbot
+from Backend.ChatLogStore import ChatLogStore
+from Backend.ContextWindow import ContextWindow
+from Backend.ConversationState import ConversationState
+from Backend.SpeechStream import SpeechPipeline
+
+TOKEN_DELAY = 0.02
+ANSWER = " ".join(f"This is sentence number {i} of a very long answer about nothing in particular."
+                  for i in range(1, 13))
+
+
+class FakePlayback:
+    """pygame stand-in: a sentence plays until stop() or a long timeout"""
+
+    def __init__(self, seconds=5.0):
+        self.seconds = seconds
+        self.stopped = threading.Event()
+        self.started = threading.Event()
+        self.played = []
+
+    def play(self, audio):
+        self.stopped.clear()
+        self.played.append(audio)
+        self.started.set()
+        self.stopped.wait(self.seconds)
+
+
+def slow_completion(closed, delay=TOKEN_DELAY):
+    def completion(messages):
+        try:
+            for word in ANSWER.split(" "):
+                time.sleep(delay)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+        finally:
+            closed.append(time.perf_counter())
+    return completion
+
+
+@pytest.fixture
+def session(tmp_path):
+    state = ConversationState(ChatLogStore(tmp_path / "Chatlog"), background=False)
+    window = ContextWindow(state, summary_path=tmp_path / "ChatSummary.json",
+                           summarizer=lambda previous, messages: "summary")
+    return SimpleNamespace(conversation=state, context_window=window)
+
+
+def test_barge_in_stops_playback_closes_the_stream_and_logs_the_partial_answer(monkeypatch, session):
+    playback = FakePlayback()
+    pipeline = SpeechPipeline(synthesize=lambda sentence: sentence, play=playback.play,
+                              stop=playback.stopped.set, discard=lambda audio: None)
+    closed = []
+    monkeypatch.setattr(Chatbot, "speech_pipeline", pipeline)
+    monkeypatch.setattr(Chatbot, "ChatCompletion", slow_completion(closed))
+
+    cancel = threading.Event()
+    answers = []
+    reader = threading.Thread(target=lambda: answers.append(
+        Chatbot.ChatBot("tell me something long", cancel=cancel, session=session)))
+    reader.start()
+    assert playback.started.wait(5)
+
+    # Barge-in, as JarvisBrain.interrupt does: stop the audio, then cancel the answer
+    interrupted_at = time.perf_counter()
+    pipeline.interrupt()
+    cancel.set()
+    assert pipeline.wait(2)
+    stopped_after = time.perf_counter() - interrupted_at
+    reader.join(5)
+    assert not reader.is_alive()
+
+    # Playback stops at once (well under a millisecond here); the stream closes at its next token
+    assert stopped_after < 0.05
+    assert closed and closed[0] - interrupted_at < TOKEN_DELAY + 0.2
+    # Only the sentence that was playing was heard; nothing queued behind it
+    assert playback.played == ["This is sentence number 1 of a very long answer about nothing in particular."]
+
+    # What was said before the user cut in is kept, marked as interrupted
+    question, answer = session.conversation.tail(2)
+    assert question == {"role": "user", "content": "tell me something long"}
+    assert answer["content"].endswith(" [interrupted]")
+    assert answer["content"].startswith(playback.played[0])
+    assert len(answer["content"].split()) < len(ANSWER.split())
+    assert answers and answers[0]
+
+
+def test_an_answer_without_barge_in_is_logged_whole(monkeypatch, session):
+    pipeline = SpeechPipeline(synthesize=lambda sentence: sentence, play=lambda audio: None,
+                              stop=lambda: None, discard=lambda audio: None)
+    monkeypatch.setattr(Chatbot, "speech_pipeline", pipeline)
+    monkeypatch.setattr(Chatbot, "ChatCompletion", slow_completion([], delay=0))
+
+    Chatbot.ChatBot("tell me something long", cancel=threading.Event(), session=session)
+    answer = session.conversation.tail(1)[0]["content"]
+    assert "[interrupted]" not in answer
+    assert answer.split() == ANSWER.split()
@@ -0,0 +1,88 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from Backend import Chatbot
+from Backend.ChatLogStore import ChatLogStore
+from Backend.ContextWindow import ContextWindow
+from Backend.ConversationState import ConversationState
+from Backend.SpeechStream import speech_output
+
+
+def chunk(piece):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+class FlakyCompletion:
+    """Streams the given pieces, then fails; records every request"""
+
+    def __init__(self, pieces, fail_on_call=1):
+        self.pieces = pieces
+        self.fail_on_call = fail_on_call
+        self.calls = []
+
+    def __call__(self, messages):
+        self.calls.append(messages)
+        call = len(self.calls)
+
+        def stream():
+            for piece in self.pieces:
+                yield chunk(piece)
+            if call <= self.fail_on_call:
+                raise ConnectionError("stream dropped")
+        return stream()
+
+
+@pytest.fixture
+def session(tmp_path):
+    store = ChatLogStore(tmp_path / "Chatlog")
+    conversation = ConversationState(store, background=False)
+    window = ContextWindow(conversation, budget=600, summary_tokens=100, summary_path=tmp_path / "ChatSummary.json",
+                           summarizer=lambda previous, messages: "summary")
+    return SimpleNamespace(conversation=conversation, context_window=window)
+
+
+@pytest.fixture
+def said():
+    pieces = []
+    token = speech_output.set(lambda text, answer: pieces.append(text))
+    yield pieces
+    speech_output.reset(token)
+
+
+def test_failure_before_any_piece_retries_once(monkeypatch, session, said):
+    completion = FlakyCompletion([])
+    monkeypatch.setattr(Chatbot, "ChatCompletion", completion)
+    # The retry gets the same empty stream but no error
+    assert Chatbot.ChatBot("what is python", session=session) == ""
+    assert len(completion.calls) == 2
+
+
+def test_failure_after_pieces_keeps_the_partial_answer(monkeypatch, session, said):
+    completion = FlakyCompletion(["Python is ", "a language. "])
+    monkeypatch.setattr(Chatbot, "ChatCompletion", completion)
+
+    answer = Chatbot.ChatBot("what is python", session=session)
+    # Nothing is spoken twice and the partial answer is recorded as interrupted
+    assert len(completion.calls) == 1
+    assert said == ["Python is ", "a language. "]
+    assert answer == "Python is a language. "
+    assert session.conversation.read()[-1]["content"] == "Python is a language. [interrupted]"
+
+
+def test_no_retry_after_a_cancel(monkeypatch, session, said):
+    cancel = threading.Event()
+    calls = []
+
+    def cut_in_then_fail(messages):
+        calls.append(messages)
+        # The user barges in, then the dropped stream raises before any piece arrived
+        cancel.set()
+        raise ConnectionError("stream dropped")
+        yield
+
+    monkeypatch.setattr(Chatbot, "ChatCompletion", cut_in_then_fail)
+    assert Chatbot.ChatBot("what is python", cancel=cancel, session=session) == ""
+    assert len(calls) == 1
+    assert said == []
@@ -0,0 +1,44 @@
+from Backend.ChatLogStore import ChatLogStore
+
+
+def messages(start, stop):
+    return [{"role": "user", "content": f"message {i}"} for i in range(start, stop)]
+
+
+def test_reopen_with_a_different_segment_size(tmp_path):
+    store = ChatLogStore(tmp_path, tail_size=5, segment_size=10)
+    store.extend(messages(0, 25))
+    store.close()
+
+    # Segments of 10, 10 and 5 messages read back with a larger and a smaller segment size
+    for segment_size in (100, 4):
+        store = ChatLogStore(tmp_path, tail_size=5, segment_size=segment_size)
+        assert len(store) == 25
+        assert store.read(8, 13) == messages(8, 13)
+        assert store.tail(7) == messages(18, 25)
+        store.close()
+
+    store = ChatLogStore(tmp_path, tail_size=5, segment_size=4)
+    store.extend(messages(25, 35))
+    store.close()
+    store = ChatLogStore(tmp_path, tail_size=5, segment_size=10)
+    assert len(store) == 35
+    assert store.read() == messages(0, 35)
+    assert store.read(23, 31) == messages(23, 31)
+    store.close()
+
+
+def test_short_segment_in_the_middle(tmp_path):
+    store = ChatLogStore(tmp_path, tail_size=2, segment_size=3)
+    store.extend(messages(0, 9))
+    store.close()
+    # A segment left short (e.g. by a crash) must not shift the positions of later messages
+    path = tmp_path / "segment-000001.jsonl"
+    path.write_text("".join(path.read_text().splitlines(keepends=True)[:1]), encoding="utf-8")
+
+    store = ChatLogStore(tmp_path, tail_size=2, segment_size=3)
+    expected = messages(0, 4) + messages(6, 9)
+    assert len(store) == len(expected)
+    assert store.read() == expected
+    assert store.read(3, 5) == expected[3:5]
+    store.close()
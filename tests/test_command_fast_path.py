@@ -0,0 +1,50 @@
+import pytest
+
+from Backend.CommandFastPath import CommandFastPath, CORPUS, HELD_OUT
+
+
+@pytest.fixture
+def fast_path():
+    return CommandFastPath()
+
+
+@pytest.mark.parametrize("query, expected", CORPUS)
+def test_corpus(fast_path, query, expected):
+    assert fast_path.classify(query) == expected
+
+
+@pytest.mark.parametrize("query, expected", HELD_OUT)
+def test_held_out(fast_path, query, expected):
+    assert fast_path.classify(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "shut down the computer", "quit smoking", "kill time", "exit the conversation",
+    "google is a great company", "launch a rocket", "close your eyes", "play with me",
+    "open source software is great", "open fire", "open sesame", "open wide", "play dead", "play the fool",
+    "play hard to get", "play football", "play cricket", "play chess", "close call", "close all windows",
+])
+def test_look_alikes_never_answer_locally(fast_path, query):
+    commands, confidence = fast_path.match(query)
+    assert commands is None or confidence < fast_path.threshold
+
+
+def test_idiomatic_verbs_still_split_commands(fast_path):
+    # "quit" is below the threshold on its own, but still starts the second command
+    commands, confidence = fast_path.match("open chrome and quit spotify")
+    assert commands == ["open chrome", "close spotify"]
+    assert confidence < fast_path.threshold
+
+
+@pytest.mark.parametrize("query", ["open sesame", "open chrome and sesame", "play dead", "close call"])
+def test_unknown_objects_are_left_to_the_model(fast_path, query):
+    # Parsed, so a multi-command request still splits, but never confident enough to run locally
+    commands, confidence = fast_path.match(query)
+    assert commands is not None
+    assert confidence < fast_path.threshold
+
+
+def test_known_apps_and_sites_answer_locally(fast_path):
+    assert fast_path.match("open the zoom app") == (["open zoom"], 1.0)
+    assert fast_path.match("open wikipedia.org") == (["open wikipedia.org"], 1.0)
+    assert fast_path.match("close spotify")[1] == 1.0
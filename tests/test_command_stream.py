@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+from Backend.CommandStream import StreamCommands
+
+CHUNK_SIZES = [1, 2, 3, 5, 7, 100]
+
+DECISIONS = [
+    ("open chrome, open spotify, general thanks, i really liked it. tell me about the taj mahal",
+     ["open chrome", "open spotify", "general thanks, i really liked it. tell me about the taj mahal"]),
+    ("general what is python, and who made it",
+     ["general what is python, and who made it"]),
+    ("realtime who won today, general tell me a joke, exit",
+     ["realtime who won today", "general tell me a joke", "exit"]),
+    ("content write a poem, about rain, play despacito",
+     ["content write a poem, about rain", "play despacito"]),
+    ("open notepad,\nclose chrome, system volume up",
+     ["open notepad", "close chrome", "system volume up"]),
+    # Nothing generates images: the prompt (commas included) is dropped, the rest still runs
+    ("generate image of a lion, in the rain, open chrome",
+     ["open chrome"]),
+    ("general generate some ideas, generate image of a cat",
+     ["general generate some ideas"]),
+    ("i do not know", []),
+]
+
+
+def events(text, size):
+    for i in range(0, len(text), size):
+        yield SimpleNamespace(event_type="text-generation", text=text[i:i + size])
+    yield SimpleNamespace(event_type="stream-end")
+
+
+@pytest.mark.parametrize("decision,expected", DECISIONS)
+def test_chunking_does_not_change_the_commands(decision, expected):
+    results = {size: list(StreamCommands(events(decision, size))) for size in CHUNK_SIZES}
+    assert results == {size: expected for size in CHUNK_SIZES}
+
+
+def test_immediate_commands_are_yielded_before_the_stream_ends():
+    seen = []
+
+    def stream():
+        for event in events("open chrome, open spotify, general tell me about the taj mahal", 3):
+            seen.append(event)
+            yield event
+
+    commands = StreamCommands(stream())
+    assert next(commands) == "open chrome"
+    # The rest of the decision had not arrived yet
+    assert seen[-1].event_type == "text-generation"
+    assert list(commands) == ["open spotify", "general tell me about the taj mahal"]
@@ -0,0 +1,118 @@
+import threading
+import time
+
+from Backend.ChatLogStore import ChatLogStore
+from Backend.ContextWindow import ContextWindow
+
+SYSTEM = [{"role": "system", "content": "system prompt"}]
+
+
+class SlowSummarizer:
+    """Summarizer that blocks until released, like a slow LLM call"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.calls = []
+
+    def __call__(self, previous, messages):
+        self.calls.append(len(messages))
+        self.started.set()
+        self.release.wait(5)
+        return f"summary of {len(messages)} messages"
+
+
+def window(tmp_path, summarizer, turns=40):
+    store = ChatLogStore(tmp_path / "Chatlog")
+    for i in range(turns):
+        store.extend([{"role": "user", "content": f"question {i} " * 10},
+                      {"role": "assistant", "content": f"answer {i} " * 10}])
+    return ContextWindow(store, budget=600, summary_tokens=100, summary_path=tmp_path / "ChatSummary.json",
+                         summarizer=summarizer)
+
+
+def test_fold_runs_in_the_background(tmp_path):
+    summarizer = SlowSummarizer()
+    context = window(tmp_path, summarizer)
+
+    start = time.perf_counter()
+    prompt = context.build(SYSTEM, "next question")
+    assert time.perf_counter() - start < 0.5
+    # The prompt is within budget even though the summary is not ready yet
+    assert context.last_report["prompt_tokens"] <= 600
+    assert context.last_report["folding"] and context.last_report["summarized_messages"] == 0
+    assert prompt[-1] == {"role": "user", "content": "next question"}
+
+    # Only one fold runs at a time
+    assert summarizer.started.wait(5)
+    context.build(SYSTEM, "another question")
+    assert len(summarizer.calls) == 1
+
+    summarizer.release.set()
+    context.wait()
+    prompt = context.build(SYSTEM, "next question")
+    assert context.last_report["summarized_messages"] > 0
+    assert prompt[1]["content"].endswith("messages")
+    assert (tmp_path / "ChatSummary.json").exists()
+
+
+def test_reset_during_fold_discards_the_summary(tmp_path):
+    summarizer = SlowSummarizer()
+    context = window(tmp_path, summarizer)
+    context.build(SYSTEM, "next question")
+    context.reset()
+    summarizer.release.set()
+    context.wait()
+    context.build(SYSTEM, "next question", fold=False)
+    assert context.last_report["summarized_messages"] == 0
+
+
+class CountingStore:
+    """Records the message ranges a build reads"""
+
+    def __init__(self, store):
+        self.store = store
+        self.reads = []
+
+    def __len__(self):
+        return len(self.store)
+
+    def read(self, start=0, stop=None):
+        self.reads.append((start, stop))
+        return self.store.read(start, stop)
+
+
+def test_build_reads_only_the_tail(tmp_path):
+    summarizer = SlowSummarizer()
+    summarizer.release.set()
+    context = window(tmp_path, summarizer, turns=200)
+    full = context.build(SYSTEM, "next question", fold=False)
+
+    context.store = CountingStore(context.store)
+    assert context.build(SYSTEM, "next question", fold=False) == full
+    # 400 unsummarized messages, but only the chunks reaching back past the budget are read
+    assert min(start for start, _ in context.store.reads) >= 400 - 2 * ContextWindow.READ_CHUNK
+    assert context.last_report["verbatim_messages"] < ContextWindow.READ_CHUNK
+
+
+def test_fold_point_from_the_tail_matches_the_full_history(tmp_path):
+    summarizer = SlowSummarizer()
+    summarizer.release.set()
+    context = window(tmp_path, summarizer, turns=200)
+    context.build(SYSTEM, "next question")
+    context.wait()
+    # Everything but the newest turns was folded, and what is left fits verbatim
+    context.build(SYSTEM, "next question", fold=False)
+    report = context.last_report
+    assert 400 - ContextWindow.READ_CHUNK < report["summarized_messages"] < 400
+    assert report["summarized_messages"] + report["verbatim_messages"] == 400
+
+
+def test_build_without_fold_writes_nothing(tmp_path):
+    summarizer = SlowSummarizer()
+    summarizer.release.set()
+    context = window(tmp_path, summarizer)
+    context.build(SYSTEM, "next question", fold=False)
+    context.wait()
+    assert summarizer.calls == []
+    assert not (tmp_path / "ChatSummary.json").exists()
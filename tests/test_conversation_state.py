@@ -0,0 +1,61 @@
+import threading
+
+from Backend.ChatLogStore import ChatLogStore
+from Backend.ConversationState import ConversationState
+
+
+def state(tmp_path, **kwargs):
+    kwargs.setdefault("flush_interval", 0.05)
+    return ConversationState(ChatLogStore(tmp_path / "Chatlog"), tail_size=8, **kwargs)
+
+
+def test_turns_reach_disk_in_the_background(tmp_path):
+    conversation = state(tmp_path)
+    conversation.append_turn("hello", "hi there")
+    # Readable at once from memory, before any write
+    assert [m["content"] for m in conversation.read()] == ["hello", "hi there"]
+    assert conversation.flush()
+    conversation.close()
+
+    reopened = ChatLogStore(tmp_path / "Chatlog")
+    assert [m["content"] for m in reopened.read()] == ["hello", "hi there"]
+
+
+def test_reads_beyond_the_tail_come_from_disk(tmp_path):
+    conversation = state(tmp_path)
+    for i in range(20):
+        conversation.append_turn(f"question {i}", f"answer {i}")
+    assert len(conversation) == 40
+    assert conversation.read(0, 2) == [{"role": "user", "content": "question 0"},
+                                       {"role": "assistant", "content": "answer 0"}]
+    assert conversation.read(38)[-1]["content"] == "answer 19"
+    conversation.close()
+
+
+def test_concurrent_turns_never_interleave(tmp_path):
+    conversation = state(tmp_path, batch_size=4)
+
+    def writer(name):
+        for i in range(50):
+            conversation.append_turn(f"{name} {i}", f"{name} {i}")
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    conversation.close()
+
+    messages = ChatLogStore(tmp_path / "Chatlog").read()
+    assert len(messages) == 400
+    # Every user message is directly followed by its own answer
+    for question, answer in zip(messages[::2], messages[1::2]):
+        assert question["role"] == "user" and answer["role"] == "assistant"
+        assert question["content"] == answer["content"]
+
+
+def test_without_a_writer_thread_turns_are_written_as_they_come(tmp_path):
+    conversation = state(tmp_path, background=False)
+    conversation.append_turn("hello", "hi there")
+    assert len(ChatLogStore(tmp_path / "Chatlog")) == 2
+    conversation.close()
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from Backend.AsyncRuntime import AsyncRuntime
+from Backend.EventBus import EventBus, FileMirror, MicEvent, ResponseEvent, StatusEvent
+
+
+def test_subscribers_get_only_their_event_type():
+    bus = EventBus()
+    statuses, responses = [], []
+    bus.subscribe(StatusEvent, statuses.append)
+    unsubscribe = bus.subscribe(ResponseEvent, responses.append)
+
+    bus.publish(StatusEvent("Listening..."))
+    bus.publish(ResponseEvent("JARVIS: hello"))
+    unsubscribe()
+    bus.publish(ResponseEvent("JARVIS: not delivered"))
+
+    assert [event.status for event in statuses] == ["Listening..."]
+    assert [event.text for event in responses] == ["JARVIS: hello"]
+
+
+def test_last_event_is_kept_without_subscribers():
+    bus = EventBus()
+    assert bus.last(StatusEvent) is None
+    bus.publish(StatusEvent("Thinking..."))
+    bus.publish(StatusEvent("Answering..."))
+    assert bus.last(StatusEvent).status == "Answering..."
+
+
+def test_a_failing_handler_does_not_stop_the_others():
+    bus = EventBus()
+    received = []
+    bus.subscribe(MicEvent, lambda event: 1 / 0)
+    bus.subscribe(MicEvent, received.append)
+    bus.publish(MicEvent(True))
+    assert len(received) == 1
+
+
+def test_queues_receive_events_from_other_threads():
+    bus = EventBus()
+    events = bus.queue(MicEvent, StatusEvent)
+    thread = threading.Thread(target=lambda: [bus.publish(MicEvent(i % 2 == 0)) for i in range(100)])
+    thread.start()
+    thread.join(5)
+    assert events.qsize() == 100
+    assert events.get_nowait().active is True
+
+
+def test_file_mirror_writes_the_legacy_files(tmp_path):
+    bus = EventBus()
+    mirror = FileMirror(bus, tmp_path)
+    bus.publish(StatusEvent("Listening..."))
+    bus.publish(MicEvent(False))
+    assert (tmp_path / "Status.data").read_text(encoding="utf-8") == "Listening..."
+    assert (tmp_path / "Mic.data").read_text(encoding="utf-8") == "False"
+
+    mirror.close()
+    bus.publish(StatusEvent("Thinking..."))
+    assert (tmp_path / "Status.data").read_text(encoding="utf-8") == "Listening..."
+
+
+def test_a_mic_click_wakes_a_waiting_coroutine_at_once():
+    bus = EventBus()
+    runtime = AsyncRuntime()
+    clicks = runtime.queue(bus, MicEvent)
+
+    async def wait_for_click():
+        event = await clicks.get()
+        return event.active, time.perf_counter()
+
+    waiter = runtime.submit(wait_for_click())
+    time.sleep(0.1)
+    clicked = time.perf_counter()
+    bus.publish(MicEvent(True))
+    active, woke = waiter.result(2)
+    # Woken by the event itself, not by the next tick of a polling loop
+    assert active is True
+    assert woke - clicked < 0.05
+    runtime.loop.call_soon_threadsafe(runtime.loop.stop)
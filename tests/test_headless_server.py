@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+
+from Backend.HeadlessServer import HeadlessServer
+from Backend.SpeechStream import speech_output
+
+
+async def request(port, method, path, body=b"", headers=None):
+    """(status, headers, body) of one HTTP/1.1 request"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"{method} {path} HTTP/1.1", "Host: test", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    data = await reader.read()
+    writer.close()
+    head, _, payload = data.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, head.decode("latin-1").lower(), payload
+
+
+def ndjson(payload):
+    """Messages of a chunked NDJSON response"""
+    lines = payload.split(b"\r\n")
+    return [json.loads(line) for line in lines[1::2] if line.strip().startswith(b"{")]
+
+
+def serve(handler, **kwargs):
+    """Run test(server) against a HeadlessServer on a free port"""
+    def run(test):
+        async def main():
+            server = await HeadlessServer(handler, port=0, **kwargs).start()
+            try:
+                return await test(server)
+            finally:
+                await server.close()
+        return asyncio.run(main())
+    return run
+
+
+def test_answers_stream_back_with_the_session_the_client_named():
+    seen = []
+
+    async def brain(text, session=None):
+        seen.append(session)
+        speech_output.get()(f"echo {text}", 1)
+        return f"done {text}"
+
+    async def test(server):
+        plain = await request(server.port, "POST", "/command", b"hello", {"X-Session-Id": "alice"})
+        body = json.dumps({"text": "hi", "session": "bob"}).encode()
+        as_json = await request(server.port, "POST", "/command", body, {"Content-Type": "application/json"})
+        anonymous = await request(server.port, "POST", "/command", b"hey")
+        return plain, as_json, anonymous
+
+    plain, as_json, anonymous = serve(brain)(test)
+    assert seen == ["alice", "bob", None]
+    assert plain[0] == 200
+    messages = ndjson(plain[2])
+    assert messages[0] == {"type": "token", "answer": 1, "text": "echo hello"}
+    assert messages[-1] == {"type": "done", "results": [{"result": "done hello"}]}
+    assert ndjson(as_json[2])[-1]["results"] == [{"result": "done hi"}]
+    assert anonymous[0] == 200
+
+
+@pytest.mark.parametrize("headers, body", [
+    ({"X-Session-Id": ".."}, b"hello"),
+    ({"X-Session-Id": "default"}, b"hello"),
+    ({"Content-Type": "application/json"}, json.dumps({"text": "hi", "session": "../x"}).encode()),
+])
+def test_bad_session_ids_are_refused_before_the_brain_runs(headers, body):
+    seen = []
+
+    async def brain(text, session=None):
+        seen.append(session)
+
+    status, _, payload = serve(brain)(lambda server: request(server.port, "POST", "/command", body, headers))
+    assert status == 400
+    assert "session" in json.loads(payload)["error"]
+    assert seen == []
+
+
+def test_full_waiting_line_answers_503():
+    release = asyncio.Event()
+
+    async def brain(text, session=None):
+        await release.wait()
+        return "late"
+
+    async def test(server):
+        first = asyncio.create_task(request(server.port, "POST", "/command", b"slow"))
+        while server.stats["in_flight"] < 1:
+            await asyncio.sleep(0.01)
+        refused = await request(server.port, "POST", "/command", b"one more")
+        release.set()
+        return refused, await first, server.health()
+
+    refused, first, health = serve(brain, max_concurrent=1, max_waiting=0)(test)
+    assert refused[0] == 503
+    assert "retry-after: 1" in refused[1]
+    assert json.loads(refused[2]) == {"error": "busy"}
+    assert first[0] == 200 and ndjson(first[2])[-1]["type"] == "done"
+    assert health["rejected"] == 1 and health["served"] == 1
+
+
+def test_profile_is_off_without_a_token():
+    async def test(server):
+        return await request(server.port, "POST", "/profile", b'{"seconds": 30}')
+
+    status, _, _ = serve(lambda text, session=None: None, profile_token="")(test)
+    assert status == 403
+
+
+def test_profile_needs_the_token():
+    async def test(server):
+        missing = await request(server.port, "GET", "/profile")
+        wrong = await request(server.port, "GET", "/profile", headers={"Authorization": "Bearer nope"})
+        right = await request(server.port, "GET", "/profile", headers={"Authorization": "Bearer s3cret"})
+        return missing, wrong, right
+
+    missing, wrong, right = serve(lambda text, session=None: None, profile_token="s3cret")(test)
+    assert missing[0] == wrong[0] == 401
+    assert right[0] == 200
+    assert json.loads(right[2])["running"] is False
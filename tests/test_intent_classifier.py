@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from Backend.IntentClassifier import IntentClassifier, LoadOrTrain, SEED_EXAMPLES
+
+EXAMPLES = SEED_EXAMPLES * 5
+
+
+@pytest.fixture
+def classifier():
+    return IntentClassifier(threshold=0.5, min_examples=0).fit(EXAMPLES)
+
+
+def test_confident_general_and_realtime_answer_locally(classifier):
+    assert classifier.classify("what is machine learning") == ["general what is machine learning"]
+    assert classifier.classify("latest news about india") == ["realtime latest news about india"]
+
+
+def test_exit_is_never_answered_locally(classifier):
+    label, probability = classifier.predict("goodbye")
+    assert label == "exit" and probability >= classifier.threshold
+    assert classifier.classify("goodbye") is None
+
+
+@pytest.mark.parametrize("query", ["open chrome", "set a reminder at 9pm for my meeting", "write a poem about rain"])
+def test_other_intents_go_to_the_remote_model(classifier, query):
+    assert classifier.classify(query) is None
+
+
+def test_multi_intent_queries_go_to_the_remote_model(classifier):
+    assert classifier.classify("what is machine learning and open chrome") is None
+
+
+def test_low_confidence_goes_to_the_remote_model():
+    strict = IntentClassifier(threshold=1.0, min_examples=0).fit(EXAMPLES)
+    assert strict.classify("what is machine learning") is None
+
+
+def test_too_few_examples_defer_everything():
+    untrusted = IntentClassifier(threshold=0.5, min_examples=len(EXAMPLES) + 1).fit(EXAMPLES)
+    assert not untrusted.ready
+    assert untrusted.classify("what is machine learning") is None
+
+
+def test_model_is_prepared_on_first_use_not_on_construction(tmp_path):
+    calls = []
+    release = threading.Event()
+
+    def loader(classifier):
+        calls.append(classifier)
+        release.wait(5)
+        classifier.fit(EXAMPLES)
+
+    lazy = IntentClassifier(threshold=0.5, min_examples=0, loader=loader)
+    assert calls == []
+    # The first queries go to the remote model while the model trains in the background
+    assert lazy.classify("what is machine learning") is None
+    assert lazy.classify("what is machine learning") is None
+    release.set()
+    lazy._preparer.join(5)
+    assert calls == [lazy]
+    assert lazy.classify("what is machine learning") == ["general what is machine learning"]
+
+
+def test_load_or_train_saves_and_reloads(tmp_path):
+    path, decisions = tmp_path / "IntentModel.npz", tmp_path / "DMMDecisions.jsonl"
+    trained = IntentClassifier()
+    LoadOrTrain(trained, path, decisions)
+    assert path.exists() and trained.trained_on > 0
+
+    loaded = IntentClassifier()
+    LoadOrTrain(loaded, path, decisions)
+    assert loaded.classes == trained.classes and loaded.trained_on == trained.trained_on
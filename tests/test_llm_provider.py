@@ -0,0 +1,118 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from Backend.LLMProvider import LLMClient, StreamChunk
+from Backend.MockLLMServer import MockLLMServer
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer("a mock answer", first_token_delay=0.2, token_delay=0.0) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    return LLMClient(provider="openai", api_key="mock", base_url=server.base_url)
+
+
+async def collect(client, **kwargs):
+    return "".join([chunk.content or "" async for chunk in client.acreate_completion("mock", MESSAGES, **kwargs)])
+
+
+def test_async_stream_matches_the_sync_stream(client):
+    sync_text = "".join(chunk.content or "" for chunk in client.create_completion("mock", MESSAGES))
+    assert asyncio.run(collect(client)) == sync_text == "a mock answer "
+    # The usage chunk at the end of the stream is recorded on both paths
+    assert client.prompt_cache_report()["calls"] == 2
+
+
+def test_async_requests_share_one_loop_concurrently(server, client):
+    async def many():
+        return await asyncio.gather(*(collect(client) for _ in range(8)))
+
+    start = time.perf_counter()
+    answers = asyncio.run(many())
+    # Eight 0.2 s requests overlap instead of taking 1.6 s back to back
+    assert answers == ["a mock answer "] * 8
+    assert time.perf_counter() - start < 8 * 0.2 / 2
+    assert server.requests == 8
+
+
+def test_async_deadline_raises_timeout(client):
+    with pytest.raises(TimeoutError):
+        asyncio.run(collect(client, deadline=0.05))
+
+
+def test_cancelling_the_consumer_stops_the_stream(client):
+    async def cancelled():
+        task = asyncio.ensure_future(collect(client))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The pooled client is still usable afterwards
+        return await collect(client)
+
+    assert asyncio.run(cancelled()) == "a mock answer "
+
+
+class FakeStream:
+    """SDK stream stand-in: iterates the given events and records close()"""
+
+    def __init__(self, events):
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def close(self):
+        self.closed = True
+
+
+def openai_chunk(content=None, finish_reason=None, usage=None):
+    choices = [] if content is None and finish_reason is None else \
+        [SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def test_every_adapter_yields_the_same_chunk_type():
+    client = LLMClient(provider="openai", api_key="mock", base_url="http://127.0.0.1:9/v1")
+    usage = {"prompt_tokens": 10, "prompt_tokens_details": {"cached_tokens": 4}}
+    streams = {
+        "openai": (client._convert_openai_stream, [openai_chunk("Hello "), openai_chunk("world", "stop"),
+                                                   openai_chunk(usage=usage)]),
+        "anthropic": (client._convert_anthropic_stream, [
+            SimpleNamespace(type="message_start", message=SimpleNamespace(usage={"input_tokens": 10})),
+            SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(text="Hello ")),
+            SimpleNamespace(type="ping"),
+            SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(text="world"))]),
+        "cohere": (client._convert_cohere_stream, [
+            SimpleNamespace(event_type="stream-start"),
+            SimpleNamespace(event_type="text-generation", text="Hello "),
+            SimpleNamespace(event_type="text-generation", text="world"),
+            SimpleNamespace(event_type="stream-end")]),
+    }
+    for name, (convert, events) in streams.items():
+        chunks = list(convert(FakeStream(events)))
+        assert all(type(chunk) is StreamChunk for chunk in chunks), name
+        assert "".join(chunk.choices[0].delta.content or "" for chunk in chunks) == "Hello world", name
+    # Slotted: no per-chunk __dict__
+    with pytest.raises(AttributeError):
+        StreamChunk("x").extra = 1
+    assert client.prompt_cache_report()["cached_tokens"] == 4
+
+
+def test_stopping_early_closes_the_sdk_stream():
+    client = LLMClient(provider="openai", api_key="mock", base_url="http://127.0.0.1:9/v1")
+    stream = FakeStream([openai_chunk("Hello "), openai_chunk("world")])
+    chunks = client._convert_openai_stream(stream)
+    next(chunks)
+    chunks.close()
+    assert stream.closed
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from Backend.LLMRouter import HedgedLLMClient, ProviderStats
+from Backend.MockLLMServer import FakeLLMClient
+
+
+def answer(router):
+    return "".join(chunk.choices[0].delta.content or "" for chunk in router.create_completion("mock", []))
+
+
+def test_unmeasured_providers_rank_after_measured_ones():
+    router = HedgedLLMClient({
+        "slow": FakeLLMClient("slow answer", first_token_delay=0.6),
+        "fast": FakeLLMClient("fast answer", first_token_delay=0.05),
+        "broken": FakeLLMClient("never", fail=True),
+    }, hedge_delay=0.1)
+    # Before anything is measured the configured order holds
+    assert router.ranked() == ["slow", "fast", "broken"]
+
+    assert answer(router) == "fast answer "
+    # The never-measured broken provider must not become primary after one turn
+    assert router.ranked()[0] == "fast"
+    assert router.ranked()[-1] == "broken"
+    assert answer(router) == "fast answer "
+    assert router.clients["broken"].calls == 0
+
+
+def test_a_cancelled_loser_never_looks_faster():
+    stats = ProviderStats("loser", 0)
+    stats.record_lower_bound(0.3)
+    # Still unmeasured: a lower bound is not a latency
+    assert stats.first_token is None
+
+    stats.record_first_token(1.0)
+    stats.record_lower_bound(0.3)
+    assert stats.first_token == 1.0
+    stats.record_lower_bound(2.0)
+    assert stats.first_token > 1.0
+
+
+def test_hedged_loser_keeps_its_average():
+    slow = FakeLLMClient("slow answer", first_token_delay=0.5)
+    router = HedgedLLMClient({"slow": slow, "fast": FakeLLMClient("fast answer", first_token_delay=0.05)},
+                             hedge_delay=0.1)
+    router.stats["slow"].record_first_token(0.5)
+    assert answer(router) == "fast answer "
+    # slow was cancelled after ~0.15s; that must not pull its 0.5s average down
+    assert router.stats["slow"].first_token == 0.5
+
+
+async def aanswer(router):
+    return "".join([chunk.choices[0].delta.content or "" async for chunk in router.acreate_completion("mock", [])])
+
+
+def test_a_failing_primary_fails_over_without_waiting_for_the_hedge():
+    router = HedgedLLMClient({"broken": FakeLLMClient("never", first_token_delay=0.0, fail=True),
+                              "backup": FakeLLMClient("backup answer", first_token_delay=0.0)}, hedge_delay=5.0)
+    assert answer(router) == "backup answer "
+    assert router.stats["broken"].failures == 1
+    # The failed provider is ranked last until its backoff expires
+    assert router.ranked() == ["backup", "broken"]
+
+
+def test_all_providers_failing_raises_the_last_error():
+    router = HedgedLLMClient({"a": FakeLLMClient(fail=True, first_token_delay=0.0),
+                              "b": FakeLLMClient(fail=True, first_token_delay=0.0, provider="b")}, hedge_delay=0.05)
+    with pytest.raises(ConnectionError, match="b is unavailable"):
+        answer(router)
+
+
+def test_async_hedge_picks_the_faster_provider():
+    slow = FakeLLMClient("slow answer", first_token_delay=0.6)
+    router = HedgedLLMClient({"slow": slow, "fast": FakeLLMClient("fast answer", first_token_delay=0.05)},
+                             hedge_delay=0.1)
+    assert asyncio.run(aanswer(router)) == "fast answer "
+    assert router.stats["fast"].wins == 1 and router.stats["slow"].wins == 0
+    # The loser only leaves a lower bound, so it stays unmeasured
+    assert router.stats["slow"].first_token is None
+    assert router.ranked()[0] == "fast"
+
+
+def test_async_failover_and_total_failure():
+    router = HedgedLLMClient({"broken": FakeLLMClient("never", first_token_delay=0.0, fail=True),
+                              "backup": FakeLLMClient("backup answer", first_token_delay=0.0)}, hedge_delay=5.0)
+    assert asyncio.run(aanswer(router)) == "backup answer "
+    assert router.stats["broken"].failures == 1
+
+    router = HedgedLLMClient({"a": FakeLLMClient(fail=True, first_token_delay=0.0)}, hedge_delay=0.05)
+    with pytest.raises(ConnectionError):
+        asyncio.run(aanswer(router))
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Backend import LLMProvider
+from Backend.LLMProvider import LLMClient
+
+MODEL = "tiny.gguf"
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+class FakeLlama:
+    """llama_cpp.Llama stand-in: streams words with a per-token delay"""
+
+    def __init__(self, words=("a", "local", "answer"), delay=0.0):
+        self.words = words
+        self.delay = delay
+        self.generated = 0
+
+    def create_chat_completion(self, messages, stream=False, **kwargs):
+        if not stream:
+            return {"choices": [{"message": {"content": " ".join(self.words)}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 5, "completion_tokens": len(self.words)}}
+
+        def chunks():
+            for word in self.words:
+                time.sleep(self.delay)
+                self.generated += 1
+                yield {"choices": [{"delta": {"content": word + " "}, "finish_reason": None}]}
+        return chunks()
+
+
+@pytest.fixture
+def local(monkeypatch):
+    def make(model):
+        # A resident model is reused, never loaded again
+        monkeypatch.setitem(LLMProvider._local_models, MODEL, (model, threading.Lock()))
+        client = LLMClient(provider="local")
+        client.base_url, client.client = None, model
+        return client
+    return make
+
+
+def test_sync_stream_and_single_response(local):
+    client = local(FakeLlama())
+    assert "".join(chunk.content for chunk in client.create_completion(MODEL, MESSAGES)) == "a local answer "
+    [chunk] = client.create_completion(MODEL, MESSAGES, stream=False)
+    assert chunk.content == "a local answer"
+    assert client.prompt_cache_report()["prompt_tokens"] == 5
+
+
+def test_one_generation_at_a_time_per_model(local):
+    client = local(FakeLlama(delay=0.05))
+    first = client.create_completion(MODEL, MESSAGES)
+    next(first)
+    started = threading.Event()
+    done = []
+
+    def second():
+        started.set()
+        done.append("".join(chunk.content for chunk in client.create_completion(MODEL, MESSAGES)))
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    started.wait(2)
+    time.sleep(0.1)
+    # The second stream waits for the model until the first one is closed
+    assert done == []
+    first.close()
+    thread.join(5)
+    assert done == ["a local answer "]
+
+
+def test_async_generation_keeps_the_loop_running(local):
+    client = local(FakeLlama(words=("word",) * 10, delay=0.02))
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        tick = asyncio.ensure_future(ticker())
+        text = "".join([chunk.content async for chunk in client.acreate_completion(MODEL, MESSAGES)])
+        tick.cancel()
+        return text
+
+    assert asyncio.run(run()) == "word " * 10
+    # The CPU-bound generation ran on a worker thread while the loop kept ticking
+    assert len(ticks) >= 10
+
+
+def test_cancelling_the_consumer_stops_generation(local):
+    model = FakeLlama(words=("word",) * 100, delay=0.01)
+    client = local(model)
+
+    async def run():
+        async for chunk in client.acreate_completion(MODEL, MESSAGES):
+            break
+
+    asyncio.run(run())
+    time.sleep(0.1)
+    assert model.generated < 100
@@ -0,0 +1,110 @@
+import json
+
+from Backend.ModelHealth import ModelHealth
+
+CANDIDATES = ["preferred", "backup", "fallback"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def registry(tmp_path, clock, **kwargs):
+    return ModelHealth(tmp_path / "ModelHealth.json", backoff=60, clock=clock, **kwargs)
+
+
+def test_healthy_models_keep_the_preference_order(tmp_path):
+    clock = Clock()
+    health = registry(tmp_path, clock)
+    assert health.order(CANDIDATES) == CANDIDATES
+
+    health.record_success("fallback", 0.2)
+    health.record_success("backup", 0.9)
+    # A faster, lower-preference model never overtakes the configured first choice
+    assert health.order(CANDIDATES) == CANDIDATES
+    health.record_success("preferred", 2.5)
+    assert health.order(CANDIDATES) == CANDIDATES
+
+
+def test_a_failed_model_gives_way_until_it_recovers(tmp_path):
+    clock = Clock()
+    health = registry(tmp_path, clock)
+    health.record_success("fallback", 0.2)
+    health.record_failure("preferred", "removed")
+    assert health.order(CANDIDATES) == ["backup", "fallback"]
+
+    clock.now += 61
+    health.probe(CANDIDATES, lambda model: None)
+    assert health.order(CANDIDATES) == CANDIDATES
+
+
+def test_expired_backoff_waits_for_a_background_probe(tmp_path):
+    clock = Clock()
+    health = registry(tmp_path, clock)
+    health.record_success("backup", 0.3)
+    health.record_failure("preferred", "removed")
+    assert health.order(CANDIDATES) == ["backup", "fallback"]
+
+    clock.now += 3600
+    # The backoff expired, but user requests still skip the model; the prober retries it
+    assert health.order(CANDIDATES) == ["backup", "fallback"]
+    assert not health.healthy("preferred")
+    assert health.due(CANDIDATES) == ["preferred"]
+
+    probed = []
+    health.probe(CANDIDATES, probed.append)
+    assert probed == ["preferred"]
+    assert health.healthy("preferred")
+    assert "preferred" in health.order(CANDIDATES)
+
+
+def test_a_failed_probe_doubles_the_backoff(tmp_path):
+    clock = Clock()
+    health = registry(tmp_path, clock)
+    health.record_failure("preferred", "removed")
+    clock.now += 61
+
+    def probe(model):
+        raise ValueError("still removed")
+
+    health.probe(CANDIDATES, probe)
+    record = health.report()["preferred"]
+    assert record["consecutive_failures"] == 2
+    assert record["retry_at"] == clock.now + 120
+    assert "preferred" not in health.order(CANDIDATES)
+
+
+def test_every_model_failed_still_returns_all(tmp_path):
+    clock = Clock()
+    health = registry(tmp_path, clock)
+    for model in reversed(CANDIDATES):
+        health.record_failure(model, "down")
+        clock.now += 1
+    assert health.order(CANDIDATES) == ["fallback", "backup", "preferred"]
+
+
+def test_routine_successes_are_not_written_every_call(tmp_path):
+    clock = Clock()
+    health = registry(tmp_path, clock, save_interval=60)
+    path = tmp_path / "ModelHealth.json"
+
+    health.record_success("backup", 0.3)
+    # The first success changes the order, so it is written at once
+    assert json.loads(path.read_text())["backup"]["successes"] == 1
+
+    for _ in range(10):
+        clock.now += 1
+        health.record_success("backup", 0.3)
+    assert json.loads(path.read_text())["backup"]["successes"] == 1
+
+    clock.now += 60
+    health.record_success("backup", 0.3)
+    assert json.loads(path.read_text())["backup"]["successes"] == 12
+
+    health.record_success("backup", 0.3)
+    health.flush()
+    assert json.loads(path.read_text())["backup"]["successes"] == 13
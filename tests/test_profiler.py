@@ -0,0 +1,59 @@
+import threading
+from collections import Counter
+
+from Backend.Profiler import HotFunctions, LoadCollapsed, Profiler, _thread_name
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_a_capture_writes_collapsed_stacks_of_busy_threads(tmp_path):
+    profiler = Profiler(tmp_path, hz=199)
+    stop = threading.Event()
+    worker = threading.Thread(target=busy, args=(stop,), name="Worker_1")
+    worker.start()
+    try:
+        profiler.start(seconds=0.3)
+        path = profiler.stop()
+    finally:
+        stop.set()
+        worker.join(5)
+
+    assert path is not None and path.suffix == ".collapsed"
+    stacks = LoadCollapsed(path)
+    # Pool suffixes are merged and the busy function is on the worker's stacks
+    assert any(stack.startswith("Worker;") and "busy (" in stack for stack in stacks)
+    assert not profiler.running
+
+
+def test_a_capture_of_n_utterances_ends_after_the_last_one(tmp_path):
+    profiler = Profiler(tmp_path, hz=199, idle=True)
+    profiler.start(utterances=2)
+    profiler.utterance_done()
+    assert profiler.running
+    profiler.utterance_done()
+    profiler._thread.join(5)
+    assert not profiler.running
+    assert profiler.last_file is not None
+
+
+def test_old_captures_are_pruned(tmp_path):
+    profiler = Profiler(tmp_path, hz=199, keep=2, idle=True)
+    for i in range(4):
+        (tmp_path / f"old-{i}.collapsed").write_text("main;f 1\n", encoding="utf-8")
+    profiler.start(seconds=0.05)
+    profiler.stop()
+    assert len(list(tmp_path.glob("*.collapsed"))) == 2
+
+
+def test_hot_functions_count_self_and_total_samples():
+    stacks = Counter({"Main;a;b": 3, "Main;a": 1, "Worker;c;b": 2})
+    assert HotFunctions(stacks)[0] == ("b", 5, 5)
+    assert ("a", 1, 4) in HotFunctions(stacks)
+
+
+def test_thread_names_merge_pools():
+    assert _thread_name("HeadlessServer_3") == "HeadlessServer"
+    assert _thread_name("Thread-12 (worker)") == "Thread_(worker)"
@@ -0,0 +1,63 @@
+import pytest
+
+from Backend.ChatLogStore import ChatLogStore
+from Backend.ContextWindow import ContextWindow
+from Backend.LLMProvider import LLMClient, PromptCacheUsage
+from Backend.MockLLMServer import MockLLMServer
+
+SYSTEM = [{"role": "system", "content": "static prompt"}]
+
+
+@pytest.mark.parametrize("usage, expected", [
+    ({"prompt_tokens": 100, "prompt_tokens_details": {"cached_tokens": 64}}, (100, 64)),
+    ({"prompt_tokens": 100, "prompt_tokens_details": None}, (100, 0)),
+    # Anthropic counts cache reads and writes apart from the uncached input
+    ({"input_tokens": 10, "cache_read_input_tokens": 80, "cache_creation_input_tokens": 10}, (100, 80)),
+])
+def test_usage_is_normalized_across_providers(usage, expected):
+    report = PromptCacheUsage(usage)
+    assert (report["prompt_tokens"], report["cached_tokens"]) == expected
+    assert report["uncached_tokens"] == expected[0] - expected[1]
+
+
+def test_usage_without_prompt_tokens_is_ignored():
+    assert PromptCacheUsage(None) is None
+    assert PromptCacheUsage({"completion_tokens": 5}) is None
+
+
+def test_per_request_system_messages_move_after_the_cached_history():
+    system, conversation = LLMClient._anthropic_prompt(SYSTEM + [
+        {"role": "user", "content": "first question"},
+        {"role": "assistant", "content": "first answer"},
+        {"role": "system", "content": "Time: 10:42"},
+        {"role": "user", "content": "second question"},
+    ])
+    assert system == [{"type": "text", "text": "static prompt", "cache_control": {"type": "ephemeral"}}]
+    # The time joins the final user turn; the breakpoint closes the history before it
+    assert [block["text"] for block in conversation[-1]["content"]] == ["Time: 10:42", "second question"]
+    assert conversation[-2]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in conversation[-1]["content"][-1]
+
+
+def test_prompt_prefix_stays_identical_between_turns(tmp_path):
+    store = ChatLogStore(tmp_path / "Chatlog")
+    store.extend([{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}])
+    window = ContextWindow(store, budget=3000, summary_path=tmp_path / "ChatSummary.json",
+                           summarizer=lambda previous, messages: "summary")
+    first = window.build(SYSTEM, "what time is it", extra_system=[{"role": "system", "content": "Time: 10:42"}])
+    second = window.build(SYSTEM, "and now", extra_system=[{"role": "system", "content": "Time: 10:43"}])
+    # Only what follows the history changes: the per-request data and the query
+    assert first[:-2] == second[:-2] == SYSTEM + store.read()
+
+
+def test_mock_server_reports_cached_prefix_tokens():
+    system = [{"role": "system", "content": " ".join(f"word{i}" for i in range(300))}]
+    with MockLLMServer("ok", first_token_delay=0.0, token_delay=0.0, min_cache_tokens=128, cache_block=64) as server:
+        client = LLMClient(provider="openai", api_key="mock", base_url=server.base_url)
+        for query in ("first", "second"):
+            for _ in client.create_completion("mock", system + [{"role": "user", "content": query}]):
+                pass
+    report = client.prompt_cache_report()
+    assert report["calls"] == 2
+    # The second prompt shares the 301-token system prefix: whole 64-token blocks of it are cached
+    assert report["last"]["cached_tokens"] == 256
@@ -0,0 +1,61 @@
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from Backend.ReplayLoadTest import CompareReports
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The harness fakes every outside service, but the brain still needs the real libraries it parses with
+needs_backend = pytest.mark.skipif(any(importlib.util.find_spec(name) is None for name in ("bs4", "rich")),
+                                   reason="backend requirements are not installed")
+
+
+def report(p95_ms=100.0, rate=2.0, failed=0):
+    stage = {"p50_ms": p95_ms / 2, "p95_ms": p95_ms, "p99_ms": p95_ms}
+    return {"stages": {"command": stage}, "utterances_per_second": rate, "failed": failed}
+
+
+def test_compare_reports_flags_slower_stages_throughput_and_failures():
+    baseline = report()
+    assert CompareReports(report(p95_ms=110.0), baseline) == []
+    assert any(line.startswith("command p95_ms") for line in CompareReports(report(p95_ms=200.0), baseline))
+    assert CompareReports(report(rate=1.0), baseline)[0].startswith("utterances_per_second")
+    assert CompareReports(report(failed=1), baseline) == ["failed: 1 > 0"]
+
+
+def replay(tmp_path, setup=""):
+    """Run the replay CLI in a fresh interpreter (install() patches sys.modules for good)"""
+    script = ("import sys\n"
+              f"sys.path.insert(0, {str(ROOT)!r})\n"
+              "from Backend import ReplayLoadTest\n"
+              f"{setup}\n"
+              "sys.exit(ReplayLoadTest.main(['--time-scale', '0.01', '--concurrency', '2']))\n")
+    return subprocess.run([sys.executable, "-c", script], cwd=tmp_path, capture_output=True, text=True, timeout=300)
+
+
+def printed_report(result) -> dict:
+    # Provider warnings printed on import come before the report
+    return json.loads(result.stdout[result.stdout.index("{\n"):])
+
+
+@needs_backend
+def test_a_clean_replay_exits_zero(tmp_path):
+    result = replay(tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert printed_report(result)["failed"] == 0
+
+
+@needs_backend
+def test_a_failing_sub_task_exits_one(tmp_path):
+    setup = ("def broken(self, *args, **kwargs):\n"
+             "    raise RuntimeError('automation is down')\n"
+             "ReplayLoadTest.ReplayHarness._automation = broken")
+    result = replay(tmp_path, setup)
+    assert result.returncode == 1
+    assert printed_report(result)["failed"] > 0
+    assert "utterances failed" in result.stderr
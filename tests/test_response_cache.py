@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from Backend.ResponseCache import ResponseCache, NormalizeQuery, SameOrder
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(tmp_path / "cache.json", threshold=0.82)
+
+
+@pytest.mark.parametrize("query", [
+    "what is python",
+    "What's python?",
+    "what's python programming language?",
+    "tell me about python",
+    "Jarvis, what is Python programming language",
+])
+def test_paraphrases_hit(cache, query):
+    cache.put("what is python", "Python is a programming language.")
+    assert cache.get(query) == "Python is a programming language."
+
+
+@pytest.mark.parametrize("cached, query", [
+    ("what is java", "who is java"),
+    ("who is java", "what is java"),
+    ("what is java", "where is java"),
+    ("what is python", "how does python work"),
+    ("what is python", "what is python snake"),
+    ("what is the best programming language", "what is best"),
+    ("what is rust programming language", "what is the best programming language"),
+    ("is python faster than java", "is java faster than python"),
+    ("is python faster than java?", "Is Java faster than Python?"),
+    ("does a cat chase a dog", "does a dog chase a cat"),
+    ("how to convert celsius to fahrenheit", "how to convert fahrenheit to celsius"),
+])
+def test_other_questions_miss(cache, cached, query):
+    cache.put(cached, "cached answer")
+    assert cache.get(query) is None
+
+
+def test_question_words_stay_in_the_key():
+    assert NormalizeQuery("who is java") != NormalizeQuery("what is java")
+    assert NormalizeQuery("what is the best programming language") != NormalizeQuery("what is best")
+
+
+def test_old_keys_are_renormalized_on_load(tmp_path):
+    # Saved by a version that stripped "who": its key collided with "what is java"
+    path = tmp_path / "cache.json"
+    path.write_text(json.dumps([{"query": "who is java", "normalized": "java", "answer": "A person named Java.",
+                                 "created": 1e12, "last_used": 1e12, "hits": 0}]))
+    cache = ResponseCache(path, clock=lambda: 1e12 + 1)
+    assert cache.get("what is java") is None
+    assert cache.get("who is java") == "A person named Java."
+
+
+def test_time_sensitive_queries_bypass(cache):
+    cache.put("what is the weather today", "Sunny.")
+    assert cache.get("what is the weather today") is None
+    assert cache.stats["bypassed"] == 1
+
+
+def test_word_order_is_part_of_the_key():
+    assert SameOrder("python faster than java", "python faster java")
+    assert not SameOrder("python faster than java", "java faster than python")
+
+
+def test_reordered_paraphrase_of_the_same_question_still_hits(cache):
+    cache.put("is python faster than java", "Usually, yes.")
+    assert cache.get("tell me, is python faster than java?") == "Usually, yes."
+
+
+@pytest.mark.parametrize("query", [
+    "tell me a joke", "write a poem about the rain", "tell me a story", "give me an idea for dinner",
+    "suggest a movie", "tell me something interesting", "make up a riddle",
+])
+def test_creative_requests_are_never_cached(cache, query):
+    cache.put(query, "the one answer")
+    assert cache.get(query) is None
+    assert cache.stats["bypassed"] == 1
+    assert cache.report()["entries"] == 0
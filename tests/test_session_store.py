@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from Backend.SessionStore import CheckSessionId, Session, SessionStore, DEFAULT
+
+
+@pytest.fixture
+def store(tmp_path):
+    default = Session(DEFAULT, None, None, None)
+    store = SessionStore(tmp_path / "Sessions", max_active=2, idle_seconds=3600, default=default,
+                         summarizer=lambda previous, messages: "summary")
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("session_id", [".", "..", ".hidden", "../escape", "a/b", "", "x" * 65, "default"])
+def test_network_session_ids_are_checked(session_id):
+    with pytest.raises(ValueError):
+        CheckSessionId(session_id)
+
+
+@pytest.mark.parametrize("session_id", ["alice", "user-0007", "a.b_c-d", "x" * 64])
+def test_valid_session_ids(session_id):
+    assert CheckSessionId(session_id) == session_id
+
+
+@pytest.mark.parametrize("session_id", [".", "..", ".config"])
+def test_dot_ids_never_open_a_directory(store, tmp_path, session_id):
+    with pytest.raises(ValueError):
+        store.acquire(session_id)
+    with pytest.raises(ValueError):
+        store.acquire_remote(session_id)
+    assert not (tmp_path / "Sessions").exists()
+
+
+def test_sessions_stay_inside_their_shard(store, tmp_path):
+    session = store.acquire("alice")
+    assert session.directory.parent.parent == tmp_path / "Sessions"
+    assert session.directory.name == "alice"
+    store.release(session)
+
+
+def test_network_clients_never_get_the_local_session(store):
+    with pytest.raises(ValueError):
+        store.acquire_remote(DEFAULT)
+    anonymous = store.acquire_remote(None)
+    other = store.acquire_remote(None)
+    assert anonymous is not store.default and anonymous is not other
+
+    anonymous.conversation.append_turn("hello", "hi")
+    assert len(other.conversation) == 0
+    directory = anonymous.directory
+    store.release(anonymous)
+    store.release(other)
+    # Throwaway sessions leave nothing behind
+    assert not directory.exists()
+    assert len(store) == 0
+
+
+def test_named_sessions_keep_their_history(store):
+    session = store.acquire_remote("alice")
+    session.conversation.append_turn("hello", "hi")
+    store.release(session)
+    again = store.acquire_remote("alice")
+    assert again is session
+    assert len(again.conversation) == 2
+    store.release(again)
+
+
+def test_least_recently_used_idle_session_is_evicted(store):
+    for name in ("a", "b", "c"):
+        store.release(store.acquire(name))
+    assert len(store) == 2
+    assert store.stats["evicted"] == 1
+    # Reopened from disk with its history
+    a = store.acquire("a")
+    assert store.stats["opened"] == 4
+    store.release(a)
+
+
+def test_sessions_in_use_are_not_evicted(store):
+    held = [store.acquire(name) for name in ("a", "b", "c")]
+    assert len(store) == 3 and store.stats["evicted"] == 0
+    for session in held:
+        store.release(session)
+    assert len(store) == 2
+
+
+def test_eviction_flushes_outside_the_lock(store, monkeypatch):
+    a = store.acquire("a")
+    a.conversation.append_turn("question", "answer")
+    flushing, release = threading.Event(), threading.Event()
+    close = Session.close
+
+    def slow_close(session):
+        if session is a:
+            # A slow disk
+            flushing.set()
+            release.wait(5)
+        close(session)
+    monkeypatch.setattr(Session, "close", slow_close)
+
+    store.release(a)
+    store.release(store.acquire("b"))
+    evicting = threading.Thread(target=lambda: store.release(store.acquire("c")))
+    evicting.start()
+    assert flushing.wait(5)
+
+    # Other clients are served while "a" is written to disk
+    start = time.perf_counter()
+    store.release(store.acquire("d"))
+    assert time.perf_counter() - start < 1.0
+
+    # Reopening "a" waits until its old copy has been flushed, then sees its turn
+    reopened = []
+    reopening = threading.Thread(target=lambda: reopened.append(store.acquire("a")))
+    reopening.start()
+    time.sleep(0.1)
+    assert not reopened
+    release.set()
+    evicting.join(5)
+    reopening.join(5)
+    assert len(reopened[0].conversation) == 2
+    store.release(reopened[0])
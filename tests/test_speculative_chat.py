@@ -0,0 +1,65 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from Backend import Chatbot
+from Backend.ChatLogStore import ChatLogStore
+from Backend.ContextWindow import ContextWindow
+
+
+def fake_completion(messages):
+    for piece in ["Python ", "is ", "a ", "language."]:
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    monkeypatch.setattr(Chatbot, "ChatCompletion", fake_completion)
+    fresh = dict.fromkeys(Chatbot.speculation_stats, 0)
+    monkeypatch.setattr(Chatbot, "speculation_stats", fresh)
+    return fresh
+
+
+def session(tmp_path, summarizer, turns=40):
+    store = ChatLogStore(tmp_path / "Chatlog")
+    for i in range(turns):
+        store.extend([{"role": "user", "content": f"question {i} " * 10},
+                      {"role": "assistant", "content": f"answer {i} " * 10}])
+    window = ContextWindow(store, budget=600, summary_tokens=100, summary_path=tmp_path / "ChatSummary.json",
+                           summarizer=summarizer)
+    return SimpleNamespace(context_window=window)
+
+
+def test_speculative_prompt_never_folds(tmp_path, stats):
+    calls = []
+    owner = session(tmp_path, lambda previous, messages: calls.append(messages) or "summary")
+
+    speculation = Chatbot.SpeculativeChat("what is python", session=owner)
+    speculation._thread.join(5)
+    speculation.cancel()
+    owner.context_window.wait(5)
+
+    # The history did not fit, but a cancelled turn must not write the rolling summary
+    assert calls == []
+    assert not (tmp_path / "ChatSummary.json").exists()
+    assert speculation.messages[-1] == {"role": "user", "content": "what is python"}
+    assert owner.context_window.last_report["prompt_tokens"] <= 600
+
+
+def test_stats_are_exact_under_concurrent_speculations(tmp_path, stats):
+    owner = session(tmp_path, lambda previous, messages: "summary", turns=1)
+    speculations = [Chatbot.SpeculativeChat(f"question {i}", session=owner) for i in range(40)]
+    for speculation in speculations:
+        speculation._thread.join(5)
+
+    threads = [threading.Thread(target=speculation.cancel) for speculation in speculations]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    report = Chatbot.SpeculationReport()
+    assert report["started"] == report["cancelled"] == 40
+    assert report["hit_rate"] == 0.0
+    assert report["wasted_completion_tokens"] > 0
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from Backend.SpeechStream import SentenceSegmenter, SpeechPipeline
+
+
+def segment(pieces, min_chars=20):
+    segmenter = SentenceSegmenter(min_chars=min_chars)
+    sentences = []
+    for piece in pieces:
+        sentences += segmenter.feed(piece)
+    return sentences, segmenter.flush()
+
+
+def words(text):
+    """Word pieces as an LLM streams them; the text ends without whitespace"""
+    pieces = text.split(" ")
+    return [word + " " for word in pieces[:-1]] + pieces[-1:]
+
+
+@pytest.mark.parametrize("pieces", [
+    ["Python is a programming language. It was created by Guido van Rossum. It is popular."],
+    words("Python is a programming language. It was created by Guido van Rossum. It is popular."),
+    list("Python is a programming language. It was created by Guido van Rossum. It is popular."),
+])
+def test_sentences_complete_as_they_stream(pieces):
+    sentences, rest = segment(pieces)
+    assert sentences == ["Python is a programming language.", "It was created by Guido van Rossum."]
+    assert rest == ["It is popular."]
+
+
+def test_short_fragments_are_merged():
+    sentences, rest = segment(words("Sure. Python is a programming language. Ok."))
+    assert sentences == ["Sure. Python is a programming language."]
+    assert rest == ["Ok."]
+
+
+def test_abbreviations_do_not_end_sentences():
+    sentences, rest = segment(words("Dr. Smith met Mr. Jones at St. Mary's church. They talked for hours."))
+    assert sentences == ["Dr. Smith met Mr. Jones at St. Mary's church."]
+    assert rest == ["They talked for hours."]
+
+
+def test_no_ends_a_sentence_unless_a_number_follows():
+    sentences, rest = segment(words("The short answer is simply no. It would not work at all."))
+    assert sentences == ["The short answer is simply no."]
+    assert rest == ["It would not work at all."]
+
+    sentences, rest = segment(words("It was song No. 5 on the album. It sold well in the charts."))
+    assert sentences == ["It was song No. 5 on the album."]
+    assert rest == ["It sold well in the charts."]
+
+
+def test_no_at_the_end_of_a_piece_waits_for_the_next_word():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("The short answer is simply no. ") == []
+    assert segmenter.feed("It would not work at all. ") == ["The short answer is simply no.",
+                                                             "It would not work at all."]
+
+
+def fake_stream(text, delay, produced):
+    for piece in words(text):
+        time.sleep(delay)
+        produced.append(time.perf_counter())
+        yield piece
+
+
+def test_time_to_first_audio_is_measured_before_the_answer_ends():
+    played = []
+    pipeline = SpeechPipeline(synthesize=lambda sentence: (time.sleep(0.02), sentence)[1],
+                              play=lambda audio: played.append((time.perf_counter(), audio)),
+                              stop=lambda: None, discard=lambda audio: None)
+    answer = ("Python is a high-level programming language. It was created by Guido van Rossum. "
+              "It is widely used for web development, data science and automation.")
+    produced = []
+    start = time.perf_counter()
+    text = pipeline.speak_stream(fake_stream(answer, 0.02, produced), started_at=start)
+
+    assert text.split() == answer.split()
+    assert [audio for _, audio in played] == ["Python is a high-level programming language.",
+                                              "It was created by Guido van Rossum.",
+                                              "It is widely used for web development, data science and automation."]
+    # The first sentence is heard while the rest of the answer is still being generated
+    assert played[0][0] < produced[-1]
+    ttfa = pipeline.last_time_to_first_audio
+    # At least the first sentence's 6 words plus its synthesis, well before the whole answer
+    assert 6 * 0.02 + 0.02 <= ttfa < produced[-1] - start
+    assert pipeline.history[-1] == ttfa
+
+
+def test_time_to_first_audio_uses_the_pipeline_clock():
+    now = [100.0]
+    heard = threading.Event()
+    pipeline = SpeechPipeline(synthesize=lambda sentence: sentence, play=lambda audio: heard.set(),
+                              clock=lambda: now[0], stop=lambda: None, discard=lambda audio: None)
+    pipeline.begin()
+    now[0] = 100.75
+    pipeline.put("A complete sentence to speak.")
+    assert heard.wait(2)
+    pipeline.wait(2)
+    assert pipeline.last_time_to_first_audio == pytest.approx(0.75)
+
+
+def test_concurrent_answers_are_timed_apart():
+    now = [0.0]
+    release = threading.Event()
+    synthesizing = threading.Event()
+
+    def synthesize(sentence):
+        # The first answer's first sentence is still being synthesized when the second answer begins
+        if sentence.startswith("First"):
+            synthesizing.set()
+            release.wait(2)
+        return sentence
+
+    pipeline = SpeechPipeline(synthesize=synthesize, play=lambda audio: None, clock=lambda: now[0],
+                              stop=lambda: None, discard=lambda audio: None)
+    first = threading.Thread(target=pipeline.speak_stream,
+                             args=(["First answer, spoken from the start. "],), kwargs={"started_at": 0.0})
+    first.start()
+    assert synthesizing.wait(2)
+
+    second = threading.Thread(target=pipeline.speak_stream,
+                              args=(["Second answer, asked five seconds in. "],), kwargs={"started_at": 5.0})
+    second.start()
+    time.sleep(0.05)
+    now[0] = 6.0
+    release.set()
+    first.join(2)
+    second.join(2)
+
+    # Each answer is measured from its own start, not from whichever answer began last
+    assert pipeline.history == [pytest.approx(6.0), pytest.approx(1.0)]
+    assert pipeline.last_time_to_first_audio == pytest.approx(1.0)
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from Backend.TaskScheduler import TaskScheduler
+
+
+def run(submit):
+    async def go():
+        scheduler = TaskScheduler({"general": 0.2, "automation": 0.2})
+        submit(scheduler)
+        return await scheduler.results()
+    return asyncio.run(go())
+
+
+def test_scheduler_timeout_cancels_the_handler():
+    def slow(cancel=None):
+        while not cancel.is_set():
+            time.sleep(0.01)
+        return "stopped"
+
+    [sub] = run(lambda scheduler: scheduler.submit_blocking("general", "general essay", slow))
+    assert sub.status == "timeout"
+    assert sub.cancel.is_set()
+    assert sub.seconds < 1.0
+
+
+def test_handler_timeout_is_an_error_not_a_scheduler_timeout():
+    async def provider(cancel):
+        raise TimeoutError("provider read timed out")
+
+    [sub] = run(lambda scheduler: scheduler.submit("automation", "open chrome", provider))
+    assert sub.status == "error"
+    assert isinstance(sub.error, TimeoutError)
+    assert str(sub.error) == "provider read timed out"
+
+
+def test_blocking_handler_timeout_is_an_error():
+    def search(cancel=None):
+        raise asyncio.TimeoutError()
+
+    [sub] = run(lambda scheduler: scheduler.submit_blocking("general", "general weather", search))
+    assert sub.status == "error"
+    assert not sub.cancel.is_set()
+
+
+def test_results_keep_submission_order():
+    async def after(seconds, value):
+        await asyncio.sleep(seconds)
+        return value
+
+    def submit(scheduler):
+        scheduler.submit("automation", "slow", lambda cancel: after(0.05, "slow"))
+        scheduler.submit("automation", "fast", lambda cancel: after(0.0, "fast"))
+
+    results = run(submit)
+    assert [sub.result for sub in results] == ["slow", "fast"]
+    assert all(sub.status == "ok" for sub in results)
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from Backend.Tracing import LoadSpans, OTLPExporter, Summarize, Tracer
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    tracer = Tracer(tmp_path / "Traces" / "trace.jsonl", enabled=True)
+    yield tracer
+    tracer.close()
+
+
+def test_spans_nest_and_carry_the_utterance(tracer):
+    token = tracer.begin()
+    with tracer.span("command", text="open chrome"):
+        with tracer.span("decision") as attributes:
+            attributes["source"] = "fast_path"
+    utterance = tracer.utterance()
+    tracer.end(token)
+
+    decision, command = LoadSpans(tracer.path)
+    assert decision["parent"] == command["span"] and command["parent"] is None
+    assert decision["utterance"] == command["utterance"] == utterance
+    assert decision["attributes"] == {"source": "fast_path"}
+
+
+def test_errors_are_marked(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("search"):
+            raise ValueError("no results")
+    [span] = LoadSpans(tracer.path)
+    assert span["status"] == "error" and "no results" in span["attributes"]["error"]
+
+
+def test_worker_threads_record_for_the_right_utterance(tracer):
+    token = tracer.begin()
+    utterance = tracer.utterance()
+    # Worker threads do not inherit the context; the utterance is passed along explicitly
+    thread = threading.Thread(target=tracer.record, args=("tts", 0.0, 0.25, utterance))
+    thread.start()
+    thread.join(5)
+    tracer.end(token)
+    [span] = LoadSpans(tracer.path)
+    assert span["utterance"] == utterance and span["ms"] == 250.0
+
+
+def test_rotated_files_are_read_oldest_first(tmp_path):
+    tracer = Tracer(tmp_path / "trace.jsonl", max_bytes=400, backups=3, enabled=True)
+    for i in range(10):
+        tracer.record(f"stage{i}", 0.0, 0.001)
+    tracer.close()
+    assert (tmp_path / "trace.jsonl.1").exists()
+    names = [span["name"] for span in LoadSpans(tmp_path / "trace.jsonl")]
+    assert names == sorted(names, key=lambda name: int(name[5:]))
+    assert names[-1] == "stage9"
+
+
+def test_summary_ranks_stages_by_p95(tracer):
+    for ms in (10, 20, 30):
+        tracer.record("fast", 0.0, ms / 1000)
+    tracer.record("slow", 0.0, 2.0)
+    summary = Summarize(LoadSpans(tracer.path))
+    assert [stage["stage"] for stage in summary["stages"]] == ["slow", "fast"]
+    assert summary["stages"][1]["count"] == 3
+
+
+def test_otlp_payload_links_parents(tracer):
+    exporter = OTLPExporter("http://127.0.0.1:9/v1/traces")
+    token = tracer.begin()
+    with tracer.span("command"):
+        with tracer.span("llm"):
+            pass
+    tracer.end(token)
+    spans = exporter.payload(LoadSpans(tracer.path))["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    llm, command = spans
+    assert llm["parentSpanId"] == command["spanId"] and "parentSpanId" not in command
+    assert llm["traceId"] == command["traceId"]